@@ -7,22 +7,48 @@ import json
 import math
 
 from ...lib import fusionAddInUtils as futil
+from ...lib import nestingConfig
 from ... import config
 import importlib.util
+import time
 
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Load the nesting algorithm module from the parent directory
-spec = importlib.util.spec_from_file_location("nestingAlgorithm", 
-                                             os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
-                                             os.path.dirname(__file__)))), "lib", "nestingAlgorithm.py"))
-if spec:
-    nestingAlgorithm = importlib.util.module_from_spec(spec)
-    if spec.loader:
-        spec.loader.exec_module(nestingAlgorithm)
-else:
-    futil.log("Failed to load nestingAlgorithm module", adsk.core.LogLevels.ErrorLogLevel)
+# Load the nesting library modules from the parent directory
+LIB_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+                          os.path.dirname(__file__)))), "lib")
+
+def load_lib_module(name):
+    """Load a module from the shared lib folder and register it so its siblings can import it"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(LIB_FOLDER, f"{name}.py"))
+    if not spec or not spec.loader:
+        futil.log(f"Failed to load {name} module", adsk.core.LogLevels.ErrorLogLevel)
+        return None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# Load in dependency order: the algorithms use the no-fit polygons and occupancy grids, the
+# planner uses the algorithms and part outlines, the emitter uses everything else
+noFitPolygon = load_lib_module("noFitPolygon")
+nfpCache = load_lib_module("nfpCache")
+partSnapshot = load_lib_module("partSnapshot")
+occupancyGrid = load_lib_module("occupancyGrid")
+latticePacking = load_lib_module("latticePacking")
+rectangleDecomposition = load_lib_module("rectangleDecomposition")
+pairClustering = load_lib_module("pairClustering")
+nestingAlgorithm = load_lib_module("nestingAlgorithm")
+nestingPlanner = load_lib_module("nestingPlanner")
+transformKernel = load_lib_module("transformKernel")
+dxfWriter = load_lib_module("dxfWriter")
+nestingEmitter = load_lib_module("nestingEmitter")
+
+# No-fit polygons are kept between runs, in memory and in the user's cache folder
+nfp_cache = nfpCache.NfpCache(nfpCache.DEFAULT_DIRECTORY)
 
 # Command ID and other constants
 CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_NestingCommand'
@@ -60,6 +86,27 @@ SHEET_MATERIALS = {
     'Custom': None
 }
 
+# Material choice that tries every preset sheet size
+BEST_FIT_MATERIAL = 'Best Fit (All Presets)'
+
+# Nesting types that lay out the part's bounding box; Best Fit compares stock sizes by these layouts only,
+# and the other types plan one sheet that is repeated for multiple sheets
+BOUNDING_BOX_NESTING_TYPES = ('Simple Nesting', 'Advanced Nesting')
+
+def stock_sheets(edge_clearance, gutter_size):
+    """Get every preset sheet size, including the configured material presets, as stock for the best fit material"""
+    sizes = {name: (width * 100, height * 100) for name, (width, height) in SHEET_MATERIALS.items()
+             if name != 'Custom'}
+    for name, preset in nestingConfig.MATERIAL_PRESETS.items():
+        sizes[name] = (preset['width'], preset['height'])
+
+    # Presets of the same size are the same stock
+    stocks = {}
+    for name, (width, height) in sizes.items():
+        sheet = nestingPlanner.SheetSettings(width, height, edge_clearance, gutter_size)
+        stocks.setdefault(sheet, nestingPlanner.StockSheet(name, sheet))
+    return list(stocks.values())
+
 # Global variables
 app = None
 ui = None
@@ -67,6 +114,7 @@ handlers = []
 
 # Command inputs
 nesting_type_input = None
+output_mode_input = None
 sheet_material_input = None
 sheet_width_input = None
 sheet_height_input = None
@@ -77,6 +125,9 @@ quantity_input = None
 selection_input = None
 create_border_input = None  # New input for sheet border option
 
+# Sketch picked from the palette, used by the capacity sweep
+palette_sketch = None
+
 # Executed when add-in is run
 def start():
     # Create a command Definition
@@ -279,6 +330,7 @@ def palette_closed(args: adsk.core.UserInterfaceGeneralEventArgs):
     futil.log(f'Nesting palette was closed.')
 
 def palette_incoming(html_args: adsk.core.HTMLEventArgs):
+    global palette_sketch
     futil.log(f'Nesting palette incoming event.')
     
     # Process palette messages here
@@ -305,6 +357,7 @@ def palette_incoming(html_args: adsk.core.HTMLEventArgs):
                 # Get the selected sketch
                 sketch = adsk.fusion.Sketch.cast(selections.entity)
                 if sketch:
+                    palette_sketch = sketch
                     html_args.returnData = sketch.name
                     futil.log(f"Selected sketch: {sketch.name}")
                     return
@@ -315,30 +368,88 @@ def palette_incoming(html_args: adsk.core.HTMLEventArgs):
             html_args.returnData = f"Error: {str(e)}"
             futil.log(f"Error selecting part: {str(e)}", adsk.core.LogLevels.ErrorLogLevel)
     
-    elif message_action == 'generatePreview':
+    elif message_action in ('generatePreview', 'runNesting'):
         try:
-            futil.log("generatePreview action called")  # Add this line
-            # Parse settings from the HTML interface
+            # Nest the selected part over as many sheets as the quantity needs
             settings = json.loads(html_args.data)
-            futil.log(f"Settings: {settings}")  # Add this line
+            if not palette_sketch or not palette_sketch.isValid:
+                html_args.returnData = json.dumps({"error": "Select a part first"})
+                return
             
-            # Implement the nesting preview logic
-            # For now, just return a sample result
+            bbox = nestingEmitter.capture_snapshot(palette_sketch).bbox
+            if not bbox:
+                html_args.returnData = json.dumps({"error": "The selected sketch has no geometry"})
+                return
+            
+            kerf = settings.get("kerf", 0) / 10  # Convert mm to cm
+            part_width = bbox[1] - bbox[0] + kerf
+            part_height = bbox[3] - bbox[2] + kerf
+            start_time = time.time()
+            solution = nestingAlgorithm.multi_sheet_nesting(
+                settings["width"], 
+                settings["height"], 
+                [{'id': palette_sketch.name, 'width': part_width, 'height': part_height, 
+                  'quantity': settings["quantity"]}], 
+                settings["clearance"], 
+                settings["spacing"]
+            )
+            
+            placements = []
+            for placement in solution['placements']:
+                width, height = (part_height, part_width) if placement['rotated'] else (part_width, part_height)
+                placements.append({
+                    "part_id": placement['part_id'],
+                    "sheet": placement['sheet'],
+                    "x": placement['x'],
+                    "y": placement['y'],
+                    "width": width,
+                    "height": height,
+                    "rotated": placement['rotated']
+                })
             result = {
                 "width": settings["width"],
                 "height": settings["height"],
-                "utilization": 75.5,
-                "placements": [
-                    {"x": 10, "y": 10, "width": 20, "height": 30, "rotated": False}
-                ]
+                "sheetWidth": settings["width"],
+                "sheetHeight": settings["height"],
+                "utilization": solution['utilization'],
+                "sheets_required": solution['sheets_required'],
+                "unplaced": sum(solution['unplaced'].values()),
+                "processingTime": round(time.time() - start_time, 2),
+                "placements": placements
             }
-            
             html_args.returnData = json.dumps(result)
-            futil.log(f"Preview result: {result}")  # Add this line
+            futil.log(f"Preview placed {len(placements)} parts on {solution['sheets_required']} sheets")
         except Exception as e:
-            html_args.returnData = "error"
+            html_args.returnData = json.dumps({"error": str(e)})
             futil.log(f"Error generating preview: {str(e)}")
     
+    elif message_action == 'capacitySweep':
+        try:
+            # Count parts per sheet for every clearance and gutter the palette asks for
+            settings = json.loads(html_args.data)
+            if not palette_sketch or not palette_sketch.isValid:
+                html_args.returnData = json.dumps({"error": "Select a part first"})
+                return
+            
+            bbox = nestingEmitter.capture_snapshot(palette_sketch).bbox
+            if not bbox:
+                html_args.returnData = json.dumps({"error": "The selected sketch has no geometry"})
+                return
+            
+            rows = nestingAlgorithm.capacity_sweep(
+                bbox[1] - bbox[0], 
+                bbox[3] - bbox[2], 
+                [(settings["width"], settings["height"])], 
+                settings["clearances"], 
+                settings["gutters"], 
+                [settings.get("kerf", 0) / 10]  # Convert mm to cm
+            )
+            html_args.returnData = json.dumps({"rows": rows, "pareto": nestingAlgorithm.capacity_pareto(rows)})
+            futil.log(f"Capacity sweep evaluated {len(rows)} combinations")
+        except Exception as e:
+            html_args.returnData = json.dumps({"error": str(e)})
+            futil.log(f"Error in capacity sweep: {str(e)}")
+    
     elif message_action == 'applyNesting':
         try:
             futil.log("applyNesting action called")
@@ -823,6 +934,7 @@ handlers = []
 
 # Command inputs
 nesting_type_input = None
+output_mode_input = None
 sheet_material_input = None
 sheet_width_input = None
 sheet_height_input = None
@@ -832,6 +944,8 @@ kerf_compensation_input = None
 quantity_input = None
 selection_input = None
 create_border_input = None
+multi_sheet_input = None
+orient_part_input = None
 
 def run(context):
     global app, ui, handlers
@@ -877,7 +991,7 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
             global nesting_type_input, sheet_material_input, sheet_width_input
             global sheet_height_input, edge_clearance_input, gutter_size_input
             global kerf_compensation_input, quantity_input, selection_input
-            global create_border_input, handlers
+            global create_border_input, multi_sheet_input, orient_part_input, output_mode_input, handlers
             
             # Get the command
             cmd = args.command
@@ -898,6 +1012,11 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
             nesting_type_list = nesting_type_input.listItems
             nesting_type_list.add('Simple Nesting', True)
             nesting_type_list.add('Advanced Nesting', False)
+            nesting_type_list.add('True Shape Nesting', False)
+            nesting_type_list.add('Lattice Nesting', False)
+            nesting_type_list.add('Raster Nesting', False)
+            nesting_type_list.add('Rectilinear Nesting', False)
+            nesting_type_list.add('Pair Nesting', False)
             
             # Create description for nesting types
             group_children.addTextBoxCommandInput(
@@ -908,6 +1027,16 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
                 True
             )
             
+            # Create dropdown for how the layout is written to the design
+            output_mode_input = group_children.addDropDownCommandInput(
+                'outputMode', 
+                'Output', 
+                adsk.core.DropDownStyles.TextListDropDownStyle
+            )
+            output_mode_list = output_mode_input.listItems
+            output_mode_list.add('Sketch Copies', True)
+            output_mode_list.add('Component Instances', False)
+            
             # Sheet Material dropdown
             sheet_material_input = group_children.addDropDownCommandInput(
                 'sheetMaterial', 
@@ -919,6 +1048,7 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
             sheet_material_list.add('Aluminum Sheet (2500x1250)', False)
             sheet_material_list.add('Plywood (2440x1220)', False)
             sheet_material_list.add('Acrylic (1000x600)', False)
+            sheet_material_list.add(BEST_FIT_MATERIAL, False)
             sheet_material_list.add('Custom', False)
             
             # Sheet dimensions
@@ -965,11 +1095,29 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
                 'quantity', 
                 'Quantity', 
                 1, 
-                100, 
+                100000, 
                 1, 
                 10
             )
             
+            # Multiple sheets option
+            multi_sheet_input = group_children.addBoolValueInput(
+                'multiSheet', 
+                'Use Multiple Sheets', 
+                True, 
+                '', 
+                True
+            )
+            
+            # Orientation option
+            orient_part_input = group_children.addBoolValueInput(
+                'orientPart', 
+                'Orient to Smallest Box', 
+                True, 
+                '', 
+                True
+            )
+            
             # Create border option
             create_border_input = group_children.addBoolValueInput(
                 'createBorder', 
@@ -1031,18 +1179,9 @@ class InputChangedHandler(adsk.core.InputChangedEventHandler):
                 sheet_material = sheet_material_input.selectedItem.name
                 
                 # Update sheet dimensions based on material selection
-                if sheet_material == 'Steel Sheet (3000x2000)':
-                    sheet_width_input.value = 3.0
-                    sheet_height_input.value = 2.0
-                elif sheet_material == 'Aluminum Sheet (2500x1250)':
-                    sheet_width_input.value = 2.5
-                    sheet_height_input.value = 1.25
-                elif sheet_material == 'Plywood (2440x1220)':
-                    sheet_width_input.value = 2.44
-                    sheet_height_input.value = 1.22
-                elif sheet_material == 'Acrylic (1000x600)':
-                    sheet_width_input.value = 1.0
-                    sheet_height_input.value = 0.6
+                sheet_size = SHEET_MATERIALS.get(sheet_material)
+                if sheet_size:
+                    sheet_width_input.value, sheet_height_input.value = sheet_size
                 
         except:
             if ui:
@@ -1094,6 +1233,8 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             
             # Get input values
             nesting_type = nesting_type_input.selectedItem.name
+            output_mode = output_mode_input.selectedItem.name
+            sheet_material = sheet_material_input.selectedItem.name
             sheet_width = sheet_width_input.value
             sheet_height = sheet_height_input.value
             edge_clearance = edge_clearance_input.value
@@ -1101,6 +1242,8 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             kerf_compensation = kerf_compensation_input.value
             quantity = quantity_input.value
             create_border = create_border_input.value
+            multi_sheet = multi_sheet_input.value
+            orient_part = orient_part_input.value
             
             # Convert units to ensure consistency
             sheet_width_cm = unitsMgr.convert(sheet_width, 'm', 'cm')
@@ -1125,368 +1268,173 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             else:
                 selected_sketch = adsk.fusion.Sketch.cast(selection_input.selection(0).entity)
             
-            # Create a single sketch for the layout
-            layout_sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
-            layout_sketch.name = f"Nesting Layout - {nesting_type}"
-            
-            # Create rectangle for sheet boundary if option is selected
-            if create_border:
-                boundary = layout_sketch.sketchCurves.sketchLines.addTwoPointRectangle(
-                    adsk.core.Point3D.create(0, 0, 0),
-                    adsk.core.Point3D.create(sheet_width, sheet_height, 0)
-                )
-            
-            # Calculate bounding box of the selected sketch
-            bbox = self.calculate_sketch_bounding_box(selected_sketch)
+            # Read the part geometry once; every placement is emitted from this snapshot
+            snapshot = nestingEmitter.capture_snapshot(selected_sketch)
+            if orient_part:
+                # Turn a part drawn at an angle so its bounding box is the smallest rectangle around it
+                snapshot, _ = partSnapshot.orient_to_min_area(snapshot)
+            bbox = snapshot.bbox
             if not bbox:
                 ui.messageBox("Could not calculate bounding box for the selected sketch.")
                 return
-                
-            bbox_min_x, bbox_max_x, bbox_min_y, bbox_max_y = bbox
-            
-            # Calculate part dimensions
-            part_width = bbox_max_x - bbox_min_x
-            part_height = bbox_max_y - bbox_min_y
-            
-            # Apply kerf compensation
-            part_width += kerf_compensation / 10  # Convert mm to cm
-            part_height += kerf_compensation / 10  # Convert mm to cm
-            
-            # For advanced nesting, check if rotating gives better yield
-            rotate_parts = False
-            if nesting_type == 'Advanced Nesting' and abs(part_width - part_height) > 0.01:
-                # Calculate parts per row for both orientations
-                parts_per_row_normal = math.floor((sheet_width_cm - 2 * edge_clearance + gutter_size) / (part_width + gutter_size))
-                parts_per_column_normal = math.floor((sheet_height_cm - 2 * edge_clearance + gutter_size) / (part_height + gutter_size))
-                normal_total = parts_per_row_normal * parts_per_column_normal
-                
-                parts_per_row_rotated = math.floor((sheet_width_cm - 2 * edge_clearance + gutter_size) / (part_height + gutter_size))
-                parts_per_column_rotated = math.floor((sheet_height_cm - 2 * edge_clearance + gutter_size) / (part_width + gutter_size))
-                rotated_total = parts_per_row_rotated * parts_per_column_rotated
-                
-                # Use the orientation that gives better yield
-                if rotated_total > normal_total:
-                    rotate_parts = True
-                    # Swap dimensions for layout calculation
-                    temp = part_width
-                    part_width = part_height
-                    part_height = temp
-                    
-                    parts_per_row = parts_per_row_rotated
-                    parts_per_column = parts_per_column_rotated
-                else:
-                    parts_per_row = parts_per_row_normal
-                    parts_per_column = parts_per_column_normal
-            else:
-                # Simple nesting or square parts
-                parts_per_row = math.floor((sheet_width_cm - 2 * edge_clearance + gutter_size) / (part_width + gutter_size))
-                parts_per_column = math.floor((sheet_height_cm - 2 * edge_clearance + gutter_size) / (part_height + gutter_size))
             
-            # Make sure at least one part fits
-            parts_per_row = max(1, parts_per_row)
-            parts_per_column = max(1, parts_per_column)
+            if sheet_material == BEST_FIT_MATERIAL and nesting_type not in BOUNDING_BOX_NESTING_TYPES:
+                ui.messageBox(f"{BEST_FIT_MATERIAL} only works with Simple or Advanced Nesting. "
+                              f"Choose one sheet material for {nesting_type}.")
+                return
             
-            # Calculate total parts that can fit
-            max_parts = parts_per_row * parts_per_column
+            # Plan the layout without touching the design
+            solve_start = time.perf_counter()
+            sheet = nestingPlanner.SheetSettings(sheet_width_cm, sheet_height_cm, edge_clearance, gutter_size)
+            stocks = []
+            if sheet_material == BEST_FIT_MATERIAL:
+                # Try every preset size and use the mix of sheets with the least area
+                stocks = stock_sheets(edge_clearance, gutter_size)
+                plan = nestingPlanner.plan_stock_layout(
+                    bbox, 
+                    stocks, 
+                    quantity, 
+                    kerf=kerf_compensation / 10,  # Convert mm to cm
+                    use_pattern=nesting_type != 'Simple Nesting'
+                )
+            elif nesting_type == 'True Shape Nesting':
+                # Nest the part outline so irregular parts can interlock
+                plan = nestingPlanner.plan_true_shape_layout(
+                    snapshot, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10,  # Convert mm to cm
+                    nfp_cache=nfp_cache
+                )
+                # stats() walks the cache folder, so only build the line when it reaches the console
+                if config.DEBUG:
+                    futil.log(f"NFP cache: {nfp_cache.stats()}")
+            elif nesting_type == 'Lattice Nesting':
+                # Repeat the part and its 180 degree copy on the densest lattice
+                plan = nestingPlanner.plan_lattice_layout(
+                    snapshot, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
+            elif nesting_type == 'Raster Nesting':
+                # Nest the part as a bitmask, so any closed geometry works and holes take smaller parts
+                plan = nestingPlanner.plan_raster_layout(
+                    snapshot, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
+            elif nesting_type == 'Rectilinear Nesting':
+                # Pack L, T and U shaped parts as linked rectangles so they reach into each other's notches
+                plan = nestingPlanner.plan_rectilinear_layout(
+                    snapshot, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
+            elif nesting_type == 'Pair Nesting':
+                # Pack the part with a turned copy as one near-rectangle, for triangles and trapezoids
+                plan = nestingPlanner.plan_pair_layout(
+                    snapshot, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
+            elif multi_sheet:
+                # Use as many sheets as the quantity needs
+                plan = nestingPlanner.plan_multi_sheet_layout(
+                    bbox, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10,  # Convert mm to cm
+                    use_pattern=nesting_type == 'Advanced Nesting',
+                    collapse_repeats=True  # Draw a repeated sheet layout only once
+                )
+            elif nesting_type == 'Advanced Nesting':
+                # Mix blocks of normal and rotated parts for the best yield
+                plan = nestingPlanner.plan_pattern_layout(
+                    bbox, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
+            else:
+                plan = nestingPlanner.plan_grid_layout(
+                    bbox, 
+                    sheet, 
+                    quantity, 
+                    kerf=kerf_compensation / 10  # Convert mm to cm
+                )
             
-            # Limit to requested quantity
-            parts_to_place = min(quantity, max_parts)
+            if multi_sheet and nesting_type not in BOUNDING_BOX_NESTING_TYPES:
+                # The outline-based layouts fill one sheet, which is repeated until the quantity is placed
+                plan = nestingPlanner.repeat_sheet_layout(plan, quantity, collapse_repeats=True)
+            solve_time = time.perf_counter() - solve_start
             
-            if parts_to_place == 0:
+            if plan.parts_placed == 0:
                 ui.messageBox(f"The selected sketch is too large to fit on the sheet with the current settings.")
                 return
             
-            # Place parts in appropriate pattern
-            parts_placed = 0
-            for row in range(parts_per_column):
-                if parts_placed >= parts_to_place:
-                    break
-                    
-                # For advanced nesting, stagger every other row
-                row_offset = 0
-                if nesting_type == 'Advanced Nesting':
-                    row_offset = (gutter_size / 2) if row % 2 == 1 else 0
-                    
-                for col in range(parts_per_row):
-                    if parts_placed >= parts_to_place:
-                        break
-                        
-                    # Calculate position for this part
-                    x_offset = edge_clearance + row_offset + col * (part_width + gutter_size) - bbox_min_x
-                    y_offset = edge_clearance + row * (part_height + gutter_size) - bbox_min_y
-                    
-                    # Skip if part would extend beyond sheet width
-                    if x_offset + part_width + bbox_min_x > sheet_width_cm - edge_clearance:
-                        continue
-                    
-                    # Copy each curve with offset and possible rotation
-                    self.copy_part_to_position(selected_sketch, layout_sketch, x_offset, y_offset, 
-                                              rotate_parts, bbox_min_x, bbox_min_y)
-                    parts_placed += 1
+            # Emit the planned parts into the design
+            layout_name = f"Nesting Layout - {nesting_type}"
+            emit_start = time.perf_counter()
+            cancelled = False
+            layout_sketch = None
+            sheet_sketches = {}
+            emit_path = 'occurrences'
+            if output_mode == 'Component Instances':
+                parts_placed = nestingEmitter.emit_plan_as_occurrences(rootComp, snapshot, plan, selected_sketch.name)
+                placed_in = "as instances of one component"
+            else:
+                layout_sketches, sheet_sketches, parts_placed, cancelled, emit_path = nestingEmitter.write_layout_sketches(
+                    rootComp, snapshot, plan, layout_name
+                )
+                layout_sketch = layout_sketches[0] if layout_sketches else None
+                placed_in = f"in {len(layout_sketches)} sketches" if len(layout_sketches) > 1 else "in a single sketch"
+            emit_time = time.perf_counter() - emit_start
+            futil.log(f"{nesting_type}: solve {solve_time:.3f}s, emit {emit_time:.3f}s ({emit_path}) for {parts_placed} parts")
+            
+            # Create a single sketch for the layout if the parts did not need one
+            if not layout_sketch:
+                layout_sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
+                layout_sketch.name = layout_name
             
-            result_message = f"{nesting_type} complete. {parts_placed} parts placed in a single sketch."
-            if rotate_parts:
+            # Create a rectangle for each sheet boundary if option is selected, in that sheet's own sketch
+            if create_border:
+                for sheet_index in range(plan.sheet_count):
+                    if sheet_sketches and sheet_index not in sheet_sketches:
+                        continue  # Writing stopped before this sheet
+                    border_sketch = sheet_sketches.get(sheet_index, layout_sketch)
+                    origin_x, origin_y = plan.sheet_origin(sheet_index)
+                    sheet_settings = plan.sheet_settings(sheet_index)
+                    border_sketch.sketchCurves.sketchLines.addTwoPointRectangle(
+                        adsk.core.Point3D.create(origin_x, origin_y, 0),
+                        adsk.core.Point3D.create(origin_x + sheet_settings.width, origin_y + sheet_settings.height, 0)
+                    )
+            
+            result_message = f"{nesting_type} complete. {parts_placed} parts placed {placed_in}."
+            if plan.sheets_required > 1:
+                result_message += f" {plan.sheets_required} sheets are required."
+            if plan.sheet_count < plan.sheets_required:
+                result_message += (f" Repeated sheets are drawn once ({plan.sheet_count} distinct layouts"
+                                   f" for {plan.parts_total} parts in total).")
+            elif plan.parts_placed < quantity:
+                result_message += f" Only {plan.parts_placed} of {quantity} parts fit on the sheet."
+            if stocks:
+                stock_names = {stock.sheet: stock.name for stock in stocks}
+                sheets_used = {}
+                for sheet_index in range(plan.sheet_count):
+                    name = stock_names[plan.sheet_settings(sheet_index)]
+                    sheets_used[name] = sheets_used.get(name, 0) + plan.multiplicity(sheet_index)
+                result_message += " Sheets used: " + ", ".join(
+                    f"{count} x {name}" for name, count in sheets_used.items()) + "."
+            if plan.rotated:
                 result_message += " Parts were rotated for optimal yield."
+            if cancelled:
+                result_message += f" Placement was cancelled; {plan.parts_placed - parts_placed} parts were not placed."
                 
             ui.messageBox(result_message)
             
         except Exception as e:
             ui.messageBox(f"Error executing command: {str(e)}\n{traceback.format_exc()}")
-    
-    def calculate_sketch_bounding_box(self, sketch):
-        """Calculate the bounding box of a sketch"""
-        try:
-            min_x = float('inf')
-            min_y = float('inf')
-            max_x = float('-inf')
-            max_y = float('-inf')
-            
-            has_curves = False
-            
-            # Iterate through sketch curves to find min/max points
-            for curve in sketch.sketchCurves:
-                has_curves = True
-                
-                try:
-                    if curve.objectType == adsk.fusion.SketchCircle.classType():
-                        circle = adsk.fusion.SketchCircle.cast(curve)
-                        center = circle.centerPoint
-                        radius = circle.radius
-                        
-                        min_x = min(min_x, center.x - radius)
-                        min_y = min(min_y, center.y - radius)
-                        max_x = max(max_x, center.x + radius)
-                        max_y = max(max_y, center.y + radius)
-                        
-                    elif curve.objectType == adsk.fusion.SketchLine.classType():
-                        line = adsk.fusion.SketchLine.cast(curve)
-                        
-                        try:
-                            # Method 1
-                            start_x = line.startPoint.x
-                            start_y = line.startPoint.y
-                            end_x = line.endPoint.x
-                            end_y = line.endPoint.y
-                        except:
-                            # Method 2
-                            try:
-                                start_x = line.startSketchPoint.geometry.x
-                                start_y = line.startSketchPoint.geometry.y
-                                end_x = line.endSketchPoint.geometry.x
-                                end_y = line.endSketchPoint.geometry.y
-                            except:
-                                continue
-                        
-                        min_x = min(min_x, start_x, end_x)
-                        min_y = min(min_y, start_y, end_y)
-                        max_x = max(max_x, start_x, end_x)
-                        max_y = max(max_y, start_y, end_y)
-                        
-                    elif curve.objectType == adsk.fusion.SketchArc.classType():
-                        arc = adsk.fusion.SketchArc.cast(curve)
-                        
-                        try:
-                            center = arc.centerPoint
-                            start_point = arc.startPoint
-                            
-                            # Get the radius
-                            radius = center.distanceTo(start_point)
-                            
-                            min_x = min(min_x, center.x - radius)
-                            min_y = min(min_y, center.y - radius)
-                            max_x = max(max_x, center.x + radius)
-                            max_y = max(max_y, center.y + radius)
-                        except:
-                            try:
-                                center_x = arc.centerSketchPoint.geometry.x
-                                center_y = arc.centerSketchPoint.geometry.y
-                                start_x = arc.startSketchPoint.geometry.x
-                                start_y = arc.startSketchPoint.geometry.y
-                                
-                                # Calculate radius
-                                radius = math.sqrt((start_x - center_x)**2 + (start_y - center_y)**2)
-                                
-                                min_x = min(min_x, center_x - radius)
-                                min_y = min(min_y, center_y - radius)
-                                max_x = max(max_x, center_x + radius)
-                                max_y = max(max_y, center_x + radius)
-                            except:
-                                continue
-                except:
-                    continue
-            
-            if not has_curves or min_x == float('inf'):
-                return None
-            
-            # Ensure a minimum size to prevent zero-width/height boxes
-            if max_x - min_x < 0.01:
-                max_x = min_x + 0.01
-            if max_y - min_y < 0.01:
-                max_y = min_y + 0.01
-                
-            return [min_x, max_x, min_y, max_y]
-        
-        except:
-            ui.messageBox('Calculate sketch bounding box failed:\n{}'.format(traceback.format_exc()))
-            return None
-
-    def copy_part_to_position(self, source_sketch, target_sketch, x_offset, y_offset, rotate, bbox_min_x, bbox_min_y):
-        """Helper method to copy a sketch to a target position with optional rotation"""
-        try:
-            # Copy each curve with offset and possible rotation
-            for curve in source_sketch.sketchCurves:
-                if rotate:
-                    self.copy_rotated_curve(curve, target_sketch, x_offset, y_offset, bbox_min_x, bbox_min_y)
-                else:
-                    self.copy_curve(curve, target_sketch, x_offset, y_offset)
-        except Exception as e:
-            ui.messageBox(f"Error copying part: {str(e)}")
-    
-    def copy_rotated_curve(self, curve, target_sketch, x_offset, y_offset, bbox_min_x, bbox_min_y):
-        """Copy a curve with 90-degree rotation"""
-        try:
-            if curve.objectType == adsk.fusion.SketchCircle.classType():
-                circle = adsk.fusion.SketchCircle.cast(curve)
-                
-                # Calculate center point after rotation (90 degrees around origin)
-                orig_x = circle.centerPoint.x - bbox_min_x
-                orig_y = circle.centerPoint.y - bbox_min_y
-                
-                # Rotate 90 degrees (swap x,y and negate one)
-                rot_x = orig_y
-                rot_y = -orig_x
-                
-                # Apply offset
-                center_x = rot_x + x_offset + bbox_min_x
-                center_y = rot_y + y_offset + bbox_min_y
-                
-                # Create the circle at the new position
-                target_sketch.sketchCurves.sketchCircles.addByCenterRadius(
-                    adsk.core.Point3D.create(center_x, center_y, 0),
-                    circle.radius
-                )
-                
-            elif curve.objectType == adsk.fusion.SketchLine.classType():
-                line = adsk.fusion.SketchLine.cast(curve)
-                
-                try:
-                    orig_start_x = line.startPoint.x - bbox_min_x
-                    orig_start_y = line.startPoint.y - bbox_min_y
-                    orig_end_x = line.endPoint.x - bbox_min_x
-                    orig_end_y = line.endPoint.y - bbox_min_y
-                    
-                    # Rotate 90 degrees
-                    rot_start_x = orig_start_y
-                    rot_start_y = -orig_start_x
-                    rot_end_x = orig_end_y
-                    rot_end_y = -orig_end_x
-                    
-                    # Apply offset
-                    start_x = rot_start_x + x_offset + bbox_min_x
-                    start_y = rot_start_y + y_offset + bbox_min_y
-                    end_x = rot_end_x + x_offset + bbox_min_x
-                    end_y = rot_end_y + y_offset + bbox_min_y
-                    
-                    # Create new line
-                    target_sketch.sketchCurves.sketchLines.addByTwoPoints(
-                        adsk.core.Point3D.create(start_x, start_y, 0),
-                        adsk.core.Point3D.create(end_x, end_y, 0)
-                    )
-                except:
-                    # Try alternative method
-                    try:
-                        # Method using startSketchPoint
-                        orig_start_x = line.startSketchPoint.geometry.x - bbox_min_x
-                        orig_start_y = line.startSketchPoint.geometry.y - bbox_min_y
-                        orig_end_x = line.endSketchPoint.geometry.x - bbox_min_x
-                        orig_end_y = line.endSketchPoint.geometry.y - bbox_min_y
-                        
-                        # Rotate 90 degrees
-                        rot_start_x = orig_start_y
-                        rot_start_y = -orig_start_x
-                        rot_end_x = orig_end_y
-                        rot_end_y = -orig_end_x
-                        
-                        # Apply offset
-                        start_x = rot_start_x + x_offset + bbox_min_x
-                        start_y = rot_start_y + y_offset + bbox_min_y
-                        end_x = rot_end_x + x_offset + bbox_min_x
-                        end_y = rot_end_y + y_offset + bbox_min_y
-                        
-                        # Create new line
-                        target_sketch.sketchCurves.sketchLines.addByTwoPoints(
-                            adsk.core.Point3D.create(start_x, start_y, 0),
-                            adsk.core.Point3D.create(end_x, end_y, 0)
-                        )
-                    except:
-                        pass  # Skip if we can't get coordinates
-        except:
-            pass  # Skip if there's any error
-            
-    def copy_curve(self, curve, target_sketch, x_offset, y_offset):
-        """Copy a curve without rotation"""
-        try:
-            if curve.objectType == adsk.fusion.SketchCircle.classType():
-                circle = adsk.fusion.SketchCircle.cast(curve)
-                center_x = circle.centerPoint.x + x_offset
-                center_y = circle.centerPoint.y + y_offset
-                
-                # Create the circle at the new position
-                target_sketch.sketchCurves.sketchCircles.addByCenterRadius(
-                    adsk.core.Point3D.create(center_x, center_y, 0),
-                    circle.radius
-                )
-                
-            elif curve.objectType == adsk.fusion.SketchLine.classType():
-                line = adsk.fusion.SketchLine.cast(curve)
-                
-                try:
-                    # Method 1
-                    start_x = line.startPoint.x + x_offset
-                    start_y = line.startPoint.y + y_offset
-                    end_x = line.endPoint.x + x_offset
-                    end_y = line.endPoint.y + x_offset
-                    
-                    # Create new line
-                    target_sketch.sketchCurves.sketchLines.addByTwoPoints(
-                        adsk.core.Point3D.create(start_x, start_y, 0),
-                        adsk.core.Point3D.create(end_x, end_y, 0)
-                    )
-                except:
-                    try:
-                        # Method 2 using startSketchPoint
-                        start_x = line.startSketchPoint.geometry.x + x_offset
-                        start_y = line.startSketchPoint.geometry.y + x_offset
-                        end_x = line.endSketchPoint.geometry.x + x_offset
-                        end_y = line.endSketchPoint.geometry.y + x_offset
-                        
-                        # Create new line
-                        target_sketch.sketchCurves.sketchLines.addByTwoPoints(
-                            adsk.core.Point3D.create(start_x, start_y, 0),
-                            adsk.core.Point3D.create(end_x, end_y, 0)
-                        )
-                    except:
-                        pass
-                        
-            elif curve.objectType == adsk.fusion.SketchArc.classType():
-                arc = adsk.fusion.SketchArc.cast(curve)
-                
-                try:
-                    center_x = arc.centerPoint.x + x_offset
-                    center_y = arc.centerPoint.y + y_offset
-                    start_x = arc.startPoint.x + x_offset
-                    start_y = arc.startPoint.y + y_offset
-                    end_x = arc.endPoint.x + x_offset
-                    end_y = arc.endPoint.y + y_offset
-                    
-                    # Create new arc
-                    target_sketch.sketchCurves.sketchArcs.addByThreePoints(
-                        adsk.core.Point3D.create(start_x, start_y, 0),
-                        adsk.core.Point3D.create(end_x, end_y, 0),
-                        adsk.core.Point3D.create(center_x, center_y, 0)
-                    )
-                except:
-                    pass
-        except:
-            pass  # Skip if there's any error
-
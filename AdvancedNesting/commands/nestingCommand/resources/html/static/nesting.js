@@ -39,7 +39,7 @@ document.addEventListener('DOMContentLoaded', function() {
     function updateResultsTab(data) {
         // Update summary statistics
         document.getElementById('total-parts').textContent = data.placements.length;
-        document.getElementById('sheets-required').textContent = 1; // For multi-sheet support, this would be dynamic
+        document.getElementById('sheets-required').textContent = data.sheets_required || 1;
         document.getElementById('material-utilization').textContent = `${data.utilization.toFixed(1)}%`;
         document.getElementById('processing-time').textContent = `${data.processingTime}s`;
         
@@ -57,7 +57,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Sheet number
             const sheetCell = document.createElement('td');
-            sheetCell.textContent = '1'; // For multi-sheet support, this would be dynamic
+            sheetCell.textContent = (placement.sheet || 0) + 1;
             row.appendChild(sheetCell);
             
             // Part ID
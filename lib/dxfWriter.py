@@ -0,0 +1,81 @@
+"""
+Streaming DXF output for placed part geometry.
+
+The layout is written as a minimal ASCII R12 DXF in a single pass, so a
+whole layout can be brought into Fusion 360 with one import call instead of
+one API call per entity. R12 has no spline entity, so fitted splines are left
+to the caller.
+
+R12 has no header variable for the drawing unit ($INSUNITS came with R2000),
+so the file carries none: lengths are written in millimetres, the unit Fusion
+360 and most CAM software assume for a unitless DXF, while the placed
+geometry is in Fusion's internal centimetres.
+"""
+
+import math
+
+# Millimetres per centimetre, from Fusion's internal unit to the DXF's
+DXF_SCALE = 10.0
+
+
+def write_dxf(stream, placed_geometry, layer='0', scale=DXF_SCALE):
+    """
+    Write the lines, circles and arcs of placed geometry as a DXF file
+
+    Args:
+        stream: Text stream to write to
+        placed_geometry: transformKernel.PlacedGeometry with the placed parts
+        layer: Layer name for all entities
+        scale: Factor from the geometry's unit (cm) to the file's unit (mm)
+
+    Returns:
+        int: Number of entities written
+    """
+    _write_header(stream)
+    stream.write('0\nSECTION\n2\nENTITIES\n')
+
+    count = 0
+    for lines, circles, arcs in zip(placed_geometry.lines, placed_geometry.circles, placed_geometry.arcs):
+        for x1, y1, x2, y2 in lines:
+            write_line(stream, x1 * scale, y1 * scale, x2 * scale, y2 * scale, layer)
+        for center_x, center_y, radius in circles:
+            write_circle(stream, center_x * scale, center_y * scale, radius * scale, layer)
+        for center_x, center_y, start_x, start_y, sweep in arcs:
+            write_arc(stream, center_x * scale, center_y * scale, start_x * scale, start_y * scale, sweep, layer)
+        count += len(lines) + len(circles) + len(arcs)
+
+    stream.write('0\nENDSEC\n0\nEOF\n')
+    return count
+
+
+def _write_header(stream):
+    stream.write('0\nSECTION\n2\nHEADER\n'
+                 '9\n$ACADVER\n1\nAC1009\n'
+                 '0\nENDSEC\n')
+
+
+def _number(value):
+    return f'{value:.10g}'
+
+
+def write_line(stream, x1, y1, x2, y2, layer='0'):
+    stream.write(f'0\nLINE\n8\n{layer}\n'
+                 f'10\n{_number(x1)}\n20\n{_number(y1)}\n30\n0\n'
+                 f'11\n{_number(x2)}\n21\n{_number(y2)}\n31\n0\n')
+
+
+def write_circle(stream, center_x, center_y, radius, layer='0'):
+    stream.write(f'0\nCIRCLE\n8\n{layer}\n'
+                 f'10\n{_number(center_x)}\n20\n{_number(center_y)}\n30\n0\n'
+                 f'40\n{_number(radius)}\n')
+
+
+def write_arc(stream, center_x, center_y, start_x, start_y, sweep, layer='0'):
+    """Write an arc given by its center, start point and counter-clockwise sweep in radians"""
+    radius = math.hypot(start_x - center_x, start_y - center_y)
+    start_angle = math.degrees(math.atan2(start_y - center_y, start_x - center_x)) % 360
+    end_angle = (start_angle + math.degrees(sweep)) % 360
+    stream.write(f'0\nARC\n8\n{layer}\n'
+                 f'10\n{_number(center_x)}\n20\n{_number(center_y)}\n30\n0\n'
+                 f'40\n{_number(radius)}\n'
+                 f'50\n{_number(start_angle)}\n51\n{_number(end_angle)}\n')
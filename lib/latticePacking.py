@@ -0,0 +1,257 @@
+"""
+Lattice packing of one irregular part for high quantities.
+
+A lattice layout repeats a cell, the part alone or the part together with a
+copy turned 180 degrees (a double lattice), along two vectors: u along the
+row and v from one row to the next. Copies never overlap when no lattice
+vector lies strictly inside the no-fit polygon of the cell with itself, so
+the rows are found by walking that self-NFP: u is the shortest free step
+along a row, and for every row shift the smallest free row height gives v.
+The lattice with the least area per part is then tiled over the sheet and
+clipped part by part to the usable area.
+
+Rows run along the x axis, so the lattice is rotated with the part (0 and 90
+degrees by default) rather than the sheet.
+"""
+
+import math
+from typing import NamedTuple, Tuple
+
+try:
+    from . import noFitPolygon
+except ImportError:
+    import noFitPolygon
+
+EPSILON = 1e-7
+
+# Row shifts sampled per row step before the best ones are refined
+LATTICE_SHIFT_SAMPLES = 48
+LATTICE_REFINE_ROUNDS = 3
+
+# Touching positions of the 180 degree copy tried per part angle
+LATTICE_PAIR_CANDIDATES = 12
+
+
+class Lattice(NamedTuple):
+    """
+    A periodic layout of one part
+
+    members -- (angle, dx, dy, width, height) of each part in the cell, dx and dy
+               being the lower-left corner of its rotated bounding box
+    u_x     -- Step along a row
+    v_x     -- Shift of each row along the row direction
+    v_y     -- Step from one row to the next
+    """
+    members: Tuple[Tuple[float, float, float, float, float], ...]
+    u_x: float
+    v_x: float
+    v_y: float
+
+    @property
+    def area_per_part(self):
+        return self.u_x * self.v_y / len(self.members)
+
+
+def _spans(pieces, bounds, x, axis):
+    """Open intervals where the line through x, across the given axis, is inside a piece"""
+    spans = []
+    other = 1 - axis
+    for (min_x, min_y, max_x, max_y), piece in zip(bounds, pieces):
+        low, high = (min_x, max_x) if axis == 0 else (min_y, max_y)
+        if not low + EPSILON < x < high - EPSILON:
+            continue
+        values = []
+        for i in range(len(piece)):
+            a, b = piece[i - 1], piece[i]
+            if (a[axis] - x) * (b[axis] - x) <= 0 and a[axis] != b[axis]:
+                values.append(a[other] + (x - a[axis]) * (b[other] - a[other]) / (b[axis] - a[axis]))
+        if len(values) >= 2:
+            spans.append((min(values), max(values)))
+    return spans
+
+
+def _smallest_free(spans, start):
+    """Smallest value at or above start that lies in none of the open spans"""
+    value = start
+    changed = True
+    while changed:
+        changed = False
+        for low, high in spans:
+            if low + EPSILON < value < high - EPSILON:
+                value = high
+                changed = True
+    return value
+
+
+def _row_step(nfp):
+    """Shortest u along the x axis with no multiple of it inside the NFP"""
+    pieces, bounds = nfp.pieces, nfp.bounds
+    first = _smallest_free(_spans(pieces, bounds, 0.0, 1), EPSILON)
+    spans = []
+    for k in range(1, int(math.ceil(nfp.extent[2] / first)) + 2):
+        spans.extend((low / k, high / k) for low, high in _spans(pieces, bounds, 0.0, 1))
+    return _smallest_free(spans, first)
+
+
+def _row_height(nfp, u_x, v_x, start):
+    """Smallest v_y at or above start for which no lattice point lies inside the NFP"""
+    pieces, bounds = nfp.pieces, nfp.bounds
+    min_x, _, max_x, max_y = nfp.extent
+    spans = []
+    for l in range(1, int(math.ceil(max_y / start)) + 2):
+        # Row l of the lattice passes x = l * v_x + k * u_x at height l * v_y
+        first = int(math.floor((min_x - l * v_x) / u_x))
+        last = int(math.ceil((max_x - l * v_x) / u_x))
+        for k in range(first, last + 1):
+            spans.extend((low / l, high / l) for low, high in _spans(pieces, bounds, l * v_x + k * u_x, 0))
+    return _smallest_free(spans, start)
+
+
+def _cell_lattice(members, pieces, spacing, area):
+    """Densest lattice with horizontal rows for a cell of members, or None"""
+    nfp = noFitPolygon.no_fit_polygon(pieces, pieces, spacing)
+    u_x = _row_step(nfp)
+    if u_x <= EPSILON:
+        return None
+
+    # Lattice cells hold the parts, so rows are at least this far apart
+    start = area / u_x
+
+    def height(v_x):
+        return _row_height(nfp, u_x, v_x % u_x, start)
+
+    shifts = [u_x * i / LATTICE_SHIFT_SAMPLES for i in range(LATTICE_SHIFT_SAMPLES)]
+    # Row shifts where the NFP has a vertex are where rows can nest deepest
+    shifts.extend(x % u_x for x, _ in nfp.candidates)
+    best_v_x = min(shifts, key=height)
+    step = u_x / LATTICE_SHIFT_SAMPLES
+    for _ in range(LATTICE_REFINE_ROUNDS):
+        # The current shift comes first so ties keep it
+        best_v_x = min((best_v_x + step * i / 4 for i in sorted(range(-4, 5), key=abs)), key=height)
+        step /= 4
+
+    return Lattice(tuple(members), u_x, best_v_x % u_x, height(best_v_x))
+
+
+def _shape(polygon, angle):
+    points, width, height = noFitPolygon.rotate_polygon(polygon, angle)
+    return noFitPolygon.convex_decomposition(points), width, height
+
+
+def find_lattices(polygon, spacing=0.0, angles=(0.0, 90.0), double=True):
+    """
+    Find the densest single and double lattices of a part
+
+    Args:
+        polygon: Outer loop of the part as (x, y) points
+        spacing: Smallest gap between parts
+        angles: Part angles to build lattices for; the rows run along x
+        double: Also try cells of the part and its 180 degree copy
+
+    Returns:
+        list: Lattice candidates, densest first
+    """
+    area = abs(noFitPolygon.signed_area(polygon))
+    lattices = []
+    for angle in angles:
+        pieces, width, height = _shape(polygon, angle)
+        lattice = _cell_lattice([(angle, 0.0, 0.0, width, height)], pieces, spacing, area)
+        if lattice is not None:
+            lattices.append(lattice)
+        if not double:
+            continue
+
+        # The copy turned 180 degrees is tried at the touching positions that keep the pair compact
+        turned_pieces, turned_width, turned_height = _shape(polygon, angle + 180)
+        pair_nfp = noFitPolygon.no_fit_polygon(pieces, turned_pieces, spacing)
+
+        def pair_extent(position):
+            x, y = position
+            return ((max(width, x + turned_width) - min(0.0, x)) *
+                    (max(height, y + turned_height) - min(0.0, y)))
+
+        positions = sorted(pair_nfp.candidates, key=pair_extent)[:LATTICE_PAIR_CANDIDATES]
+        for x, y in positions:
+            # Move the pair so its bounding box starts at the origin
+            shift_x, shift_y = max(0.0, -x), max(0.0, -y)
+            members = [(angle, shift_x, shift_y, width, height),
+                       ((angle + 180) % 360, x + shift_x, y + shift_y, turned_width, turned_height)]
+            cell_pieces = ([[(px + shift_x, py + shift_y) for px, py in piece] for piece in pieces] +
+                           [[(px + x + shift_x, py + y + shift_y) for px, py in piece] for piece in turned_pieces])
+            lattice = _cell_lattice(members, cell_pieces, spacing, 2 * area)
+            if lattice is not None:
+                lattices.append(lattice)
+
+    lattices.sort(key=lambda lattice: lattice.area_per_part)
+    return lattices
+
+
+def _member_range(position, step, size, limit):
+    """Indexes i with 0 <= position + i * step and position + i * step + size <= limit"""
+    return (int(math.ceil((-position - EPSILON) / step)),
+            int(math.floor((limit - size - position + EPSILON) / step)))
+
+
+def tile_lattice(lattice, width, height, origin_samples=8):
+    """
+    Tile a lattice over a rectangle and keep the parts that lie inside it
+
+    The lattice is shifted over one cell to find the offset that fits the most parts.
+
+    Args:
+        lattice: The Lattice to tile
+        width: Width of the rectangle
+        height: Height of the rectangle
+        origin_samples: Offsets tried along each lattice vector
+
+    Returns:
+        list: (angle, x, y) of the lower-left corner of each part's rotated
+              bounding box, lowest row first
+    """
+    def rows(origin_x, origin_y):
+        for angle, dx, dy, member_width, member_height in lattice.members:
+            first, last = _member_range(origin_y + dy, lattice.v_y, member_height, height)
+            for j in range(first, last + 1):
+                row_x = origin_x + dx + j * lattice.v_x
+                left, right = _member_range(row_x, lattice.u_x, member_width, width)
+                if right >= left:
+                    yield angle, row_x, origin_y + dy + j * lattice.v_y, left, right
+
+    best = None
+    for a in range(origin_samples):
+        for b in range(origin_samples):
+            origin = (lattice.u_x * a / origin_samples, lattice.v_y * b / origin_samples)
+            count = sum(right - left + 1 for _, _, _, left, right in rows(*origin))
+            if best is None or count > best[0]:
+                best = (count, origin)
+
+    if best is None:
+        return []
+    placements = [(angle, row_x + i * lattice.u_x, y)
+                  for angle, row_x, y, left, right in rows(*best[1]) for i in range(left, right + 1)]
+    placements.sort(key=lambda placement: (placement[2], placement[1]))
+    return placements
+
+
+def lattice_layout(polygon, width, height, spacing=0.0, angles=(0.0, 90.0), double=True, candidates=8):
+    """
+    Lay out as many copies of a part as fit in a rectangle on the best lattice
+
+    Args:
+        polygon: Outer loop of the part as (x, y) points
+        width: Width of the usable area
+        height: Height of the usable area
+        spacing: Smallest gap between parts
+        angles: Part angles to build lattices for
+        double: Also try cells of the part and its 180 degree copy
+        candidates: Densest lattices that are tiled to compare their counts
+
+    Returns:
+        list: (angle, x, y) placements as from tile_lattice
+    """
+    best = []
+    for lattice in find_lattices(polygon, spacing, angles, double)[:candidates]:
+        placements = tile_lattice(lattice, width, height)
+        if len(placements) > len(best):
+            best = placements
+    return best
@@ -1,10 +1,25 @@
 # This file can contain any custom nesting algorithm functions
 # that you might want to separate from the main command logic
 
+import bisect
+import heapq
+import itertools
 import math
-import adsk.core
-import adsk.fusion
-import traceback
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from . import noFitPolygon, occupancyGrid, pairClustering, partSnapshot, rectangleDecomposition
+except ImportError:
+    import noFitPolygon
+    import occupancyGrid
+    import pairClustering
+    import partSnapshot
+    import rectangleDecomposition
 
 def get_optimal_rotation(part_width, part_height, sheet_width_cm, sheet_height_cm, edge_clearance, gutter_size):
     """
@@ -28,111 +43,1233 @@ def get_optimal_rotation(part_width, part_height, sheet_width_cm, sheet_height_c
     else:
         return (False, parts_per_row_normal, parts_per_column_normal)
 
-def advanced_nesting(layout_sketch, selected_sketch, bbox, sheet_width_cm, sheet_height_cm, 
-                     edge_clearance, gutter_size, part_width, part_height, quantity):
+def capacity_sweep(part_width, part_height, sheet_sizes, edge_clearances, gutter_sizes, kerfs=(0.0,)):
     """
-    Perform advanced nesting with optimized placement and potential rotation
+    Count the parts per sheet for every combination of spacing settings
     
+    Uses the same grid formulas as get_optimal_rotation, evaluated for all
+    combinations in one NumPy pass when NumPy is available.
+    
+    Args:
+        part_width: Width of the part
+        part_height: Height of the part
+        sheet_sizes: Sequence of (sheet_width, sheet_height) pairs
+        edge_clearances: Edge clearances to try
+        gutter_sizes: Gutter sizes to try
+        kerfs: Kerf compensations to try, added to the part size
+        
     Returns:
-        tuple: (parts_placed, rotated_parts, parts_per_row, parts_per_column)
+        list: One row dict per combination with the settings, 'parts_per_sheet',
+              'rotated' and 'utilization' (part footprints, as a percentage)
     """
-    bbox_min_x, bbox_max_x, bbox_min_y, bbox_max_y = bbox
+    combinations = list(itertools.product(sheet_sizes, edge_clearances, gutter_sizes, kerfs))
+    if not combinations:
+        return []
     
-    # Check if rotating gives better yield
-    rotate_parts, parts_per_row, parts_per_column = get_optimal_rotation(
-        part_width, part_height, sheet_width_cm, sheet_height_cm, edge_clearance, gutter_size
-    )
+    if np is not None:
+        settings = np.array([(w, h, c, g, k) for (w, h), c, g, k in combinations], dtype=float)
+        sheet_width, sheet_height, edge_clearance, gutter_size, kerf = settings.T
+        width = part_width + kerf
+        height = part_height + kerf
+        usable_width = sheet_width - 2 * edge_clearance + gutter_size
+        usable_height = sheet_height - 2 * edge_clearance + gutter_size
+        
+        # Clip at zero so a sheet without room does not give a positive product of two negative counts
+        normal = (np.maximum(np.floor(usable_width / (width + gutter_size)), 0) *
+                  np.maximum(np.floor(usable_height / (height + gutter_size)), 0))
+        rotated = (np.maximum(np.floor(usable_width / (height + gutter_size)), 0) *
+                   np.maximum(np.floor(usable_height / (width + gutter_size)), 0))
+        counts = np.maximum(normal, rotated)
+        utilization = counts * width * height / (sheet_width * sheet_height) * 100
+        results = zip(counts.astype(int).tolist(), (rotated > normal).tolist(), utilization.tolist())
+    else:
+        results = []
+        for (sheet_width, sheet_height), edge_clearance, gutter_size, kerf in combinations:
+            should_rotate, parts_per_row, parts_per_column = get_optimal_rotation(
+                part_width + kerf, part_height + kerf, sheet_width, sheet_height, edge_clearance, gutter_size
+            )
+            count = max(0, parts_per_row) * max(0, parts_per_column)
+            area = (part_width + kerf) * (part_height + kerf)
+            results.append((count, should_rotate and count > 0, count * area / (sheet_width * sheet_height) * 100))
     
-    if rotate_parts:
-        # Swap dimensions for layout calculation
-        temp = part_width
-        part_width = part_height
-        part_height = temp
+    rows = []
+    for ((sheet_width, sheet_height), edge_clearance, gutter_size, kerf), (count, rotated, utilization) in \
+            zip(combinations, results):
+        rows.append({
+            'sheet_width': sheet_width,
+            'sheet_height': sheet_height,
+            'edge_clearance': edge_clearance,
+            'gutter_size': gutter_size,
+            'kerf': kerf,
+            'parts_per_sheet': count,
+            'rotated': rotated,
+            'utilization': utilization
+        })
+    return rows
+
+def capacity_pareto(rows):
+    """
+    Keep the sweep rows where more spacing would cost parts
     
-    # Make sure at least one part fits
-    parts_per_row = max(1, parts_per_row)
-    parts_per_column = max(1, parts_per_column)
+    A row is dropped when another row for the same sheet size and kerf fits
+    at least as many parts with at least as much edge clearance and gutter.
     
-    # Calculate total parts that can fit
-    max_parts = parts_per_row * parts_per_column
+    Args:
+        rows: Rows from capacity_sweep
+        
+    Returns:
+        list: The Pareto rows, by sheet size and kerf, most parts first
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['sheet_width'], row['sheet_height'], row['kerf']), []).append(row)
     
-    # Limit to requested quantity
-    parts_to_place = min(quantity, max_parts)
+    pareto = []
+    for key in sorted(groups):
+        # Most parts first, then most spacing, so a row can only be dominated by rows before it
+        candidates = sorted(groups[key], key=lambda r: (-r['parts_per_sheet'], -r['gutter_size'], -r['edge_clearance']))
+        kept = []
+        for row in candidates:
+            if not any(other['gutter_size'] >= row['gutter_size'] and other['edge_clearance'] >= row['edge_clearance']
+                       for other in kept):
+                kept.append(row)
+        pareto.extend(kept)
+    return pareto
+
+# Block patterns for identical parts, from simplest to most complex
+PATTERN_ONE_BLOCK = 'one-block'
+PATTERN_TWO_BLOCK = 'two-block'
+PATTERN_FOUR_BLOCK = 'four-block'
+PATTERN_FIVE_BLOCK = 'five-block'
+
+# Seconds the five-block search may take before the best pattern so far is used
+PATTERN_TIME_LIMIT = 0.5
+
+class _IdenticalPatternSolver:
+    """
+    Block pattern search for one rectangle size
+
+    A block is a region filled with a plain grid of parts in one orientation.
+    Block edges only need to sit on multiples of the part length or width, so
+    those are the only cut positions tried. Two-block results are memoized by
+    region size because the four-block search asks for them repeatedly.
+    """
+
+    def __init__(self, part_width, part_height):
+        self.part_width = part_width
+        self.part_height = part_height
+        self._two_block_cache = {}
+
+    def block(self, width, height):
+        """Best single grid for a region: (count, rotated, columns, rows)"""
+        if width <= EPSILON or height <= EPSILON:
+            return (0, False, 0, 0)
+
+        columns = math.floor((width + EPSILON) / self.part_width)
+        rows = math.floor((height + EPSILON) / self.part_height)
+        rotated_columns = math.floor((width + EPSILON) / self.part_height)
+        rotated_rows = math.floor((height + EPSILON) / self.part_width)
+        if rotated_columns * rotated_rows > columns * rows:
+            return (rotated_columns * rotated_rows, True, rotated_columns, rotated_rows)
+        return (columns * rows, False, columns, rows)
+
+    def cut_positions(self, length):
+        """Multiples of the part sides strictly inside a length"""
+        positions = set()
+        for side in (self.part_width, self.part_height):
+            count = 1
+            while count * side < length - EPSILON:
+                positions.add(round(count * side, 9))
+                count += 1
+        return sorted(positions)
+
+    def one_block(self, width, height):
+        count, rotated, _, _ = self.block(width, height)
+        return (count, [(0.0, 0.0, width, height, rotated)] if count else [])
+
+    def two_block(self, width, height):
+        """Best pattern of at most two blocks split by one cut"""
+        key = (round(width, 9), round(height, 9))
+        cached = self._two_block_cache.get(key)
+        if cached is not None:
+            return cached
+
+        best = self.one_block(width, height)
+        for x in self.cut_positions(width):
+            count = self.block(x, height)[0] + self.block(width - x, height)[0]
+            if count > best[0]:
+                best = (count, [(0.0, 0.0, x, height, self.block(x, height)[1]),
+                                (x, 0.0, width - x, height, self.block(width - x, height)[1])])
+        for y in self.cut_positions(height):
+            count = self.block(width, y)[0] + self.block(width, height - y)[0]
+            if count > best[0]:
+                best = (count, [(0.0, 0.0, width, y, self.block(width, y)[1]),
+                                (0.0, y, width, height - y, self.block(width, height - y)[1])])
+
+        self._two_block_cache[key] = best
+        return best
+
+    def four_block(self, width, height):
+        """Best pattern of two two-block patterns split by one cut"""
+        best = (0, [])
+        for x in self.cut_positions(width):
+            left = self.two_block(x, height)
+            right = self.two_block(width - x, height)
+            if left[0] + right[0] > best[0]:
+                best = (left[0] + right[0], left[1] + _shift_blocks(right[1], x, 0.0))
+        for y in self.cut_positions(height):
+            bottom = self.two_block(width, y)
+            top = self.two_block(width, height - y)
+            if bottom[0] + top[0] > best[0]:
+                best = (bottom[0] + top[0], bottom[1] + _shift_blocks(top[1], 0.0, y))
+        return best
+
+    def five_block(self, width, height, target, deadline=None):
+        """
+        Best pinwheel of four blocks around a center block
+
+        Blocks: bottom [0, x2] x [0, y1], right [x2, W] x [0, y2],
+        top [x1, W] x [y2, H], left [0, x1] x [y1, H] and center
+        [x1, x2] x [y1, y2], with x1 < x2 and y1 < y2. Stops early once
+        target parts are reached or the deadline passes.
+        """
+        xs = self.cut_positions(width)
+        ys = self.cut_positions(height)
+        block = self.block
+        part_area = self.part_width * self.part_height
+        best = (0, [])
+
+        for i, x1 in enumerate(xs):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            for x2 in xs[i + 1:]:
+                for j, y1 in enumerate(ys):
+                    bottom = block(x2, y1)[0]
+                    left = block(x1, height - y1)[0]
+
+                    # Skip when even a perfect fill of the rest cannot beat the best pattern
+                    rest_area = width * height - x2 * y1 - x1 * (height - y1)
+                    if bottom + left + math.floor((rest_area + EPSILON) / part_area) <= best[0]:
+                        continue
+
+                    for y2 in ys[j + 1:]:
+                        count = (bottom + left + block(width - x2, y2)[0] +
+                                 block(width - x1, height - y2)[0] + block(x2 - x1, y2 - y1)[0])
+                        if count > best[0]:
+                            regions = ((0.0, 0.0, x2, y1), (x2, 0.0, width - x2, y2),
+                                       (x1, y2, width - x1, height - y2), (0.0, y1, x1, height - y1),
+                                       (x1, y1, x2 - x1, y2 - y1))
+                            best = (count, [region + (block(region[2], region[3])[1],) for region in regions])
+                            if count >= target:
+                                return best
+        return best
+
+def _shift_blocks(blocks, dx, dy):
+    return [(x + dx, y + dy, width, height, rotated) for x, y, width, height, rotated in blocks]
+
+def solve_identical_rectangles(width, height, part_width, part_height, time_limit=PATTERN_TIME_LIMIT):
+    """
+    Find the block pattern that fits the most identical rectangles in a region
     
-    # Place the parts in the layout sketch
-    placed_parts = 0
+    Tries one-block (a plain grid), two-block, four-block and five-block
+    patterns and stops as soon as the area bound is reached. Mixing normal and
+    rotated blocks often fits a few more parts than either plain grid.
     
-    try:
-        for row in range(parts_per_column):
-            for col in range(parts_per_row):
-                if placed_parts >= parts_to_place:
-                    break
-                
-                # Calculate position for this part
-                pos_x = edge_clearance + col * (part_width + gutter_size)
-                pos_y = edge_clearance + row * (part_height + gutter_size)
-                
-                # Copy the sketch to the new position
-                copy_result = copy_sketch_to_position(
-                    layout_sketch, 
-                    selected_sketch,
-                    pos_x, 
-                    pos_y, 
-                    rotate_parts
-                )
-                
-                if copy_result:
-                    placed_parts += 1
-    except Exception as e:
-        adsk.core.Application.get().userInterface.messageBox(
-            f'Error placing parts: {str(e)}\n{traceback.format_exc()}'
-        )
+    Args:
+        width: Width of the region
+        height: Height of the region
+        part_width: Width of one part, including any gutter
+        part_height: Height of one part, including any gutter
+        time_limit: Seconds allowed for the five-block search, or None for no limit
+        
+    Returns:
+        tuple: (count, blocks, pattern) where blocks are (x, y, width, height, rotated)
+               regions, each filled from its lower-left corner with a grid of
+               parts in one orientation
+    """
+    if part_width <= 0 or part_height <= 0:
+        return (0, [], PATTERN_ONE_BLOCK)
+
+    solver = _IdenticalPatternSolver(part_width, part_height)
+    area_bound = math.floor((width * height + EPSILON) / (part_width * part_height))
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+    count, blocks = solver.one_block(width, height)
+    pattern = PATTERN_ONE_BLOCK
+    searches = (
+        (PATTERN_TWO_BLOCK, lambda: solver.two_block(width, height)),
+        (PATTERN_FOUR_BLOCK, lambda: solver.four_block(width, height)),
+        (PATTERN_FIVE_BLOCK, lambda: solver.five_block(width, height, area_bound, deadline))
+    )
+    for name, search in searches:
+        if count >= area_bound:
+            break
+        found = search()
+        if found[0] > count:
+            count, blocks = found
+            pattern = name
+
+    return (count, blocks, pattern)
+
+def expand_blocks(blocks, part_width, part_height):
+    """
+    Turn pattern blocks into part positions
     
-    return (placed_parts, rotate_parts, parts_per_row, parts_per_column)
+    Returns:
+        list: (x, y, rotated) of the lower-left corner of every part footprint
+    """
+    positions = []
+    for x, y, width, height, rotated in blocks:
+        step_x, step_y = (part_height, part_width) if rotated else (part_width, part_height)
+        columns = math.floor((width + EPSILON) / step_x)
+        rows = math.floor((height + EPSILON) / step_y)
+        for row in range(rows):
+            for column in range(columns):
+                positions.append((x + column * step_x, y + row * step_y, rotated))
+    return positions
+
+# Placement rules for the MaxRects packer. Each one picks the free rectangle
+# with the lowest score for the part being placed.
+MAXRECTS_BEST_SHORT_SIDE_FIT = 'best_short_side_fit'
+MAXRECTS_BEST_AREA_FIT = 'best_area_fit'
+MAXRECTS_BOTTOM_LEFT = 'bottom_left'
+MAXRECTS_CONTACT_POINT = 'contact_point'
+
+# Tolerance for comparing lengths in cm
+EPSILON = 1e-9
+
+class MaxRectsBin:
+    """
+    Maximal rectangles packer for a single bin
+
+    The free space is kept as a list of maximal free rectangles
+    (x, y, width, height), which may overlap each other. Placing a part splits
+    every free rectangle it overlaps into up to four pieces and drops the
+    pieces that lie inside another free rectangle.
+    """
+
+    def __init__(self, width, height, heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT):
+        if heuristic not in _MAXRECTS_SCORES:
+            raise ValueError(f"Unknown MaxRects heuristic: {heuristic}")
+
+        self.width = width
+        self.height = height
+        self.heuristic = heuristic
+        self.free_rects = [(0.0, 0.0, width, height)] if width > 0 and height > 0 else []
+        self.used_rects = []
 
-def copy_sketch_to_position(layout_sketch, source_sketch, target_x, target_y, rotate=False):
+        # Placed rectangles indexed by the rounded coordinate of each edge, so
+        # contact lengths only look at parts that can actually touch
+        self._edges = ({}, {}, {}, {})  # left x, right x, bottom y, top y
+
+    def find_position(self, width, height, allow_rotation=True):
+        """
+        Find the best free position for a part without placing it
+
+        Returns:
+            tuple: (score, x, y, width, height, rotated), or None if the part does not fit
+        """
+        score_position = _MAXRECTS_SCORES[self.heuristic]
+        orientations = [(width, height, False)]
+        if allow_rotation and abs(width - height) > EPSILON:
+            orientations.append((height, width, True))
+
+        best = None
+        for free_x, free_y, free_width, free_height in self.free_rects:
+            for part_width, part_height, rotated in orientations:
+                if part_width > free_width + EPSILON or part_height > free_height + EPSILON:
+                    continue
+                score = score_position(self, free_x, free_y, free_width, free_height, part_width, part_height)
+                if best is None or score < best[0]:
+                    best = (score, free_x, free_y, part_width, part_height, rotated)
+        return best
+
+    def insert(self, width, height, allow_rotation=True):
+        """
+        Place a part at its best free position
+
+        Returns:
+            tuple: (x, y, rotated), or None if the part does not fit
+        """
+        best = self.find_position(width, height, allow_rotation)
+        if best is None:
+            return None
+
+        _, x, y, part_width, part_height, rotated = best
+        self.place(x, y, part_width, part_height)
+        return (x, y, rotated)
+
+    def find_group_position(self, shapes):
+        """
+        Find the lowest, then leftmost, free position for a part made of rigidly linked rectangles
+
+        A part fits where every one of its rectangles lies inside a free
+        rectangle. Its lowest positions put one of its rectangles in the
+        lower-left corner of a free rectangle, so only those are tried.
+
+        Args:
+            shapes: (key, width, height, rects) for each orientation the part may take,
+                    rects being (x, y, width, height) from the lower-left corner of its
+                    width by height bounding box
+
+        Returns:
+            tuple: (x, y, key) of the bounding box, or None if the part does not fit
+        """
+        candidates = []
+        for free_x, free_y, free_width, free_height in self.free_rects:
+            for index, (key, width, height, rects) in enumerate(shapes):
+                for rect_x, rect_y, rect_width, rect_height in rects:
+                    if rect_width > free_width + EPSILON or rect_height > free_height + EPSILON:
+                        continue
+                    x = free_x - rect_x
+                    y = free_y - rect_y
+                    if (x < -EPSILON or y < -EPSILON or
+                            x + width > self.width + EPSILON or y + height > self.height + EPSILON):
+                        continue
+                    candidates.append((y + height, x, y, index))
+        candidates.sort()
+
+        for _, x, y, index in candidates:
+            key, _, _, rects = shapes[index]
+            if all(any(_contains(free, (x + rect_x, y + rect_y, rect_width, rect_height))
+                       for free in self.free_rects)
+                   for rect_x, rect_y, rect_width, rect_height in rects):
+                return (x, y, key)
+        return None
+
+    def insert_group(self, shapes):
+        """
+        Place a part made of rigidly linked rectangles at its lowest free position
+
+        Args:
+            shapes: Orientations of the part as for find_group_position
+
+        Returns:
+            tuple: (x, y, key) of the chosen orientation, or None if the part does not fit
+        """
+        position = self.find_group_position(shapes)
+        if position is None:
+            return None
+
+        x, y, key = position
+        rects = next(rects for shape_key, _, _, rects in shapes if shape_key == key)
+        for rect_x, rect_y, rect_width, rect_height in rects:
+            self.place(x + rect_x, y + rect_y, rect_width, rect_height)
+        return position
+
+    def place(self, x, y, width, height):
+        """Mark a rectangle as used and update the free rectangles"""
+        right = x + width
+        top = y + height
+
+        kept = []
+        pieces = []
+        for rect in self.free_rects:
+            free_x, free_y, free_width, free_height = rect
+            free_right = free_x + free_width
+            free_top = free_y + free_height
+
+            if (x >= free_right - EPSILON or right <= free_x + EPSILON or
+                    y >= free_top - EPSILON or top <= free_y + EPSILON):
+                kept.append(rect)
+                continue
+
+            # Keep the parts of the free rectangle left, right, below and above the part
+            if x > free_x + EPSILON:
+                pieces.append((free_x, free_y, x - free_x, free_height))
+            if right < free_right - EPSILON:
+                pieces.append((right, free_y, free_right - right, free_height))
+            if y > free_y + EPSILON:
+                pieces.append((free_x, free_y, free_width, y - free_y))
+            if top < free_top - EPSILON:
+                pieces.append((free_x, top, free_width, free_top - top))
+
+        self.free_rects = kept + _prune_free_rects(pieces, kept)
+        used = (x, y, width, height)
+        self.used_rects.append(used)
+        for index, coordinate in enumerate((x, right, y, top)):
+            self._edges[index].setdefault(_edge_key(coordinate), []).append(used)
+
+    def contact_length(self, x, y, width, height):
+        """Length of the rectangle's edges touching the bin border or placed parts"""
+        contact = 0.0
+        if abs(x) < EPSILON or abs(x + width - self.width) < EPSILON:
+            contact += height
+        if abs(y) < EPSILON or abs(y + height - self.height) < EPSILON:
+            contact += width
+
+        left_edges, right_edges, bottom_edges, top_edges = self._edges
+        for used_x, used_y, used_width, used_height in (right_edges.get(_edge_key(x), []) +
+                                                         left_edges.get(_edge_key(x + width), [])):
+            contact += max(0.0, min(y + height, used_y + used_height) - max(y, used_y))
+        for used_x, used_y, used_width, used_height in (top_edges.get(_edge_key(y), []) +
+                                                         bottom_edges.get(_edge_key(y + height), [])):
+            contact += max(0.0, min(x + width, used_x + used_width) - max(x, used_x))
+        return contact
+
+def _edge_key(coordinate):
+    return round(coordinate, 6)
+
+def _contains(outer, inner):
+    return (inner[0] >= outer[0] - EPSILON and inner[1] >= outer[1] - EPSILON and
+            inner[0] + inner[2] <= outer[0] + outer[2] + EPSILON and
+            inner[1] + inner[3] <= outer[1] + outer[3] + EPSILON)
+
+def _prune_free_rects(pieces, kept):
+    """
+    Drop split pieces that lie inside another free rectangle
+
+    The kept rectangles were maximal before the split and each piece lies
+    inside a rectangle that was removed, so a piece can never contain a kept
+    rectangle. Only the pieces need to be checked.
     """
-    Copy a sketch to a target position in the layout sketch
+    # Largest first, so a containing piece is always accepted before what it contains
+    pieces.sort(key=lambda rect: rect[2] * rect[3], reverse=True)
+
+    accepted = []
+    for piece in pieces:
+        if any(_contains(other, piece) for other in accepted):
+            continue
+        if any(_contains(other, piece) for other in kept):
+            continue
+        accepted.append(piece)
+    return accepted
+
+def _score_best_short_side_fit(packer, free_x, free_y, free_width, free_height, width, height):
+    leftover_x = free_width - width
+    leftover_y = free_height - height
+    return (min(leftover_x, leftover_y), max(leftover_x, leftover_y))
+
+def _score_best_area_fit(packer, free_x, free_y, free_width, free_height, width, height):
+    return (free_width * free_height - width * height, min(free_width - width, free_height - height))
+
+def _score_bottom_left(packer, free_x, free_y, free_width, free_height, width, height):
+    return (free_y + height, free_x)
+
+def _score_contact_point(packer, free_x, free_y, free_width, free_height, width, height):
+    return (-packer.contact_length(free_x, free_y, width, height), free_y, free_x)
+
+_MAXRECTS_SCORES = {
+    MAXRECTS_BEST_SHORT_SIDE_FIT: _score_best_short_side_fit,
+    MAXRECTS_BEST_AREA_FIT: _score_best_area_fit,
+    MAXRECTS_BOTTOM_LEFT: _score_bottom_left,
+    MAXRECTS_CONTACT_POINT: _score_contact_point,
+}
+
+class SkylineBin:
+    """
+    Skyline (envelope) packer for a single bin
+
+    The top edge of the packed parts is kept as a linked list of horizontal
+    segments plus a heap of the segments ordered by height. Parts are placed
+    bottom-left, at the segment start that gives the lowest top edge. Segments
+    are visited lowest first and the search stops once no lower top edge is
+    possible, so an insertion usually looks at a handful of segments instead
+    of the whole skyline.
+
+    With use_waste_map, the gaps left below parts that span lower segments are
+    kept as free rectangles and tried first for later parts.
+    """
+
+    def __init__(self, width, height, use_waste_map=False):
+        self.width = width
+        self.height = height
+
+        # Segment storage, indexed by segment id. Removed segments get version -1
+        self._x = []
+        self._y = []
+        self._width = []
+        self._prev = []
+        self._next = []
+        self._version = []
+        self._heap = []  # (y, x, segment id, version)
+        self._head = -1
+
+        self.waste_map = None
+        if use_waste_map:
+            self.waste_map = MaxRectsBin(width, height)
+            self.waste_map.free_rects = []  # Only wasted areas are free
+
+        if width > 0 and height > 0:
+            self._head = self._add_segment(0.0, 0.0, width, -1, -1)
+
+    def segments(self):
+        """Yield the skyline as (x, y, width) from left to right"""
+        index = self._head
+        while index >= 0:
+            yield (self._x[index], self._y[index], self._width[index])
+            index = self._next[index]
+
+    def insert(self, width, height, allow_rotation=True):
+        """
+        Place a part at its lowest, then leftmost, position
+
+        Returns:
+            tuple: (x, y, rotated), or None if the part does not fit
+        """
+        if self.waste_map is not None:
+            position = self.waste_map.insert(width, height, allow_rotation)
+            if position is not None:
+                return position
+
+        orientations = [(width, height, False)]
+        if allow_rotation and abs(width - height) > EPSILON:
+            orientations.append((height, width, True))
+
+        best = None
+        for part_width, part_height, rotated in orientations:
+            found = self._find_position(part_width, part_height)
+            if found is not None and (best is None or found[:2] < best[0][:2]):
+                best = (found, part_width, part_height, rotated)
+
+        if best is None:
+            return None
+
+        (top, x, index), part_width, part_height, rotated = best
+        self._place(index, part_width, part_height, top)
+        return (x, top - part_height, rotated)
+
+    def _add_segment(self, x, y, width, prev, next_index):
+        index = len(self._x)
+        self._x.append(x)
+        self._y.append(y)
+        self._width.append(width)
+        self._prev.append(prev)
+        self._next.append(next_index)
+        self._version.append(0)
+        heapq.heappush(self._heap, (y, x, index, 0))
+        return index
+
+    def _update_segment(self, index, x, width):
+        self._x[index] = x
+        self._width[index] = width
+        self._version[index] += 1
+        heapq.heappush(self._heap, (self._y[index], x, index, self._version[index]))
+
+    def _unlink(self, index):
+        prev = self._prev[index]
+        next_index = self._next[index]
+        if prev >= 0:
+            self._next[prev] = next_index
+        else:
+            self._head = next_index
+        if next_index >= 0:
+            self._prev[next_index] = prev
+        self._version[index] = -1
+
+    def _fit(self, index, width, height):
+        """Top edge of a part placed at the start of a segment, or None if it does not fit"""
+        x = self._x[index]
+        if x + width > self.width + EPSILON:
+            return None
+
+        base = 0.0
+        while True:
+            base = max(base, self._y[index])
+            if base + height > self.height + EPSILON:
+                return None
+            if self._x[index] + self._width[index] >= x + width - EPSILON:
+                return base + height
+            index = self._next[index]
+            if index < 0:
+                return None
+
+    def _find_position(self, width, height):
+        """Lowest (top, x, segment id) for a part, or None if it does not fit"""
+        heap = self._heap
+        version = self._version
+        best = None
+        visited = []
+
+        while heap:
+            y, x, index, entry_version = heap[0]
+            if entry_version != version[index]:
+                heapq.heappop(heap)
+                continue
+
+            # A part resting on this or any later segment cannot end lower
+            if best is not None and y + height > best[0] + EPSILON:
+                break
+
+            visited.append(heapq.heappop(heap))
+            top = self._fit(index, width, height)
+            if top is not None and (best is None or top < best[0] - EPSILON or
+                                    (top <= best[0] + EPSILON and x < best[1])):
+                best = (top, x, index)
+
+        for entry in visited:
+            heapq.heappush(heap, entry)
+        return best
+
+    def _place(self, index, width, height, top):
+        x = self._x[index]
+        right = x + width
+        base = top - height
+        prev = self._prev[index]
+
+        # Remove or trim the segments under the part
+        while index >= 0 and self._x[index] < right - EPSILON:
+            segment_x = self._x[index]
+            segment_y = self._y[index]
+            segment_right = segment_x + self._width[index]
+
+            if self.waste_map is not None and base - segment_y > EPSILON:
+                self.waste_map.free_rects.append(
+                    (segment_x, segment_y, min(segment_right, right) - segment_x, base - segment_y)
+                )
+
+            if segment_right > right + EPSILON:
+                self._update_segment(index, right, segment_right - right)
+                break
+
+            next_index = self._next[index]
+            self._version[index] = -1
+            index = next_index
+
+        placed = self._add_segment(x, top, width, prev, index)
+        if prev >= 0:
+            self._next[prev] = placed
+        else:
+            self._head = placed
+        if index >= 0:
+            self._prev[index] = placed
+
+        # Merge with neighbours at the same height
+        if prev >= 0 and abs(self._y[prev] - top) < EPSILON:
+            self._update_segment(prev, self._x[prev], self._width[prev] + width)
+            self._unlink(placed)
+            placed = prev
+        next_index = self._next[placed]
+        if next_index >= 0 and abs(self._y[next_index] - top) < EPSILON:
+            self._update_segment(placed, self._x[placed], self._width[placed] + self._width[next_index])
+            self._unlink(next_index)
+
+# Split rules for the guillotine packer. A split decides whether the leftover
+# space next to a placed part is cut off across the full width (horizontal) or
+# the full height (vertical) of the free rectangle.
+GUILLOTINE_SPLIT_SHORTER_AXIS = 'shorter_axis'
+GUILLOTINE_SPLIT_LONGER_AXIS = 'longer_axis'
+GUILLOTINE_SPLIT_MIN_AREA = 'min_area'
+
+CUT_HORIZONTAL = 'horizontal'
+CUT_VERTICAL = 'vertical'
+
+class GuillotineBin:
+    """
+    Guillotine packer for a single bin
+
+    Every placement splits its free rectangle with edge-to-edge cuts, so the
+    layout can always be cut on a panel saw. Free rectangles are chosen by best
+    area fit. Each free rectangle remembers the stage (number of cut direction
+    changes from the sheet) of the cut that produced it, so a stage limit can be
+    enforced while packing.
+
+    Merging joins free rectangles that share a full edge. It is not used
+    together with a stage limit, since a merged rectangle has no single stage.
+    """
+
+    def __init__(self, width, height, split_rule=GUILLOTINE_SPLIT_SHORTER_AXIS, merge=True, max_stages=None):
+        if split_rule not in (GUILLOTINE_SPLIT_SHORTER_AXIS, GUILLOTINE_SPLIT_LONGER_AXIS, GUILLOTINE_SPLIT_MIN_AREA):
+            raise ValueError(f"Unknown guillotine split rule: {split_rule}")
+
+        self.width = width
+        self.height = height
+        self.split_rule = split_rule
+        self.merge = merge and max_stages is None
+        self.max_stages = max_stages
+
+        # (x, y, width, height, stage, direction of the cut that produced it)
+        self.free_rects = [(0.0, 0.0, width, height, 0, None)] if width > 0 and height > 0 else []
+        self.used_rects = []
+
+    def insert(self, width, height, allow_rotation=True):
+        """
+        Place a part in the free rectangle it fills best
+
+        Returns:
+            tuple: (x, y, rotated), or None if the part does not fit
+        """
+        orientations = [(width, height, False)]
+        if allow_rotation and abs(width - height) > EPSILON:
+            orientations.append((height, width, True))
+
+        best = None
+        for index, rect in enumerate(self.free_rects):
+            free_x, free_y, free_width, free_height = rect[:4]
+            for part_width, part_height, rotated in orientations:
+                if part_width > free_width + EPSILON or part_height > free_height + EPSILON:
+                    continue
+                score = (free_width * free_height - part_width * part_height, free_y, free_x)
+                if best is not None and score >= best[0]:
+                    continue
+                if self.max_stages is not None and self._split(rect, part_width, part_height) is None:
+                    continue
+                best = (score, index, part_width, part_height, rotated)
+
+        if best is None:
+            return None
+
+        _, index, part_width, part_height, rotated = best
+        rect = self.free_rects[index]
+        self.free_rects[index] = self.free_rects[-1]
+        self.free_rects.pop()
+
+        for piece in self._split(rect, part_width, part_height):
+            self._add_free_rect(piece)
+        self.used_rects.append((rect[0], rect[1], part_width, part_height))
+        return (rect[0], rect[1], rotated)
+
+    def _prefers_horizontal_split(self, free_width, free_height, width, height):
+        if self.split_rule == GUILLOTINE_SPLIT_SHORTER_AXIS:
+            return free_width <= free_height
+        if self.split_rule == GUILLOTINE_SPLIT_LONGER_AXIS:
+            return free_width > free_height
+        # Keep the larger leftover whole by making the smaller one as small as possible
+        return width * (free_height - height) > (free_width - width) * height
+
+    def _split(self, rect, width, height):
+        """
+        Cut a part out of the lower-left corner of a free rectangle
+
+        Returns:
+            list: The leftover free rectangles, or None if every split needs more stages than allowed
+        """
+        free_x, free_y, free_width, free_height = rect[:4]
+        horizontal_first = self._prefers_horizontal_split(free_width, free_height, width, height)
+
+        for horizontal in (horizontal_first, not horizontal_first):
+            top_piece = (free_x, free_y + height, free_width if horizontal else width, free_height - height)
+            right_piece = (free_x + width, free_y, free_width - width, height if horizontal else free_height)
+            if horizontal:
+                cuts = ((CUT_HORIZONTAL, top_piece), (CUT_VERTICAL, right_piece))
+            else:
+                cuts = ((CUT_VERTICAL, right_piece), (CUT_HORIZONTAL, top_piece))
+
+            stage, direction = rect[4], rect[5]
+            pieces = []
+            for cut, piece in cuts:
+                # A cut is only needed when the part does not fill that side
+                if piece[2] <= EPSILON or piece[3] <= EPSILON:
+                    continue
+                if cut != direction:
+                    stage += 1
+                    direction = cut
+                pieces.append(piece + (stage, direction))
+
+            if self.max_stages is None or stage <= self.max_stages:
+                return pieces
+        return None
+
+    def _add_free_rect(self, piece):
+        if self.merge:
+            merged = True
+            while merged:
+                merged = False
+                x, y, width, height = piece[:4]
+                for index, other in enumerate(self.free_rects):
+                    other_x, other_y, other_width, other_height = other[:4]
+                    if (abs(other_x - x) < EPSILON and abs(other_width - width) < EPSILON and
+                            (abs(other_y + other_height - y) < EPSILON or abs(y + height - other_y) < EPSILON)):
+                        piece = (x, min(y, other_y), width, height + other_height, 0, None)
+                    elif (abs(other_y - y) < EPSILON and abs(other_height - height) < EPSILON and
+                            (abs(other_x + other_width - x) < EPSILON or abs(x + width - other_x) < EPSILON)):
+                        piece = (min(x, other_x), y, width + other_width, height, 0, None)
+                    else:
+                        continue
+
+                    self.free_rects[index] = self.free_rects[-1]
+                    self.free_rects.pop()
+                    merged = True
+                    break
+
+        self.free_rects.append(piece)
+
+def build_cut_tree(rects, region, cut_offset=0.0):
+    """
+    Describe how to cut a layout with edge-to-edge cuts
+
+    Every node cuts its region with parallel cuts, and the direction alternates
+    from one level to the next, so the depth of the tree is the number of
+    stages a panel saw needs.
+
+    Args:
+        rects: Placed rectangles (x, y, width, height); leaves refer to them by index
+        region: Area to cut (min_x, min_y, max_x, max_y)
+        cut_offset: Subtracted from every reported cut position, e.g. to cut in the middle of a gutter
+
+    Returns:
+        tuple: (cut_tree, stages), or None if the layout cannot be cut with guillotine cuts
+    """
+    items = [(x, y, width, height, index) for index, (x, y, width, height) in enumerate(rects)]
+
+    best = None
+    for direction in (CUT_VERTICAL, CUT_HORIZONTAL):
+        result = _cut_region(region, items, direction, cut_offset)
+        if result is not None and (best is None or result[1] < best[1]):
+            best = result
+    return best
+
+def _cut_region(region, items, direction, cut_offset):
+    min_x, min_y, max_x, max_y = region
+    node = {'x': min_x, 'y': min_y, 'width': max_x - min_x, 'height': max_y - min_y}
+
+    if not items:
+        node['part'] = None
+        return (node, 0)
+
+    if len(items) == 1:
+        x, y, width, height, index = items[0]
+        if (abs(x - min_x) < EPSILON and abs(y - min_y) < EPSILON and
+                abs(x + width - max_x) < EPSILON and abs(y + height - max_y) < EPSILON):
+            node['part'] = index
+            return (node, 0)
+
+    for cut in (direction, CUT_HORIZONTAL if direction == CUT_VERTICAL else CUT_VERTICAL):
+        positions = _full_span_cuts(region, items, cut)
+        if positions:
+            break
+    else:
+        return None
+
+    axis = 0 if cut == CUT_VERTICAL else 1
+    low, high = region[axis], region[axis + 2]
+    bounds = [low] + positions + [high]
+    next_direction = CUT_HORIZONTAL if cut == CUT_VERTICAL else CUT_VERTICAL
+
+    children = []
+    stages = 0
+    for start, end in zip(bounds, bounds[1:]):
+        strip_items = [item for item in items if start - EPSILON <= item[axis] < end - EPSILON]
+        if cut == CUT_VERTICAL:
+            strip = (start, min_y, end, max_y)
+        else:
+            strip = (min_x, start, max_x, end)
+
+        result = _cut_region(strip, strip_items, next_direction, cut_offset)
+        if result is None:
+            return None
+        children.append(result[0])
+        stages = max(stages, result[1])
+
+    node['direction'] = cut
+    node['cuts'] = [position - cut_offset for position in positions]
+    node['children'] = children
+    return (node, stages + 1)
+
+def _full_span_cuts(region, items, cut):
+    """Positions of the cuts across the whole region that do not cross any item"""
+    axis = 0 if cut == CUT_VERTICAL else 1
+    low, high = region[axis], region[axis + 2]
+    intervals = sorted((item[axis], item[axis] + item[axis + 2]) for item in items)
+
+    positions = []
+    reach = None
+    for start, end in intervals:
+        if reach is None:
+            if start > low + EPSILON:
+                positions.append(start)
+            reach = end
+        elif start >= reach - EPSILON:
+            positions.append(reach)
+            if start > reach + EPSILON:
+                positions.append(start)
+            reach = end
+        else:
+            reach = max(reach, end)
+
+    if reach < high - EPSILON:
+        positions.append(reach)
+    return positions
+
+# Limits of the two-stage knapsack solver before it falls back to MaxRects
+KNAPSACK_MAX_PART_TYPES = 10
+KNAPSACK_MAX_STATES = 20000
+KNAPSACK_TIME_LIMIT = 1.0
+
+class KnapsackStateLimit(Exception):
+    """Raised when the knapsack state space grows past its limits"""
+    pass
+
+class TwoStageKnapsack:
+    """
+    Two-stage guillotine knapsack for a few rectangular part types
+
+    The sheet is cut into horizontal strips, and each strip into parts placed
+    side by side (shorter parts are trimmed in a third pass). Strip contents
+    come from a bounded knapsack over strip width, the strip mix from a
+    knapsack over sheet height, in the style of Gilmore and Gomory. Both only
+    visit widths and heights that are sums of part sides and keep just the
+    states that are not dominated.
+
+    Strip fills are cached by strip height and the demand that can actually be
+    used in one strip. Large quantities all hit the same entries, so solving
+    the same sheet and parts again with other quantities reuses the tables.
+    """
+
+    def __init__(self, width, height, part_sizes, allow_rotation=True):
+        self.width = width
+        self.height = height
+        self.part_sizes = list(part_sizes)
+        self.allow_rotation = allow_rotation
+        self._strip_cache = {}
+
+        heights = set()
+        for part_width, part_height in self.part_sizes:
+            heights.add(round(part_height, 9))
+            if allow_rotation:
+                heights.add(round(part_width, 9))
+        self.strip_heights = sorted(h for h in heights if h <= height + EPSILON)
+
+    def solve(self, quantities, deadline=None):
+        """
+        Choose strips for the sheet
+
+        Args:
+            quantities: Demand per part type
+            deadline: time.perf_counter() value after which KnapsackStateLimit is raised
+
+        Returns:
+            list: (y, strip_height, items) strips, where items are (type_index, count, rotated)
+        """
+        demand = list(quantities)
+        strips = []
+        y = 0.0
+
+        while True:
+            remaining_height = self.height - y
+            options = []
+            for strip_height in self.strip_heights:
+                if strip_height > remaining_height + EPSILON:
+                    break
+                value, items = self.strip_fill(strip_height, demand, deadline)
+                if value > 0:
+                    options.append((strip_height, value, items))
+            if not options:
+                break
+
+            # Stack the strips as if demand allowed it, then commit only the
+            # densest one and plan the rest again with the reduced demand
+            chosen = self._stack_strips(options, remaining_height, deadline)
+            strip_height, value, items = max(chosen, key=lambda option: (option[1] / option[0], option[1]))
+
+            strips.append((y, strip_height, items))
+            for type_index, count, _ in items:
+                demand[type_index] -= count
+            y += strip_height
+
+        return strips
+
+    def strip_fill(self, strip_height, demand, deadline=None):
+        """
+        Best bounded knapsack fill of one strip
+
+        Returns:
+            tuple: (value, items) where items are (type_index, count, rotated)
+        """
+        candidates = []
+        for type_index, (part_width, part_height) in enumerate(self.part_sizes):
+            orientations = [(part_width, part_height, False)]
+            if self.allow_rotation:
+                orientations.append((part_height, part_width, True))
+            fitting = [o for o in orientations if o[1] <= strip_height + EPSILON and o[0] <= self.width + EPSILON]
+            if not fitting or demand[type_index] <= 0:
+                continue
+
+            # The narrowest orientation that fits the strip packs the same area in less width
+            width, _, rotated = min(fitting, key=lambda o: o[0])
+            usable = min(demand[type_index], math.floor((self.width + EPSILON) / width))
+            candidates.append((type_index, width, rotated, usable))
+
+        key = (strip_height, tuple((c[0], c[3]) for c in candidates))
+        cached = self._strip_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Pareto states (width, value, counts) with value rising as width rises
+        states = [(0.0, 0.0, ())]
+        for type_index, width, rotated, usable in candidates:
+            part_width, part_height = self.part_sizes[type_index]
+            area = part_width * part_height
+
+            # Binary splitting turns a bounded item into a few 0/1 items
+            chunk = 1
+            while usable > 0:
+                take = min(chunk, usable)
+                usable -= take
+                chunk *= 2
+
+                extended = [(state_width + take * width, value + take * area, counts + ((type_index, take, rotated),))
+                            for state_width, value, counts in states
+                            if state_width + take * width <= self.width + EPSILON]
+                states = _pareto_states(states + extended)
+                if len(states) > KNAPSACK_MAX_STATES:
+                    raise KnapsackStateLimit(f"{len(states)} strip states")
+            if deadline is not None and time.perf_counter() > deadline:
+                raise KnapsackStateLimit("time limit reached")
+
+        _, value, counts = states[-1]
+        merged = {}
+        for type_index, count, rotated in counts:
+            merged[(type_index, rotated)] = merged.get((type_index, rotated), 0) + count
+        result = (value, [(type_index, count, rotated) for (type_index, rotated), count in sorted(merged.items())])
+        self._strip_cache[key] = result
+        return result
+
+    def _stack_strips(self, options, height, deadline=None):
+        """Unbounded knapsack over strip heights; returns the chosen options"""
+        states = [(0.0, 0.0, ())]
+        frontier = list(states)
+        while frontier:
+            extended = []
+            for used, value, chosen in frontier:
+                for index, (strip_height, strip_value, _) in enumerate(options):
+                    # Options are added in a fixed order so each multiset is built once
+                    if chosen and index < chosen[-1]:
+                        continue
+                    if used + strip_height <= height + EPSILON:
+                        extended.append((used + strip_height, value + strip_value, chosen + (index,)))
+            states = _pareto_states(states + extended)
+            if len(states) > KNAPSACK_MAX_STATES:
+                raise KnapsackStateLimit(f"{len(states)} sheet states")
+            if deadline is not None and time.perf_counter() > deadline:
+                raise KnapsackStateLimit("time limit reached")
+            kept = set(states)
+            frontier = [state for state in extended if state in kept]
+
+        return [options[index] for index in states[-1][2]]
+
+def _pareto_states(states):
+    """Keep the states whose value beats every state of smaller or equal size"""
+    states.sort(key=lambda state: (state[0], -state[1]))
+    kept = []
+    for state in states:
+        if not kept or state[1] > kept[-1][1] + EPSILON:
+            kept.append(state)
+    return kept
+
+# Solvers of recent knapsack_nesting calls, keyed by sheet and part sizes
+_knapsack_solvers = {}
+KNAPSACK_SOLVER_CACHE_SIZE = 8
+
+def knapsack_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                     allow_rotation=True, time_limit=KNAPSACK_TIME_LIMIT):
+    """
+    Pack a few rectangular part types with a two-stage guillotine knapsack
+    
+    Falls back to bin_packing_nesting when there are too many part types, the
+    state space grows too large, or the time limit is reached.
     
     Args:
-        layout_sketch: The target sketch where parts will be placed
-        source_sketch: The sketch to copy
-        target_x: X position to place the part
-        target_y: Y position to place the part
-        rotate: Whether to rotate the part 90 degrees
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        parts_list: List of parts with their dimensions and quantities
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        allow_rotation: Allow parts to be turned by 90 degrees
+        time_limit: Seconds allowed for the knapsack, or None for no limit
         
     Returns:
-        bool: Success or failure
+        dict: Nesting solution with part placements, plus 'method' ('knapsack' or 'heuristic')
     """
+    if len(parts_list) > KNAPSACK_MAX_PART_TYPES:
+        return _knapsack_fallback(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size, allow_rotation)
+    
+    usable_width = sheet_width - 2 * edge_clearance + gutter_size
+    usable_height = sheet_height - 2 * edge_clearance + gutter_size
+    part_sizes = tuple((p['width'] + gutter_size, p['height'] + gutter_size) for p in parts_list)
+    
+    key = (usable_width, usable_height, part_sizes, allow_rotation)
+    solver = _knapsack_solvers.pop(key, None)
+    if solver is None:
+        solver = TwoStageKnapsack(usable_width, usable_height, part_sizes, allow_rotation)
+    _knapsack_solvers[key] = solver
+    while len(_knapsack_solvers) > KNAPSACK_SOLVER_CACHE_SIZE:
+        del _knapsack_solvers[next(iter(_knapsack_solvers))]
+    
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
     try:
-        # Get the sketch entities
-        entities = adsk.core.ObjectCollection.create()
-        
-        for curve in source_sketch.sketchCurves:
-            entities.add(curve)
-        for point in source_sketch.sketchPoints:
-            entities.add(point)
-        
-        # Create a transform to move the entities
-        transform = adsk.core.Matrix3D.create()
-        transform.translation = adsk.core.Vector3D.create(target_x, target_y, 0)
-        
-        # Add rotation if needed
-        if rotate:
-            rot_transform = adsk.core.Matrix3D.create()
-            rot_transform.setToRotation(math.pi/2, adsk.core.Vector3D.create(0, 0, 1), 
-                                       adsk.core.Point3D.create(target_x, target_y, 0))
-            transform.transformBy(rot_transform)
+        strips = solver.solve([p['quantity'] for p in parts_list], deadline)
+    except KnapsackStateLimit:
+        return _knapsack_fallback(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size, allow_rotation)
+    
+    solution = {
+        'utilization': 0,
+        'placements': [],
+        'unused_area': sheet_width * sheet_height,
+        'method': 'knapsack'
+    }
+    
+    used_area = 0
+    for y, _, items in strips:
+        x = 0.0
+        for type_index, count, rotated in items:
+            part = parts_list[type_index]
+            step = (part['height'] if rotated else part['width']) + gutter_size
+            for _ in range(count):
+                solution['placements'].append({
+                    'part_id': part['id'],
+                    'x': edge_clearance + x,
+                    'y': edge_clearance + y,
+                    'rotated': rotated
+                })
+                x += step
+            used_area += count * part['width'] * part['height']
+    
+    sheet_area = sheet_width * sheet_height
+    if sheet_area > 0:
+        solution['utilization'] = (used_area / sheet_area) * 100
+    solution['unused_area'] = sheet_area - used_area
+    
+    return solution
+
+def _knapsack_fallback(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size, allow_rotation):
+    solution = bin_packing_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                                   allow_rotation=allow_rotation)
+    solution['method'] = 'heuristic'
+    return solution
+
+def bin_packing_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                        heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT, allow_rotation=True):
+    """
+    Pack rectangular parts onto a sheet with the maximal rectangles algorithm
+    
+    A part may give 'rects', the rectangles of a rectilinear outline from
+    rectangleDecomposition.decompose. Those are placed together at their
+    lowest position, and the notches between them stay free for other parts.
+    
+    Args:
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        parts_list: List of parts with their dimensions and quantities, and optionally 'rects'
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        heuristic: One of the MAXRECTS_* placement rules, for parts without 'rects'
+        allow_rotation: Allow parts to be turned by 90 degrees
         
-        # Copy the entities to the target sketch
-        layout_sketch.copy(entities, transform)
-        return True
-    except:
-        return False
+    Returns:
+        dict: Nesting solution with part placements; placements of parts with 'rects'
+              also give their 'rotation' in degrees, a multiple of 90
+    """
+    # Every part reserves its gutter on the right and top, so the usable area
+    # grows by one gutter to let the last row and column reach the clearance
+    packer = MaxRectsBin(
+        sheet_width - 2 * edge_clearance + gutter_size,
+        sheet_height - 2 * edge_clearance + gutter_size,
+        heuristic
+    )
+    
+    # Sort parts by area (largest first)
+    sorted_parts = sorted(parts_list, key=lambda p: p['width'] * p['height'], reverse=True)
+    
+    return _pack_sheet(packer, sheet_width, sheet_height, sorted_parts, edge_clearance, gutter_size, allow_rotation)
 
-def bin_packing_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size):
+def skyline_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                    allow_rotation=True, use_waste_map=False):
     """
-    Implements a more advanced bin packing algorithm for nesting irregular parts
+    Pack rectangular parts onto a sheet with the skyline algorithm
+    
+    Much faster than bin_packing_nesting for tens of thousands of small parts,
+    such as labels or tiles, at a small cost in utilization for mixed sizes.
     
     Args:
         sheet_width: Width of the sheet
@@ -140,187 +1277,856 @@ def bin_packing_nesting(sheet_width, sheet_height, parts_list, edge_clearance, g
         parts_list: List of parts with their dimensions and quantities
         edge_clearance: Clearance from sheet edge
         gutter_size: Space between parts
+        allow_rotation: Allow parts to be turned by 90 degrees
+        use_waste_map: Reuse the gaps left below parts for later, smaller parts
         
     Returns:
         dict: Nesting solution with part placements
     """
-    # Placeholder for a more sophisticated bin packing algorithm
-    # This could implement algorithms like:
-    # - Guillotine cutting
-    # - Maximal rectangles approach
-    # - Genetic algorithm optimization
+    packer = SkylineBin(
+        sheet_width - 2 * edge_clearance + gutter_size,
+        sheet_height - 2 * edge_clearance + gutter_size,
+        use_waste_map
+    )
     
+    # Sort parts by their longer side, then by area (largest first)
+    sorted_parts = sorted(parts_list, key=lambda p: (max(p['width'], p['height']), p['width'] * p['height']),
+                          reverse=True)
+    
+    return _pack_sheet(packer, sheet_width, sheet_height, sorted_parts, edge_clearance, gutter_size, allow_rotation)
+
+def _pack_sheet(packer, sheet_width, sheet_height, sorted_parts, edge_clearance, gutter_size, allow_rotation):
+    """Insert every part copy into a packer and build the solution dict"""
     solution = {
         'utilization': 0,
         'placements': [],
         'unused_area': sheet_width * sheet_height
     }
     
-    # Sort parts by area (largest first)
-    sorted_parts = sorted(parts_list, key=lambda p: p['width'] * p['height'], reverse=True)
-    
-    # Simple implementation of next-fit decreasing height algorithm
-    x, y = edge_clearance, edge_clearance
-    max_height_in_row = 0
-    
+    used_area = 0
     for part in sorted_parts:
+        shapes = _part_shapes(part, gutter_size, allow_rotation)
         for _ in range(part['quantity']):
-            part_w = part['width']
-            part_h = part['height']
+            position = _insert_copy(packer, part, shapes, gutter_size, allow_rotation)
+            if position is None:
+                # Nothing changed since this copy failed, so further copies will not fit either
+                break
             
-            # Try normal orientation first
-            if x + part_w <= sheet_width - edge_clearance:
-                # Part fits in current row
-                solution['placements'].append({
-                    'part_id': part['id'],
-                    'x': x,
-                    'y': y,
-                    'rotated': False
-                })
-                x += part_w + gutter_size
-                max_height_in_row = max(max_height_in_row, part_h)
-            
-            # Try rotated orientation
-            elif x + part_h <= sheet_width - edge_clearance and y + part_w <= sheet_height - edge_clearance:
-                # Rotated part fits in current row
-                solution['placements'].append({
-                    'part_id': part['id'],
-                    'x': x,
-                    'y': y,
-                    'rotated': True
-                })
-                x += part_h + gutter_size
-                max_height_in_row = max(max_height_in_row, part_w)
-                
-            else:
-                # Start a new row
-                x = edge_clearance
-                y += max_height_in_row + gutter_size
-                max_height_in_row = 0
-                
-                # Check if we still have room vertically
-                if y + part_h > sheet_height - edge_clearance:
-                    # Cannot place any more parts
-                    break
-                    
-                # Place part in the new row
-                solution['placements'].append({
-                    'part_id': part['id'],
-                    'x': x,
-                    'y': y,
-                    'rotated': False
-                })
-                x += part_w + gutter_size
-                max_height_in_row = part_h
+            x, y, rotated, rotation = position
+            placement = {
+                'part_id': part['id'],
+                'x': edge_clearance + x,
+                'y': edge_clearance + y,
+                'rotated': rotated
+            }
+            if rotation is not None:
+                placement['rotation'] = rotation
+            solution['placements'].append(placement)
+            used_area += _part_area(part)
     
-    # Calculate utilization
-    used_area = 0
-    for part in sorted_parts:
-        part_area = part['width'] * part['height']
-        parts_placed = sum(1 for p in solution['placements'] if p['part_id'] == part['id'])
-        used_area += part_area * parts_placed
-        
     sheet_area = sheet_width * sheet_height
-    solution['utilization'] = (used_area / sheet_area) * 100
+    if sheet_area > 0:
+        solution['utilization'] = (used_area / sheet_area) * 100
     solution['unused_area'] = sheet_area - used_area
     
     return solution
 
-def calculate_sketch_bounding_box(sketch):
+def guillotine_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                       split_rule=GUILLOTINE_SPLIT_SHORTER_AXIS, merge=True, max_stages=None, allow_rotation=True):
     """
-    Calculate the bounding box of a sketch
+    Pack rectangular parts onto a sheet so the layout can be cut on a panel saw
     
     Args:
-        sketch: The Fusion 360 sketch to analyze
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        parts_list: List of parts with their dimensions and quantities
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts, cut through the middle
+        split_rule: One of the GUILLOTINE_SPLIT_* rules
+        merge: Join free rectangles that share a full edge
+        max_stages: Most changes of cut direction the saw may make, or None for no limit
+        allow_rotation: Allow parts to be turned by 90 degrees
         
     Returns:
-        tuple: (min_x, max_x, min_y, max_y) or None if sketch is empty
+        dict: Nesting solution with part placements, plus 'cut_tree' and 'stages', which
+              are None if no guillotine cut order was found for the layout
     """
-    try:
-        if not sketch:
+    usable_width = sheet_width - 2 * edge_clearance + gutter_size
+    usable_height = sheet_height - 2 * edge_clearance + gutter_size
+    sorted_parts = sorted(parts_list, key=lambda p: p['width'] * p['height'], reverse=True)
+    region = (edge_clearance, edge_clearance, edge_clearance + usable_width, edge_clearance + usable_height)
+    
+    for use_merge in ((True, False) if merge else (False,)):
+        packer = GuillotineBin(usable_width, usable_height, split_rule, use_merge, max_stages)
+        solution = _pack_sheet(packer, sheet_width, sheet_height, sorted_parts, edge_clearance, gutter_size,
+                               allow_rotation)
+        
+        # Merged free rectangles can, rarely, lead to a layout without a
+        # guillotine cut order. Pack again without merging in that case.
+        rects = [(edge_clearance + x, edge_clearance + y, width, height) for x, y, width, height in packer.used_rects]
+        result = build_cut_tree(rects, region, gutter_size / 2)
+        if result is not None:
+            break
+    
+    # Without merging every cut comes from a free rectangle split, so this is only a
+    # safeguard against rounding; the layout is still returned, without its cuts
+    solution['cut_tree'], solution['stages'] = result if result is not None else (None, None)
+    return solution
+
+def pattern_nesting(sheet_width, sheet_height, part_width, part_height, quantity, edge_clearance, gutter_size,
+                    part_id='part', time_limit=PATTERN_TIME_LIMIT):
+    """
+    Nest identical rectangular parts with the best block pattern
+    
+    Args:
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        part_width: Width of the part
+        part_height: Height of the part
+        quantity: Number of parts requested
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        part_id: Identifier stored on each placement
+        time_limit: Seconds allowed for the five-block search
+        
+    Returns:
+        dict: Nesting solution with part placements, plus 'pattern' and 'capacity'
+    """
+    usable_width = sheet_width - 2 * edge_clearance + gutter_size
+    usable_height = sheet_height - 2 * edge_clearance + gutter_size
+    count, blocks, pattern = solve_identical_rectangles(
+        usable_width, usable_height, part_width + gutter_size, part_height + gutter_size, time_limit
+    )
+    positions = expand_blocks(blocks, part_width + gutter_size, part_height + gutter_size)[:quantity]
+    
+    solution = {
+        'utilization': 0,
+        'placements': [{
+            'part_id': part_id,
+            'x': edge_clearance + x,
+            'y': edge_clearance + y,
+            'rotated': rotated
+        } for x, y, rotated in positions],
+        'unused_area': sheet_width * sheet_height,
+        'pattern': pattern,
+        'capacity': count
+    }
+    
+    sheet_area = sheet_width * sheet_height
+    used_area = len(positions) * part_width * part_height
+    if sheet_area > 0:
+        solution['utilization'] = (used_area / sheet_area) * 100
+    solution['unused_area'] = sheet_area - used_area
+    
+    return solution
+
+def _part_shapes(part, gutter_size, allow_rotation):
+    """
+    Orientations of a part made of rigidly linked rectangles, for MaxRectsBin.insert_group
+    
+    Like a plain part, every rectangle reserves the gutter on its right and top.
+    
+    Returns:
+        list: (angle, width, height, rects) per orientation, or None for a plain rectangular part
+    """
+    if not part.get('rects'):
+        return None
+    
+    shapes = []
+    for angle in ((0, 90, 180, 270) if allow_rotation else (0, 180)):
+        rects = rectangleDecomposition.rotate_rectangles(part['rects'], part['width'], part['height'], angle)
+        width, height = (part['height'], part['width']) if angle % 180 else (part['width'], part['height'])
+        shapes.append((angle, width + gutter_size, height + gutter_size,
+                       [(x, y, w + gutter_size, h + gutter_size) for x, y, w, h in rects]))
+    return shapes
+
+def _insert_copy(packer, part, shapes, gutter_size, allow_rotation):
+    """
+    Insert one copy of a part into a packer
+    
+    Parts made of rectangles keep them linked in a MaxRectsBin; other packers
+    place their bounding box.
+    
+    Returns:
+        tuple: (x, y, rotated, rotation), rotation being the angle in degrees of a part made
+               of rectangles and None for a plain part, or None if the copy does not fit
+    """
+    if shapes is not None and isinstance(packer, MaxRectsBin):
+        position = packer.insert_group(shapes)
+        if position is None:
             return None
+        x, y, angle = position
+        return (x, y, angle % 180 != 0, angle)
+    
+    position = packer.insert(part['width'] + gutter_size, part['height'] + gutter_size, allow_rotation)
+    if position is None:
+        return None
+    return position + (None,)
+
+def _part_area(part):
+    if part.get('rects'):
+        return sum(width * height for _, _, width, height in part['rects'])
+    return part['width'] * part['height']
+
+def multi_sheet_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                        heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT, allow_rotation=True, max_sheets=None):
+    """
+    Pack rectangular parts onto as many sheets as needed with MaxRects
+    
+    Each part goes to the first open sheet it fits on, so the space left on
+    earlier sheets is used before a new sheet is opened.
+    
+    Args:
+        sheet_width: Width of each sheet
+        sheet_height: Height of each sheet
+        parts_list: List of parts with their dimensions and quantities, and optionally
+                    'rects' as for bin_packing_nesting
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        heuristic: One of the MAXRECTS_* placement rules, for parts without 'rects'
+        allow_rotation: Allow parts to be turned by 90 degrees
+        max_sheets: Most sheets to open, or None for no limit
+        
+    Returns:
+        dict: Nesting solution over all sheets. 'placements' carry a 'sheet'
+              index, 'sheets' holds a solution dict per sheet, and 'unplaced'
+              counts the parts that did not fit, by part id
+    """
+    usable_width = sheet_width - 2 * edge_clearance + gutter_size
+    usable_height = sheet_height - 2 * edge_clearance + gutter_size
+    sorted_parts = sorted(parts_list, key=lambda p: p['width'] * p['height'], reverse=True)
+    
+    packers = []
+    sheets = []
+    unplaced = {}
+    for type_index, part in enumerate(sorted_parts):
+        shapes = _part_shapes(part, gutter_size, allow_rotation)
+        remaining = part['quantity']
+        
+        # Free space only shrinks, so a sheet this part no longer fits on is skipped from then on
+        open_sheets = list(range(len(packers)))
+        while remaining > 0:
+            position = None
+            while open_sheets and position is None:
+                position = _insert_copy(packers[open_sheets[0]], part, shapes, gutter_size, allow_rotation)
+                if position is None:
+                    open_sheets.pop(0)
+            
+            if position is None:
+                if max_sheets is not None and len(packers) >= max_sheets:
+                    break
+                packer = MaxRectsBin(usable_width, usable_height, heuristic)
+                position = _insert_copy(packer, part, shapes, gutter_size, allow_rotation)
+                if position is None:
+                    # Too large for an empty sheet
+                    break
+                packers.append(packer)
+                sheets.append({'placements': [], 'used_area': 0})
+                open_sheets.append(len(packers) - 1)
             
-        min_x = float('inf')
-        max_x = float('-inf')
-        min_y = float('inf')
-        max_y = float('-inf')
+            sheet_index = open_sheets[0]
+            x, y, rotated, rotation = position
+            placement = {
+                'part_id': part['id'],
+                'x': edge_clearance + x,
+                'y': edge_clearance + y,
+                'rotated': rotated,
+                'sheet': sheet_index
+            }
+            if rotation is not None:
+                placement['rotation'] = rotation
+            sheets[sheet_index]['placements'].append(placement)
+            sheets[sheet_index]['used_area'] += _part_area(part)
+            remaining -= 1
+        
+        if remaining > 0:
+            unplaced[part['id']] = unplaced.get(part['id'], 0) + remaining
+    
+    sheet_area = sheet_width * sheet_height
+    for sheet in sheets:
+        used_area = sheet.pop('used_area')
+        sheet['utilization'] = (used_area / sheet_area) * 100 if sheet_area > 0 else 0
+        sheet['unused_area'] = sheet_area - used_area
+    
+    total_area = sheet_area * len(sheets)
+    used_area = sum(sheet_area - sheet['unused_area'] for sheet in sheets)
+    return {
+        'utilization': (used_area / total_area) * 100 if total_area > 0 else 0,
+        'placements': [placement for sheet in sheets for placement in sheet['placements']],
+        'unused_area': total_area - used_area,
+        'sheets': sheets,
+        'sheets_required': len(sheets),
+        'unplaced': unplaced
+    }
+
+def pair_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                 heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT, max_sheets=None, angles=(0.0, 90.0),
+                 min_gain=pairClustering.PAIR_MIN_GAIN):
+    """
+    Pack irregular parts as interlocking pairs with MaxRects over as many sheets as needed
+    
+    Parts that save box area when paired, with their 180 degree copy or with
+    another part type, are packed as one rectangle per pair
+    (pairClustering.cluster_pairs), which halves the number of items the
+    packer has to place.
+    
+    Args:
+        sheet_width: Width of each sheet
+        sheet_height: Height of each sheet
+        parts_list: List of parts with 'id', 'polygon' (outer loop as (x, y) points) and 'quantity'
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        heuristic: One of the MAXRECTS_* placement rules
+        max_sheets: Most sheets to open, or None for no limit
+        angles: Angles of the first part of a pair to try
+        min_gain: Smallest fraction of the box area a pair must save
+        
+    Returns:
+        dict: Nesting solution as from multi_sheet_nesting, with placements of the single
+              parts; placements give the lower-left corner of the rotated part's bounding
+              box and the 'rotation' in degrees
+    """
+    items, pairs = pairClustering.cluster_pairs(parts_list, gutter_size, angles, min_gain)
+    solution = multi_sheet_nesting(sheet_width, sheet_height, items, edge_clearance, gutter_size,
+                                   heuristic, max_sheets=max_sheets)
+    
+    areas = {part['id']: abs(noFitPolygon.signed_area(part['polygon'])) for part in parts_list}
+    sheet_area = sheet_width * sheet_height
+    for sheet in solution['sheets']:
+        sheet['placements'] = pairClustering.expand_pairs(sheet['placements'], pairs)
+        used_area = sum(areas[placement['part_id']] for placement in sheet['placements'])
+        sheet['utilization'] = (used_area / sheet_area) * 100 if sheet_area > 0 else 0
+        sheet['unused_area'] = sheet_area - used_area
+    
+    unplaced = {}
+    for item_id, count in solution['unplaced'].items():
+        member_ids = [member[0] for member in pairs[item_id].members] if item_id in pairs else [item_id]
+        for member_id in member_ids:
+            unplaced[member_id] = unplaced.get(member_id, 0) + count
+    
+    total_area = sheet_area * len(solution['sheets'])
+    used_area = sum(sheet_area - sheet['unused_area'] for sheet in solution['sheets'])
+    solution.update({
+        'utilization': (used_area / total_area) * 100 if total_area > 0 else 0,
+        'placements': [placement for sheet in solution['sheets'] for placement in sheet['placements']],
+        'unused_area': total_area - used_area,
+        'unplaced': unplaced,
+        'pairs': sum(1 for placement in solution['placements'] if placement['part_id'] in pairs)
+    })
+    return solution
+
+def repeated_pattern_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                             heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT, allow_rotation=True, max_sheets=None):
+    """
+    Pack rectangular parts onto repeated sheet patterns
+    
+    A sheet is solved for the remaining demand and then repeated as often as
+    the demand allows, so an order of many sheets with the same part mix is
+    solved once plus a few remainder sheets.
+    
+    Args:
+        sheet_width: Width of each sheet
+        sheet_height: Height of each sheet
+        parts_list: List of parts with their dimensions and quantities
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        heuristic: One of the MAXRECTS_* placement rules
+        allow_rotation: Allow parts to be turned by 90 degrees
+        max_sheets: Most sheets to use, or None for no limit
+        
+    Returns:
+        dict: Nesting solution where 'patterns' holds a solution dict per distinct
+              sheet with its 'multiplicity', 'placements' lists each pattern's
+              placements once with a 'pattern' index, and 'unplaced' counts the
+              parts that did not fit, by part id
+    """
+    remaining = {part['id']: part['quantity'] for part in parts_list}
+    patterns = []
+    sheets_used = 0
+    
+    while any(count > 0 for count in remaining.values()):
+        if max_sheets is not None and sheets_used >= max_sheets:
+            break
+        
+        demand = [dict(part, quantity=remaining[part['id']]) for part in parts_list if remaining[part['id']] > 0]
+        pattern = bin_packing_nesting(sheet_width, sheet_height, demand, edge_clearance, gutter_size,
+                                      heuristic, allow_rotation)
+        if not pattern['placements']:
+            break
         
-        # Process sketch curves (lines, arcs, circles, etc.)
-        for curve in sketch.sketchCurves:
-            # Get the bounding box of each curve
-            bbox = curve.boundingBox
-            if not bbox:
+        counts = {}
+        for placement in pattern['placements']:
+            counts[placement['part_id']] = counts.get(placement['part_id'], 0) + 1
+        multiplicity = min(remaining[part_id] // count for part_id, count in counts.items())
+        if max_sheets is not None:
+            multiplicity = min(multiplicity, max_sheets - sheets_used)
+        
+        for part_id, count in counts.items():
+            remaining[part_id] -= count * multiplicity
+        pattern['multiplicity'] = multiplicity
+        for placement in pattern['placements']:
+            placement['pattern'] = len(patterns)
+        patterns.append(pattern)
+        sheets_used += multiplicity
+    
+    sheet_area = sheet_width * sheet_height
+    total_area = sheet_area * sheets_used
+    used_area = sum((sheet_area - pattern['unused_area']) * pattern['multiplicity'] for pattern in patterns)
+    return {
+        'utilization': (used_area / total_area) * 100 if total_area > 0 else 0,
+        'placements': [placement for pattern in patterns for placement in pattern['placements']],
+        'unused_area': total_area - used_area,
+        'patterns': patterns,
+        'sheets_required': sheets_used,
+        'unplaced': {part_id: count for part_id, count in remaining.items() if count > 0}
+    }
+
+# Objectives for choosing between stock sheet sizes
+STOCK_OBJECTIVE_AREA = 'area'
+STOCK_OBJECTIVE_COST = 'cost'
+
+def stock_selection_nesting(stock_list, parts_list, edge_clearance, gutter_size, objective=STOCK_OBJECTIVE_AREA,
+                            heuristic=MAXRECTS_BEST_SHORT_SIDE_FIT, allow_rotation=True, max_sheets=None):
+    """
+    Pack rectangular parts onto the cheapest mix of stock sheet sizes
+    
+    Each step packs the remaining parts onto one sheet of every stock size,
+    keeps the sheet with the most part area per unit of cost, and repeats it
+    while the demand allows (see repeated_pattern_nesting). Parts are sorted
+    and checked against each stock size once, so trying several sizes costs
+    little more than one.
+    
+    Args:
+        stock_list: List of stock sheets with 'id', 'width' and 'height', and
+                    optionally the 'cost' of one sheet and the 'quantity' in stock
+        parts_list: List of parts with their dimensions and quantities
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        objective: STOCK_OBJECTIVE_AREA to use the least sheet area, or
+                   STOCK_OBJECTIVE_COST to use the lowest total sheet cost, for
+                   which every stock sheet needs a 'cost'
+        heuristic: One of the MAXRECTS_* placement rules
+        allow_rotation: Allow parts to be turned by 90 degrees
+        max_sheets: Most sheets to use, or None for no limit
+        
+    Returns:
+        dict: Nesting solution like repeated_pattern_nesting, where every
+              pattern also names its 'stock' and sheet size, and 'total_cost'
+              is the area or cost of all sheets used
+        
+    Raises:
+        ValueError: If the cost objective is used and a stock sheet has no 'cost'
+    """
+    if objective == STOCK_OBJECTIVE_COST:
+        missing = [stock['id'] for stock in stock_list if stock.get('cost') is None]
+        if missing:
+            raise ValueError(f"Stock sheets without a cost: {', '.join(map(str, missing))}")
+    
+    sorted_parts = sorted(parts_list, key=lambda p: p['width'] * p['height'], reverse=True)
+    remaining = {part['id']: part['quantity'] for part in sorted_parts}
+    
+    # Part types too large for an empty sheet of a size never fit it, so they are skipped up front
+    candidates = []
+    for stock in stock_list:
+        usable_width = stock['width'] - 2 * edge_clearance + gutter_size
+        usable_height = stock['height'] - 2 * edge_clearance + gutter_size
+        fits = set()
+        for part in sorted_parts:
+            width = part['width'] + gutter_size
+            height = part['height'] + gutter_size
+            if (width <= usable_width + EPSILON and height <= usable_height + EPSILON) or \
+                    (allow_rotation and height <= usable_width + EPSILON and width <= usable_height + EPSILON):
+                fits.add(part['id'])
+        
+        area = stock['width'] * stock['height']
+        cost = stock['cost'] if objective == STOCK_OBJECTIVE_COST else area
+        candidates.append({'stock': stock, 'cost': cost, 'available': stock.get('quantity'), 'fits': fits})
+    
+    patterns = []
+    sheets_used = 0
+    while any(count > 0 for count in remaining.values()):
+        if max_sheets is not None and sheets_used >= max_sheets:
+            break
+        
+        best = None
+        for candidate in candidates:
+            if candidate['available'] is not None and candidate['available'] <= 0:
+                continue
+            demand = [dict(part, quantity=remaining[part['id']]) for part in sorted_parts
+                      if remaining[part['id']] > 0 and part['id'] in candidate['fits']]
+            if not demand:
                 continue
-                
-            # Update global bounds
-            min_x = min(min_x, bbox.minPoint.x)
-            max_x = max(max_x, bbox.maxPoint.x)
-            min_y = min(min_y, bbox.minPoint.y)
-            max_y = max(max_y, bbox.maxPoint.y)
-            
-        # Process sketch points
-        for point in sketch.sketchPoints:
-            geo = point.geometry
-            min_x = min(min_x, geo.x)
-            max_x = max(max_x, geo.x)
-            min_y = min(min_y, geo.y)
-            max_y = max(max_y, geo.y)
             
-        # Check if we found any geometry
-        if min_x == float('inf'):
-            return None
+            stock = candidate['stock']
+            packer = MaxRectsBin(
+                stock['width'] - 2 * edge_clearance + gutter_size,
+                stock['height'] - 2 * edge_clearance + gutter_size,
+                heuristic
+            )
+            pattern = _pack_sheet(packer, stock['width'], stock['height'], demand, edge_clearance, gutter_size,
+                                  allow_rotation)
+            if not pattern['placements']:
+                continue
             
-        return (min_x, max_x, min_y, max_y)
+            # Part area per unit of cost; ties go to the cheaper sheet
+            used_area = stock['width'] * stock['height'] - pattern['unused_area']
+            value = used_area / candidate['cost'] if candidate['cost'] > 0 else math.inf
+            if best is None or (value, -candidate['cost']) > best[0]:
+                best = ((value, -candidate['cost']), candidate, pattern)
         
-    except:
-        print(f"Error calculating bounding box: {traceback.format_exc()}")
+        if best is None:
+            break
+        
+        _, candidate, pattern = best
+        counts = {}
+        for placement in pattern['placements']:
+            counts[placement['part_id']] = counts.get(placement['part_id'], 0) + 1
+        multiplicity = min(remaining[part_id] // count for part_id, count in counts.items())
+        if max_sheets is not None:
+            multiplicity = min(multiplicity, max_sheets - sheets_used)
+        if candidate['available'] is not None:
+            multiplicity = min(multiplicity, candidate['available'])
+            candidate['available'] -= multiplicity
+        
+        for part_id, count in counts.items():
+            remaining[part_id] -= count * multiplicity
+        stock = candidate['stock']
+        pattern.update(stock=stock['id'], width=stock['width'], height=stock['height'], cost=candidate['cost'],
+                       multiplicity=multiplicity)
+        for placement in pattern['placements']:
+            placement['pattern'] = len(patterns)
+        patterns.append(pattern)
+        sheets_used += multiplicity
+    
+    total_area = sum(pattern['width'] * pattern['height'] * pattern['multiplicity'] for pattern in patterns)
+    unused_area = sum(pattern['unused_area'] * pattern['multiplicity'] for pattern in patterns)
+    return {
+        'utilization': ((total_area - unused_area) / total_area) * 100 if total_area > 0 else 0,
+        'placements': [placement for pattern in patterns for placement in pattern['placements']],
+        'unused_area': unused_area,
+        'patterns': patterns,
+        'sheets_required': sheets_used,
+        'total_cost': sum(pattern['cost'] * pattern['multiplicity'] for pattern in patterns),
+        'unplaced': {part_id: count for part_id, count in remaining.items() if count > 0}
+    }
+
+class HoleIndex:
+    """
+    Free space inside the holes of placed parts
+    
+    Every usable rectangle inside a hole is packed with its own MaxRectsBin.
+    The free rectangles of all of them are kept in one list sorted by width,
+    so a part only looks at the free rectangles wide enough for it, narrowest
+    first, and takes the first one that is also tall enough. Small parts end
+    up in the smallest hole that holds them and large holes stay free for
+    large parts.
+    """
+    
+    def __init__(self, spacing=0.0):
+        """
+        Args:
+            spacing: Gap kept between parts and from the hole edges
+        """
+        self.spacing = spacing
+        self.regions = []
+        self._free = []  # (width, height, region index) of every free rectangle, sorted
+    
+    def add_region(self, x, y, width, height):
+        """Add a rectangle that lies inside a hole; the spacing to the hole edge is kept inside it"""
+        # Parts reserve the spacing on their right and top, as in bin_packing_nesting
+        width -= self.spacing
+        height -= self.spacing
+        if width <= self.spacing + EPSILON or height <= self.spacing + EPSILON:
+            return
+        self.regions.append((x + self.spacing, y + self.spacing, MaxRectsBin(width, height)))
+        bisect.insort(self._free, (width, height, len(self.regions) - 1))
+    
+    def insert(self, width, height):
+        """
+        Place a part's bounding box in the narrowest free hole rectangle it fits
+        
+        Returns:
+            tuple: (x, y) of the lower-left corner of the box, or None if it fits no hole
+        """
+        width += self.spacing
+        height += self.spacing
+        for position in range(bisect.bisect_left(self._free, (width - EPSILON,)), len(self._free)):
+            free_width, free_height, index = self._free[position]
+            if free_height < height - EPSILON:
+                continue
+            
+            region_x, region_y, packer = self.regions[index]
+            x, y, _ = packer.insert(width, height, allow_rotation=False)
+            self._free = [entry for entry in self._free if entry[2] != index]
+            for _, _, rect_width, rect_height in packer.free_rects:
+                bisect.insort(self._free, (rect_width, rect_height, index))
+            return (region_x + x, region_y + y)
         return None
 
-def place_sketch_with_offset(target_sketch, source_sketch, x_offset, y_offset, bbox, rotate=False):
+def _hole_rectangles(polygon, holes, angle, smallest_side):
+    """
+    Usable rectangles inside a part's holes at an angle
+    
+    Rectangles are measured from the lower-left corner of the rotated outline's
+    bounding box. Loops inside a hole are islands of material and are kept out,
+    and holes narrower than smallest_side are skipped.
+    """
+    # The holes lie inside the outline, so rotating them together keeps the outline's box corner as the origin
+    points, _, _ = noFitPolygon.rotate_polygon(polygon + [point for hole in holes for point in hole], angle)
+    loops = []
+    start = len(polygon)
+    for hole in holes:
+        loops.append(points[start:start + len(hole)])
+        start += len(hole)
+    
+    containers = [[other for other in range(len(loops))
+                   if other != index and partSnapshot.point_in_polygon(loop[0][0], loop[0][1], loops[other])]
+                  for index, loop in enumerate(loops)]
+    rectangles = []
+    for index, loop in enumerate(loops):
+        # Loops inside an odd number of others are islands, not holes
+        if len(containers[index]) % 2:
+            continue
+        xs = [x for x, _ in loop]
+        ys = [y for _, y in loop]
+        if min(max(xs) - min(xs), max(ys) - min(ys)) < smallest_side:
+            continue
+        islands = [loops[other] for other in range(len(loops))
+                   if index in containers[other] and len(containers[other]) == len(containers[index]) + 1]
+        rectangles.extend(partSnapshot.inscribed_rectangles([loop] + islands))
+    return rectangles
+
+def nfp_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size, rotations=(0, 180),
+                nfp_cache=None):
     """
-    Copy a sketch to a target sketch with offset
+    Nest irregular parts by their true shape with no-fit polygons
+    
+    Parts are placed largest first, each copy at the lowest, then leftmost,
+    position any of its rotations can reach without overlapping the parts
+    already placed (bottom-left fill). Parts may list their 'holes'; large
+    rectangles inside the holes of placed parts are kept in a HoleIndex and
+    smaller parts go there before they take open sheet area.
     
     Args:
-        target_sketch: The target sketch to copy into
-        source_sketch: The source sketch to copy from
-        x_offset: The X offset to apply
-        y_offset: The Y offset to apply
-        bbox: The bounding box of the source sketch (min_x, max_x, min_y, max_y)
-        rotate: Whether to rotate the sketch 90 degrees
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        parts_list: List of parts with 'id', 'polygon' (outer loop as (x, y) points) and 'quantity',
+                    and optionally 'holes' (inner loops as lists of (x, y) points)
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        rotations: Angles in degrees, counter-clockwise, each part may be placed at; angles
+                   at which a part looks as at an earlier one are skipped
+        nfp_cache: Optional nfpCache.NfpCache to take NFPs from and store them in
         
     Returns:
-        bool: True if successful, False otherwise
+        dict: Nesting solution; placements give the lower-left corner of the rotated
+              outline's bounding box and the 'rotation' in degrees, and 'unplaced'
+              counts the parts that did not fit, by part id
     """
-    try:
-        app = adsk.core.Application.get()
-        design = app.activeProduct
-        
-        # Create a transform to apply to the copied entities
-        transform = adsk.core.Matrix3D.create()
-        
-        # Apply rotation if requested (around center of bounding box)
-        if rotate:
-            min_x, max_x, min_y, max_y = bbox
-            center_x = (min_x + max_x) / 2
-            center_y = (min_y + max_y) / 2
+    nfp_source = None
+    if nfp_cache is not None:
+        nfp_source = nfp_cache.source({part['id']: part['polygon'] for part in parts_list}, gutter_size)
+    packer = noFitPolygon.NfpPacker(sheet_width - 2 * edge_clearance, sheet_height - 2 * edge_clearance,
+                                    gutter_size, nfp_source)
+    holes = HoleIndex(gutter_size)
+    
+    parts = []
+    sizes = {}
+    for part in parts_list:
+        # Parts are ordered by the area they cover, holes included, and counted without their holes
+        outline_area = abs(noFitPolygon.signed_area(part['polygon']))
+        area = occupancyGrid.loops_area([part['polygon']] + list(part.get('holes', ())))
+        keys = []
+        # Turns under which the part looks the same would only repeat the search
+        for angle in partSnapshot.distinct_rotations([part['polygon']] + list(part.get('holes', ())), rotations):
+            key = (part['id'], angle)
+            points, width, height = noFitPolygon.rotate_polygon(part['polygon'], angle)
+            packer.add_shape(key, points)
+            if packer.fits(key):
+                keys.append(key)
+                sizes[key] = (width, height)
+        parts.append((outline_area, area, part, keys))
+    parts.sort(key=lambda item: item[0], reverse=True)
+    
+    # Holes that cannot take the smallest part with its spacing are not worth indexing
+    smallest_side = min((min(size) for size in sizes.values()), default=0.0) + 2 * gutter_size
+    hole_rectangles = {}
+    for _, _, part, keys in parts:
+        if part.get('holes'):
+            for key in keys:
+                hole_rectangles[key] = _hole_rectangles(part['polygon'], part['holes'], key[1], smallest_side)
+    
+    placements = []
+    unplaced = {}
+    used_area = 0
+    for _, area, part, keys in parts:
+        remaining = part['quantity']
+        while remaining > 0:
+            best = None
+            for key in keys:
+                position = holes.insert(*sizes[key])
+                if position is not None:
+                    best = (key, position)
+                    break
             
-            # Translate to origin, rotate, translate back
-            transform.translation = adsk.core.Vector3D.create(-center_x, -center_y, 0)
-            rot_transform = adsk.core.Matrix3D.create()
-            rot_transform.setToRotation(math.pi/2, adsk.core.Vector3D.create(0, 0, 1), adsk.core.Point3D.create(0, 0, 0))
-            transform.transformBy(rot_transform)
-            transform.translation = adsk.core.Vector3D.create(center_y, -center_x, 0)  # Swapped due to rotation
+            if best is None:
+                for key in keys:
+                    position = packer.find_position(key)
+                    if position is not None and (best is None or (position[1], position[0]) < (best[1][1], best[1][0])):
+                        best = (key, position)
+                if best is None:
+                    break
+                packer.place(best[0], *best[1])
+            
+            key, (x, y) = best
+            for hole_x, hole_y, hole_width, hole_height in hole_rectangles.get(key, ()):
+                holes.add_region(x + hole_x, y + hole_y, hole_width, hole_height)
+            placements.append({
+                'part_id': part['id'],
+                'x': edge_clearance + x,
+                'y': edge_clearance + y,
+                'rotation': key[1],
+                'rotated': key[1] % 180 != 0
+            })
+            used_area += area
+            remaining -= 1
         
-        # Apply the offset
-        if rotate:
-            transform.translation = adsk.core.Vector3D.create(x_offset, y_offset, 0)
-        else:
-            transform.translation = adsk.core.Vector3D.create(x_offset, y_offset, 0)
+        if remaining > 0:
+            unplaced[part['id']] = unplaced.get(part['id'], 0) + remaining
+    
+    sheet_area = sheet_width * sheet_height
+    return {
+        'utilization': (used_area / sheet_area) * 100 if sheet_area > 0 else 0,
+        'placements': placements,
+        'unused_area': sheet_area - used_area,
+        'unplaced': unplaced
+    }
+
+# Grid resolutions tried by raster_nesting, in cells across the smallest part side
+RASTER_LEVELS = (4, 8, 16, 32, 64, 128)
+RASTER_TIME_LIMIT = 5.0
+
+def raster_nesting(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                   rotations=(0, 90, 180, 270), resolutions=None, time_limit=RASTER_TIME_LIMIT, progress=None):
+    """
+    Nest parts of any shape on an occupancy grid, coarse to fine
+    
+    Each resolution is a complete bottom-left-fill layout of the parts drawn
+    as bitmasks, with holes left open for smaller parts. Coarse grids answer
+    quickly; finer grids let parts sit closer. The finest layout that fits
+    the most parts is returned, and a finer level is skipped once it would
+    likely run past the time limit. Requires NumPy (occupancyGrid.HAS_NUMPY).
+    
+    Args:
+        sheet_width: Width of the sheet
+        sheet_height: Height of the sheet
+        parts_list: List of parts with 'id', 'loops' (closed loops as (x, y) points) and 'quantity'
+        edge_clearance: Clearance from sheet edge
+        gutter_size: Space between parts
+        rotations: Angles in degrees, counter-clockwise, each part may be placed at; angles
+                   at which a part looks as at an earlier one are skipped
+        resolutions: Cell sizes to try, coarse first; derived from RASTER_LEVELS when None
+        time_limit: Seconds after which no finer level is started, or None for no limit
+        progress: Optional callable receiving the solution of each level as it is found
         
-        # Copy the sketch
-        target_sketch.copy(source_sketch, transform)
-        return True
+    Returns:
+        dict: Nesting solution; placements give the lower-left corner of the rotated
+              part's bounding box and the 'rotation' in degrees, 'unplaced' counts
+              the parts that did not fit, by part id, and 'resolution' is the cell size
+    """
+    if not parts_list:
+        # Nothing to draw, so no level runs and the empty solution below is returned
+        resolutions = ()
+    elif resolutions is None:
+        smallest = min(min(max(x for loop in part['loops'] for x, _ in loop) - min(x for loop in part['loops'] for x, _ in loop),
+                           max(y for loop in part['loops'] for _, y in loop) - min(y for loop in part['loops'] for _, y in loop))
+                       for part in parts_list)
+        resolutions = [smallest / level for level in RASTER_LEVELS if smallest > 0]
+    
+    # Turns under which a part looks the same would only repeat the search
+    part_rotations = {part['id']: partSnapshot.distinct_rotations(part['loops'], rotations) for part in parts_list}
+    
+    start = time.perf_counter()
+    best = None
+    level_time = 0.0
+    for resolution in resolutions:
+        elapsed = time.perf_counter() - start
+        # Halving the cell size makes a level about four times slower
+        if best is not None and time_limit is not None and elapsed + 4 * level_time > time_limit:
+            break
+        
+        level_start = time.perf_counter()
+        solution = _raster_level(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size,
+                                 part_rotations, resolution)
+        level_time = time.perf_counter() - level_start
+        if best is None or len(solution['placements']) >= len(best['placements']):
+            best = solution
+        if progress is not None:
+            progress(solution)
+    
+    if best is None:
+        sheet_area = sheet_width * sheet_height
+        return {
+            'utilization': 0,
+            'placements': [],
+            'unused_area': sheet_area,
+            'unplaced': {part['id']: part['quantity'] for part in parts_list if part['quantity'] > 0},
+            'resolution': None
+        }
+    return best
+
+def _raster_level(sheet_width, sheet_height, parts_list, edge_clearance, gutter_size, part_rotations, resolution):
+    usable_width = sheet_width - 2 * edge_clearance
+    usable_height = sheet_height - 2 * edge_clearance
+    packer = occupancyGrid.GridPacker(max(0, int(math.floor(usable_height / resolution + EPSILON))),
+                                      max(0, int(math.floor(usable_width / resolution + EPSILON))))
+    
+    parts = []
+    for part in parts_list:
+        keys = []
+        for angle in part_rotations[part['id']]:
+            key = (part['id'], angle)
+            mask, _ = occupancyGrid.rasterize(part['loops'], angle, resolution)
+            grown_mask, margin = occupancyGrid.rasterize(part['loops'], angle, resolution, gutter_size)
+            packer.add_shape(key, mask, grown_mask, margin)
+            keys.append(key)
+        parts.append((occupancyGrid.loops_area(part['loops']), part, keys))
+    parts.sort(key=lambda item: item[0], reverse=True)
+    
+    placements = []
+    unplaced = {}
+    used_area = 0
+    for area, part, keys in parts:
+        remaining = part['quantity']
+        while remaining > 0:
+            best = None
+            for key in keys:
+                position = packer.find_position(key)
+                if position is not None and (best is None or position < best[1]):
+                    best = (key, position)
+            if best is None:
+                break
+            
+            key, (row, column) = best
+            packer.place(key, row, column)
+            placements.append({
+                'part_id': part['id'],
+                'x': edge_clearance + column * resolution,
+                'y': edge_clearance + row * resolution,
+                'rotation': key[1],
+                'rotated': key[1] % 180 != 0
+            })
+            used_area += area
+            remaining -= 1
         
-    except:
-        print(f"Error placing sketch: {traceback.format_exc()}")
-        return False
+        if remaining > 0:
+            unplaced[part['id']] = unplaced.get(part['id'], 0) + remaining
+    
+    sheet_area = sheet_width * sheet_height
+    return {
+        'utilization': (used_area / sheet_area) * 100 if sheet_area > 0 else 0,
+        'placements': placements,
+        'unused_area': sheet_area - used_area,
+        'unplaced': unplaced,
+        'resolution': resolution
+    }
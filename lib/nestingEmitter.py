@@ -0,0 +1,544 @@
+"""
+Fusion-side emission of placement plans.
+
+nestingPlanner decides where every part goes; this module turns such a plan
+into sketch entities. It is the only part of the nesting library that talks
+to the Fusion 360 API.
+"""
+
+import math
+import os
+import tempfile
+import time
+import adsk
+import adsk.core
+import adsk.fusion
+
+try:
+    from . import dxfWriter, nestingPlanner, partSnapshot, transformKernel
+except ImportError:
+    import dxfWriter
+    import nestingPlanner
+    import partSnapshot
+    import transformKernel
+
+
+def capture_snapshot(sketch):
+    """
+    Read the curves of a sketch once into a PartSnapshot
+
+    Args:
+        sketch: The Fusion 360 sketch holding the part
+
+    Returns:
+        PartSnapshot: The captured geometry
+    """
+    snapshot = partSnapshot.PartSnapshot()
+
+    for curve in sketch.sketchCurves:
+        try:
+            if curve.objectType == adsk.fusion.SketchLine.classType():
+                line = adsk.fusion.SketchLine.cast(curve)
+                start = line.startSketchPoint.geometry
+                end = line.endSketchPoint.geometry
+                snapshot.add_line(start.x, start.y, end.x, end.y)
+
+            elif curve.objectType == adsk.fusion.SketchCircle.classType():
+                circle = adsk.fusion.SketchCircle.cast(curve)
+                center = circle.centerSketchPoint.geometry
+                snapshot.add_circle(center.x, center.y, circle.radius)
+
+            elif curve.objectType == adsk.fusion.SketchArc.classType():
+                arc = adsk.fusion.SketchArc.cast(curve)
+                center = arc.centerSketchPoint.geometry
+                start = arc.startSketchPoint.geometry
+                end = arc.endSketchPoint.geometry
+                snapshot.add_arc(center.x, center.y, start.x, start.y,
+                                 arc_sweep(center.x, center.y, start.x, start.y, end.x, end.y))
+
+            elif curve.objectType == adsk.fusion.SketchFittedSpline.classType():
+                spline = adsk.fusion.SketchFittedSpline.cast(curve)
+                snapshot.add_spline([(p.geometry.x, p.geometry.y) for p in spline.fitPoints])
+        except:
+            continue  # Skip curves we cannot read
+
+    return snapshot
+
+
+# Number of sketch entities written between UI updates
+ENTITIES_PER_CHUNK = 500
+
+
+class LayoutWriter:
+    """
+    Write a plan into a sketch in chunks, with progress and cancellation
+
+    The sketch recompute is deferred while writing and Fusion gets a chance to
+    process events between chunks. Cancelling stops after the current part, so
+    the layout only ever contains complete parts.
+    """
+
+    def __init__(self, layout_sketch, title='Advanced Nesting', show_progress=True,
+                 entities_per_chunk=ENTITIES_PER_CHUNK):
+        self.layout_sketch = layout_sketch
+        self.title = title
+        self.show_progress = show_progress
+        self.entities_per_chunk = entities_per_chunk
+        self.parts_written = 0
+        self.cancelled = False
+
+    def write(self, snapshot, plan):
+        """
+        Create the sketch geometry for every placement of a plan
+
+        Args:
+            snapshot: PartSnapshot of the part being placed
+            plan: A nestingPlanner.PlacementPlan
+
+        Returns:
+            int: Number of parts written
+        """
+        total = len(plan.placements)
+        self.parts_written = 0
+        self.cancelled = False
+        if total == 0:
+            return 0
+
+        # Transform every placement at once; emission is then only API calls
+        placed_geometry = transformKernel.transform_snapshot(snapshot, plan.part_bbox, plan.layout_positions())
+        chunk_size = max(1, self.entities_per_chunk // max(1, snapshot.curve_count))
+
+        progress = None
+        if self.show_progress and total > chunk_size:
+            progress = adsk.core.Application.get().userInterface.createProgressDialog()
+            progress.isCancelButtonShown = True
+            progress.show(self.title, f'Placing {total} parts...', 0, total, 1)
+
+        was_deferred = self.layout_sketch.isComputeDeferred
+        self.layout_sketch.isComputeDeferred = True
+        start_time = time.perf_counter()
+        try:
+            for chunk_start in range(0, total, chunk_size):
+                for i in range(chunk_start, min(chunk_start + chunk_size, total)):
+                    if emit_part(self.layout_sketch, placed_geometry.lines[i], placed_geometry.circles[i],
+                                 placed_geometry.arcs[i], placed_geometry.splines[i]):
+                        self.parts_written += 1
+
+                if progress:
+                    done = min(chunk_start + chunk_size, total)
+                    elapsed = time.perf_counter() - start_time
+                    remaining = elapsed / done * (total - done)
+                    progress.progressValue = done
+                    progress.message = f'Placed {done} of {total} parts, about {remaining:.0f}s remaining'
+
+                adsk.doEvents()
+                if progress and progress.wasCancelled:
+                    self.cancelled = True
+                    break
+        finally:
+            self.layout_sketch.isComputeDeferred = was_deferred
+            if progress:
+                progress.hide()
+
+        return self.parts_written
+
+
+def emit_plan(layout_sketch, snapshot, plan):
+    """
+    Create the sketch geometry for every placement of a plan
+
+    Args:
+        layout_sketch: The target sketch where parts will be placed
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+
+    Returns:
+        int: Number of parts emitted
+    """
+    return LayoutWriter(layout_sketch, show_progress=False).write(snapshot, plan)
+
+
+# Layouts with at least this many entities are imported from a DXF file
+# until measured timings say otherwise
+BULK_IMPORT_MIN_ENTITIES = 2000
+
+EMIT_PATH_ENTITIES = 'entities'
+EMIT_PATH_DXF = 'dxf'
+
+
+class EmissionTimings:
+    """
+    Measured speed of the per-entity and DXF import emission paths
+
+    Each path is modelled as a fixed overhead plus a cost per entity, fitted
+    to the samples recorded so far. Once both paths have been measured the one
+    predicted to be faster for a given entity count is chosen.
+    """
+
+    def __init__(self, bulk_import_min_entities=BULK_IMPORT_MIN_ENTITIES):
+        self.bulk_import_min_entities = bulk_import_min_entities
+        self.samples = {EMIT_PATH_ENTITIES: [], EMIT_PATH_DXF: []}
+
+    def record(self, path, entity_count, seconds):
+        self.samples[path].append((entity_count, seconds))
+
+    def estimate(self, path, entity_count):
+        """Predicted seconds for a path, or None without enough measurements"""
+        samples = self.samples[path]
+        if not samples:
+            return None
+        if len(samples) == 1 or len(set(n for n, _ in samples)) == 1:
+            # A single size only tells us the average cost per entity
+            per_entity = sum(t for _, t in samples) / max(1, sum(n for n, _ in samples))
+            return per_entity * entity_count
+
+        # Least-squares fit of seconds = overhead + per_entity * entities
+        count = len(samples)
+        mean_n = sum(n for n, _ in samples) / count
+        mean_t = sum(t for _, t in samples) / count
+        variance = sum((n - mean_n) ** 2 for n, _ in samples)
+        per_entity = sum((n - mean_n) * (t - mean_t) for n, t in samples) / variance
+        overhead = mean_t - per_entity * mean_n
+        return max(0.0, overhead + per_entity * entity_count)
+
+    def choose(self, entity_count):
+        """Pick the emission path expected to be fastest for a layout size"""
+        entities_time = self.estimate(EMIT_PATH_ENTITIES, entity_count)
+        dxf_time = self.estimate(EMIT_PATH_DXF, entity_count)
+        if entities_time is not None and dxf_time is not None:
+            return EMIT_PATH_DXF if dxf_time < entities_time else EMIT_PATH_ENTITIES
+        return EMIT_PATH_DXF if entity_count >= self.bulk_import_min_entities else EMIT_PATH_ENTITIES
+
+
+# Timings shared by every command run in this session
+emission_timings = EmissionTimings()
+
+
+def import_plan_dxf(component, snapshot, plan):
+    """
+    Create a layout sketch for a plan with a single DXF import
+
+    Lines, circles and arcs are streamed to a temporary DXF file and imported
+    in one call. Fitted splines have no R12 DXF equivalent and are added to
+    the imported sketch entity by entity.
+
+    Args:
+        component: Component that receives the layout sketch
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+
+    Returns:
+        tuple: (layout_sketch, parts_written), or (None, 0) if the import failed; parts whose
+               splines could not be added are not counted
+    """
+    placed_geometry = transformKernel.transform_snapshot(snapshot, plan.part_bbox, plan.layout_positions())
+
+    file_descriptor, dxf_path = tempfile.mkstemp(suffix='.dxf', prefix='nesting_layout_')
+    try:
+        with os.fdopen(file_descriptor, 'w') as stream:
+            dxfWriter.write_dxf(stream, placed_geometry)
+
+        # The file is in millimetres, which Fusion assumes for a DXF without units
+        import_manager = adsk.core.Application.get().importManager
+        options = import_manager.createDXF2DImportOptions(dxf_path, component.xYConstructionPlane)
+        options.isSingleSketchResult = True
+
+        sketch_count = component.sketches.count
+        if not import_manager.importToTarget(options, component) or component.sketches.count == sketch_count:
+            return None, 0
+        layout_sketch = component.sketches.item(component.sketches.count - 1)
+    finally:
+        os.remove(dxf_path)
+
+    parts_written = plan.parts_placed
+    if snapshot.spline_count:
+        layout_sketch.isComputeDeferred = True
+        try:
+            parts_written = sum(1 for splines in placed_geometry.splines
+                                if emit_part(layout_sketch, [], [], [], splines))
+        finally:
+            layout_sketch.isComputeDeferred = False
+
+    return layout_sketch, parts_written
+
+
+def export_sheet_dxfs(directory, snapshot, plan, base_name='nesting'):
+    """
+    Write one DXF file per distinct sheet layout
+
+    Each file holds its sheet in sheet coordinates, in millimetres. A layout that is cut
+    several times is written once, with the count in the file name.
+
+    Args:
+        directory: Folder to write the files to
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+        base_name: Start of every file name
+
+    Returns:
+        list: (path, multiplicity) per sheet layout
+    """
+    by_sheet = {}
+    for placement in plan.placements:
+        by_sheet.setdefault(placement.sheet, []).append(placement)
+
+    exported = []
+    for sheet_index in sorted(by_sheet):
+        multiplicity = plan.multiplicity(sheet_index)
+        file_name = f"{base_name}_sheet{sheet_index + 1}"
+        if multiplicity > 1:
+            file_name += f"_x{multiplicity}"
+        path = os.path.join(directory, file_name + '.dxf')
+
+        placed_geometry = transformKernel.transform_snapshot(
+            snapshot, plan.part_bbox, [(p.x, p.y, p.rotation) for p in by_sheet[sheet_index]]
+        )
+        with open(path, 'w') as stream:
+            dxfWriter.write_dxf(stream, placed_geometry)
+        exported.append((path, multiplicity))
+
+    return exported
+
+
+# Most sketch entities written into one layout sketch
+SKETCH_ENTITY_BUDGET = 5000
+
+
+def write_layout_sketches(component, snapshot, plan, name, max_entities=SKETCH_ENTITY_BUDGET):
+    """
+    Write a plan into one or more layout sketches
+
+    Fusion sketches slow down sharply past a few thousand entities, so the
+    layout is split per sheet and per entity budget within a sheet. The
+    sketches are grouped in the timeline under the layout name so the layout
+    still reads as one unit.
+
+    Args:
+        component: Component that receives the layout sketches
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+        name: Base name of the layout
+        max_entities: Entity budget of a single sketch
+
+    Returns:
+        tuple: (layout_sketches, sheet_sketches, parts_written, cancelled, emit_path) where
+               sheet_sketches maps each written sheet index to the first sketch of that sheet
+    """
+    shards = nestingPlanner.shard_plan(plan, snapshot.curve_count, max_entities)
+    shards_per_sheet = {}
+    for shard in shards:
+        sheet_index = shard.placements[0].sheet
+        shards_per_sheet[sheet_index] = shards_per_sheet.get(sheet_index, 0) + 1
+
+    layout_sketches = []
+    sheet_sketches = {}
+    parts_written = 0
+    cancelled = False
+    emit_paths = []
+    shard_numbers = {}
+    for shard in shards:
+        sheet_index = shard.placements[0].sheet
+        shard_numbers[sheet_index] = shard_numbers.get(sheet_index, 0) + 1
+
+        layout_sketch, written, cancelled, emit_path = write_layout_sketch(component, snapshot, shard)
+        multiplicity = plan.multiplicity(sheet_index)
+        if shards_per_sheet[sheet_index] > 1:
+            layout_sketch.name = f"{name} - Sheet {sheet_index + 1}.{shard_numbers[sheet_index]}"
+        elif len(shards_per_sheet) > 1 or multiplicity > 1:
+            layout_sketch.name = f"{name} - Sheet {sheet_index + 1}"
+        else:
+            layout_sketch.name = name
+
+        # A repeated sheet layout is written once and labelled with its count
+        if multiplicity > 1:
+            layout_sketch.name += f" (x{multiplicity})"
+
+        layout_sketches.append(layout_sketch)
+        sheet_sketches.setdefault(sheet_index, layout_sketch)
+        parts_written += written
+        if emit_path not in emit_paths:
+            emit_paths.append(emit_path)
+        if cancelled:
+            break
+
+    # Grouping only tidies the timeline; if it fails the sketches stay as they are, each named
+    # after the layout
+    if len(layout_sketches) > 1:
+        group_in_timeline(component, layout_sketches, name)
+
+    return (layout_sketches, sheet_sketches, parts_written, cancelled, '+'.join(emit_paths))
+
+
+def group_in_timeline(component, entities, name):
+    """
+    Collect the timeline items of entities into one named timeline group
+
+    Returns:
+        bool: True if a group was created; False in direct-modeling designs, where the
+              timeline does not exist, or if Fusion refused the group
+    """
+    try:
+        design = adsk.fusion.Design.cast(component.parentDesign)
+        if not design or design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+            return False
+
+        indices = [entity.timelineObject.index for entity in entities]
+        group = design.timeline.timelineGroups.add(min(indices), max(indices))
+        group.name = name
+        return True
+    except RuntimeError:
+        return False
+
+
+def write_layout_sketch(component, snapshot, plan, timings=None):
+    """
+    Create a layout sketch holding every placement of a plan
+
+    Uses a DXF import or per-entity emission, whichever is expected to be
+    faster for the number of entities, and records how long it took so later
+    runs choose better. Per-entity emission is used if the import fails.
+
+    Args:
+        component: Component that receives the layout sketch
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+        timings: EmissionTimings to consult and update (defaults to the session timings)
+
+    Returns:
+        tuple: (layout_sketch, parts_written, cancelled, emit_path)
+    """
+    timings = timings or emission_timings
+    entity_count = plan.parts_placed * snapshot.curve_count
+    emit_path = timings.choose(entity_count)
+    start_time = time.perf_counter()
+
+    if emit_path == EMIT_PATH_DXF:
+        layout_sketch, parts_written = import_plan_dxf(component, snapshot, plan)
+        if layout_sketch:
+            timings.record(EMIT_PATH_DXF, entity_count, time.perf_counter() - start_time)
+            return (layout_sketch, parts_written, False, EMIT_PATH_DXF)
+        start_time = time.perf_counter()
+
+    layout_sketch = component.sketches.add(component.xYConstructionPlane)
+    writer = LayoutWriter(layout_sketch)
+    parts_written = writer.write(snapshot, plan)
+    if not writer.cancelled:
+        timings.record(EMIT_PATH_ENTITIES, entity_count, time.perf_counter() - start_time)
+    return (layout_sketch, parts_written, writer.cancelled, EMIT_PATH_ENTITIES)
+
+
+def emit_part(target_sketch, lines, circles, arcs, splines):
+    """
+    Create the curves of one placed part from precomputed coordinates
+
+    Args:
+        target_sketch: The sketch to add curves to
+        lines: [x1, y1, x2, y2] rows
+        circles: [center_x, center_y, radius] rows
+        arcs: [center_x, center_y, start_x, start_y, sweep] rows
+        splines: Flat [x, y, x, y, ...] fit point lists
+
+    Returns:
+        bool: True if every curve was created, False if Fusion refused one and the part is incomplete
+    """
+    create_point = adsk.core.Point3D.create
+
+    try:
+        sketch_curves = target_sketch.sketchCurves
+
+        sketch_lines = sketch_curves.sketchLines
+        for x1, y1, x2, y2 in lines:
+            sketch_lines.addByTwoPoints(create_point(x1, y1, 0), create_point(x2, y2, 0))
+
+        sketch_circles = sketch_curves.sketchCircles
+        for center_x, center_y, radius in circles:
+            sketch_circles.addByCenterRadius(create_point(center_x, center_y, 0), radius)
+
+        sketch_arcs = sketch_curves.sketchArcs
+        for center_x, center_y, start_x, start_y, sweep in arcs:
+            sketch_arcs.addByCenterStartSweep(create_point(center_x, center_y, 0),
+                                              create_point(start_x, start_y, 0),
+                                              sweep)
+
+        for points in splines:
+            fit_points = adsk.core.ObjectCollection.create()
+            for i in range(0, len(points), 2):
+                fit_points.add(create_point(points[i], points[i + 1], 0))
+            sketch_curves.sketchFittedSplines.add(fit_points)
+
+        return True
+    except RuntimeError:
+        # Fusion API calls raise RuntimeError, for example for a degenerate curve
+        return False
+
+
+def emit_plan_as_occurrences(parent_component, snapshot, plan, name='Nesting Part'):
+    """
+    Place every placement of a plan as an occurrence of one shared component
+
+    The part geometry is written once into a new component and each placement
+    becomes a lightweight occurrence with its own transform, so memory and
+    recompute cost grow with the number of unique parts, not total parts.
+
+    Args:
+        parent_component: Component that receives the occurrences
+        snapshot: PartSnapshot of the part being placed
+        plan: A nestingPlanner.PlacementPlan
+        name: Name of the new component and its sketch
+
+    Returns:
+        int: Number of occurrences created, 0 if the part geometry could not be written
+    """
+    placements = plan.placements
+    if not placements:
+        return 0
+
+    occurrences = parent_component.occurrences
+    first_occurrence = occurrences.addNewComponent(placement_matrix(plan.transform(placements[0])))
+    component = first_occurrence.component
+    component.name = name
+
+    # Write the part once in its own coordinates; a placement on the bbox corner is the identity
+    min_x, max_x, min_y, max_y = plan.part_bbox
+    part_geometry = transformKernel.transform_snapshot(snapshot, plan.part_bbox, [(min_x, min_y, 0)])
+    part_sketch = component.sketches.add(component.xYConstructionPlane)
+    part_sketch.name = name
+    if not emit_part(part_sketch, part_geometry.lines[0], part_geometry.circles[0],
+                     part_geometry.arcs[0], part_geometry.splines[0]):
+        first_occurrence.deleteMe()
+        return 0
+
+    placed = 1
+    for placement in placements[1:]:
+        occurrences.addExistingComponent(component, placement_matrix(plan.transform(placement)))
+        placed += 1
+    return placed
+
+
+def placement_matrix(transform):
+    """
+    Build a Matrix3D from a planner transform
+
+    Args:
+        transform: (cos_a, sin_a, tx, ty) as returned by PlacementPlan.transform
+
+    Returns:
+        adsk.core.Matrix3D: Rotation about Z followed by the translation
+    """
+    cos_a, sin_a, tx, ty = transform
+    matrix = adsk.core.Matrix3D.create()
+    matrix.setWithArray([
+        cos_a, -sin_a, 0, tx,
+        sin_a, cos_a, 0, ty,
+        0, 0, 1, 0,
+        0, 0, 0, 1
+    ])
+    return matrix
+
+
+def arc_sweep(center_x, center_y, start_x, start_y, end_x, end_y):
+    """Counter-clockwise sweep angle in radians from the start to the end point of an arc"""
+    start_angle = math.atan2(start_y - center_y, start_x - center_x)
+    end_angle = math.atan2(end_y - center_y, end_x - center_x)
+    sweep = (end_angle - start_angle) % (2 * math.pi)
+    return sweep if sweep > 1e-9 else 2 * math.pi
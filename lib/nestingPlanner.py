@@ -0,0 +1,797 @@
+"""
+Fusion-independent layout planning for the Advanced Nesting add-in.
+
+The planner works only with plain numbers, so a layout can be computed,
+cached, benchmarked or solved in a worker process without a live Fusion
+session. Turning a plan into sketch geometry is the job of nestingEmitter.
+
+All lengths are in cm and all angles are in degrees. Placements are given in
+the coordinates of their own sheet; sheets are laid out side by side in the
+design, SHEET_SPACING apart.
+"""
+
+import math
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    from . import latticePacking, nestingAlgorithm, occupancyGrid, pairClustering, partSnapshot, rectangleDecomposition
+except ImportError:
+    import latticePacking
+    import nestingAlgorithm
+    import occupancyGrid
+    import pairClustering
+    import partSnapshot
+    import rectangleDecomposition
+
+# Gap between sheets laid out side by side in the design (cm)
+SHEET_SPACING = 10.0
+
+
+class SheetSettings(NamedTuple):
+    """Sheet size and spacing used by the planner"""
+    width: float
+    height: float
+    edge_clearance: float = 0.0
+    gutter_size: float = 0.0
+
+
+class StockSheet(NamedTuple):
+    """A sheet size that can be bought or taken from stock"""
+    name: str
+    sheet: SheetSettings
+    cost: Optional[float] = None  # Price of one sheet; None to compare by area
+
+
+class Placement(NamedTuple):
+    """
+    A single placed part
+
+    x, y are the lower-left corner of the part's footprint on the sheet and
+    rotation is the counter-clockwise rotation applied to the source geometry.
+    """
+    x: float
+    y: float
+    rotation: float = 0.0
+    part_id: str = 'part'
+    sheet: int = 0
+
+
+class PlacementPlan(NamedTuple):
+    """Immutable result of a planning run"""
+    sheet: SheetSettings
+    part_bbox: Tuple[float, float, float, float]  # (min_x, max_x, min_y, max_y) of the source part
+    part_width: float  # Footprint width in the chosen orientation, including kerf
+    part_height: float  # Footprint height in the chosen orientation, including kerf
+    placements: Tuple[Placement, ...]
+    rotated: bool = False
+    parts_per_row: int = 0
+    parts_per_column: int = 0
+    sheet_multiplicity: Tuple[int, ...] = ()  # Times each sheet layout is cut; 1 for sheets not listed
+    sheet_sizes: Tuple[SheetSettings, ...] = ()  # Settings of each sheet when sizes differ; sheet for sheets not listed
+    part_area: Optional[float] = None  # Area of one part when it is less than its footprint rectangle
+
+    @property
+    def parts_placed(self):
+        """Number of placements in the plan, counting a repeated sheet once"""
+        return len(self.placements)
+
+    @property
+    def sheet_count(self):
+        """Number of sheet layouts, counting from the first sheet"""
+        if not self.placements:
+            return 0
+        return max(placement.sheet for placement in self.placements) + 1
+
+    @property
+    def sheets_required(self):
+        """Number of physical sheets, counting every repeat of a sheet layout"""
+        return sum(self.multiplicity(sheet_index) for sheet_index in range(self.sheet_count))
+
+    @property
+    def parts_total(self):
+        """Number of parts produced, counting every repeat of a sheet layout"""
+        return sum(self.multiplicity(placement.sheet) for placement in self.placements)
+
+    @property
+    def utilization(self):
+        """Percentage of the area of the used sheets covered by part footprints"""
+        sheet_area = sum(self.sheet_settings(sheet_index).width * self.sheet_settings(sheet_index).height *
+                         self.multiplicity(sheet_index) for sheet_index in range(self.sheet_count))
+        if not self.placements:
+            sheet_area = self.sheet.width * self.sheet.height
+        if sheet_area <= 0:
+            return 0.0
+        part_area = self.part_area if self.part_area is not None else self.part_width * self.part_height
+        return self.parts_total * part_area / sheet_area * 100
+
+    def multiplicity(self, sheet_index):
+        """Number of physical sheets cut with the layout of a sheet"""
+        if sheet_index < len(self.sheet_multiplicity):
+            return self.sheet_multiplicity[sheet_index]
+        return 1
+
+    def sheet_settings(self, sheet_index):
+        """Size and spacing of a sheet"""
+        if sheet_index < len(self.sheet_sizes):
+            return self.sheet_sizes[sheet_index]
+        return self.sheet
+
+    def sheet_origin(self, sheet_index):
+        """Lower-left corner of a sheet in design coordinates"""
+        if not self.sheet_sizes:
+            return (sheet_index * (self.sheet.width + SHEET_SPACING), 0.0)
+        return (sum(self.sheet_settings(i).width + SHEET_SPACING for i in range(sheet_index)), 0.0)
+
+    def layout_positions(self):
+        """
+        Get every placement in design coordinates
+
+        Returns:
+            list: (x, y, rotation) tuples, ready for transformKernel
+        """
+        origins = {}
+        positions = []
+        for placement in self.placements:
+            if placement.sheet not in origins:
+                origins[placement.sheet] = self.sheet_origin(placement.sheet)
+            origin_x, origin_y = origins[placement.sheet]
+            positions.append((origin_x + placement.x, origin_y + placement.y, placement.rotation))
+        return positions
+
+    def transform(self, placement):
+        """
+        Get the rigid transform that moves the source part onto a placement
+
+        Args:
+            placement: One of this plan's placements
+
+        Returns:
+            tuple: (cos_a, sin_a, tx, ty) so that a source point (x, y) maps to
+                   (cos_a * x - sin_a * y + tx, sin_a * x + cos_a * y + ty)
+        """
+        origin_x, origin_y = self.sheet_origin(placement.sheet)
+        cos_a, sin_a, tx, ty = placement_transform(self.part_bbox, placement)
+        return (cos_a, sin_a, tx + origin_x, ty + origin_y)
+
+
+def placement_transform(part_bbox, placement):
+    """
+    Compute the transform that rotates a part about the origin and then moves
+    the lower-left corner of its rotated bounding box onto the placement point
+
+    Args:
+        part_bbox: Source bounding box (min_x, max_x, min_y, max_y)
+        placement: The Placement to transform to
+
+    Returns:
+        tuple: (cos_a, sin_a, tx, ty)
+    """
+    min_x, max_x, min_y, max_y = part_bbox
+    angle = math.radians(placement.rotation)
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+
+    # Snap exact quarter turns so 90 degree copies stay on the grid
+    if abs(cos_a) < 1e-12:
+        cos_a = 0.0
+    if abs(sin_a) < 1e-12:
+        sin_a = 0.0
+
+    corners = ((min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y))
+    rotated_min_x = min(cos_a * x - sin_a * y for x, y in corners)
+    rotated_min_y = min(sin_a * x + cos_a * y for x, y in corners)
+
+    return (cos_a, sin_a, placement.x - rotated_min_x, placement.y - rotated_min_y)
+
+
+def plan_grid_layout(part_bbox, sheet, quantity, kerf=0.0, optimize_rotation=False, part_id='part'):
+    """
+    Plan a grid layout of identical parts on a single sheet
+
+    Args:
+        part_bbox: Bounding box of the source part (min_x, max_x, min_y, max_y)
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the part footprint (cm)
+        optimize_rotation: Rotate parts 90 degrees when that fits more parts
+        part_id: Identifier stored on each placement
+
+    Returns:
+        PlacementPlan: The planned layout
+    """
+    min_x, max_x, min_y, max_y = part_bbox
+    part_width = (max_x - min_x) + kerf
+    part_height = (max_y - min_y) + kerf
+    edge_clearance = sheet.edge_clearance
+    gutter_size = sheet.gutter_size
+
+    rotated = False
+    if optimize_rotation and abs(part_width - part_height) > 0.01:
+        rotated, parts_per_row, parts_per_column = nestingAlgorithm.get_optimal_rotation(
+            part_width, part_height, sheet.width, sheet.height, edge_clearance, gutter_size
+        )
+        if rotated:
+            part_width, part_height = part_height, part_width
+    else:
+        parts_per_row = math.floor((sheet.width - 2 * edge_clearance + gutter_size) / (part_width + gutter_size))
+        parts_per_column = math.floor((sheet.height - 2 * edge_clearance + gutter_size) / (part_height + gutter_size))
+
+    parts_per_row = max(0, parts_per_row)
+    parts_per_column = max(0, parts_per_column)
+    parts_to_place = min(quantity, parts_per_row * parts_per_column)
+    rotation = 90.0 if rotated else 0.0
+
+    placements = []
+    for row in range(parts_per_column):
+        if len(placements) >= parts_to_place:
+            break
+
+        for col in range(parts_per_row):
+            if len(placements) >= parts_to_place:
+                break
+
+            x = edge_clearance + col * (part_width + gutter_size)
+            y = edge_clearance + row * (part_height + gutter_size)
+            placements.append(Placement(x, y, rotation, part_id))
+
+    return PlacementPlan(
+        sheet=sheet,
+        part_bbox=(min_x, max_x, min_y, max_y),
+        part_width=part_width,
+        part_height=part_height,
+        placements=tuple(placements),
+        rotated=rotated,
+        parts_per_row=parts_per_row,
+        parts_per_column=parts_per_column
+    )
+
+
+def plan_pattern_layout(part_bbox, sheet, quantity, kerf=0.0, part_id='part',
+                        time_limit=nestingAlgorithm.PATTERN_TIME_LIMIT):
+    """
+    Plan a layout of identical parts from the best block pattern
+
+    Blocks of normal and rotated parts can be mixed, which often fits a few
+    more parts than a plain grid in either orientation.
+
+    Args:
+        part_bbox: Bounding box of the source part (min_x, max_x, min_y, max_y)
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the part footprint (cm)
+        part_id: Identifier stored on each placement
+        time_limit: Seconds allowed for the five-block pattern search
+
+    Returns:
+        PlacementPlan: The planned layout; part_width and part_height are the
+                       unrotated footprint
+    """
+    min_x, max_x, min_y, max_y = part_bbox
+    part_width = (max_x - min_x) + kerf
+    part_height = (max_y - min_y) + kerf
+    gutter_size = sheet.gutter_size
+
+    count, blocks, _ = nestingAlgorithm.solve_identical_rectangles(
+        sheet.width - 2 * sheet.edge_clearance + gutter_size,
+        sheet.height - 2 * sheet.edge_clearance + gutter_size,
+        part_width + gutter_size,
+        part_height + gutter_size,
+        time_limit
+    )
+    positions = nestingAlgorithm.expand_blocks(blocks, part_width + gutter_size, part_height + gutter_size)
+
+    placements = tuple(
+        Placement(sheet.edge_clearance + x, sheet.edge_clearance + y, 90.0 if rotated else 0.0, part_id)
+        for x, y, rotated in positions[:max(0, quantity)]
+    )
+
+    return PlacementPlan(
+        sheet=sheet,
+        part_bbox=(min_x, max_x, min_y, max_y),
+        part_width=part_width,
+        part_height=part_height,
+        placements=placements,
+        rotated=any(placement.rotation for placement in placements)
+    )
+
+
+def plan_multi_sheet_layout(part_bbox, sheet, quantity, kerf=0.0, part_id='part', use_pattern=True,
+                            time_limit=nestingAlgorithm.PATTERN_TIME_LIMIT, collapse_repeats=False):
+    """
+    Plan identical parts over as many sheets as the quantity needs
+
+    Every full sheet repeats the best single-sheet layout, which is optimal
+    for identical parts; the last sheet holds the remainder. With
+    collapse_repeats the full sheets are planned once, with a multiplicity.
+
+    Args:
+        part_bbox: Bounding box of the source part (min_x, max_x, min_y, max_y)
+        sheet: SheetSettings describing each sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the part footprint (cm)
+        part_id: Identifier stored on each placement
+        use_pattern: Use the block pattern layout instead of a plain grid
+        time_limit: Seconds allowed for the five-block pattern search
+        collapse_repeats: Plan repeated full sheets once (see collapse_repeated_sheets)
+
+    Returns:
+        PlacementPlan: The planned layout, with placements on sheets 0, 1, ...
+    """
+    if use_pattern:
+        sheet_plan = plan_pattern_layout(part_bbox, sheet, quantity, kerf, part_id, time_limit)
+    else:
+        sheet_plan = plan_grid_layout(part_bbox, sheet, quantity, kerf, optimize_rotation=True, part_id=part_id)
+    return repeat_sheet_layout(sheet_plan, quantity, collapse_repeats)
+
+
+def repeat_sheet_layout(sheet_plan, quantity, collapse_repeats=False):
+    """
+    Repeat a single-sheet layout of identical parts until the quantity is met
+
+    Args:
+        sheet_plan: PlacementPlan with every placement on sheet 0
+        quantity: Number of parts requested
+        collapse_repeats: Plan repeated full sheets once (see collapse_repeated_sheets)
+
+    Returns:
+        PlacementPlan: The layout over sheets 0, 1, ...; the last sheet holds the remainder
+    """
+    per_sheet = sheet_plan.placements
+    if not per_sheet:
+        return sheet_plan
+
+    full_sheets, remainder = divmod(quantity, len(per_sheet))
+    if collapse_repeats:
+        placements = list(per_sheet) if full_sheets else []
+        multiplicity = [full_sheets] if full_sheets else []
+        if remainder:
+            placements.extend(placement._replace(sheet=len(multiplicity)) for placement in per_sheet[:remainder])
+            multiplicity.append(1)
+        return sheet_plan._replace(placements=tuple(placements), sheet_multiplicity=tuple(multiplicity))
+
+    placements = []
+    for sheet_index in range(full_sheets + (1 if remainder else 0)):
+        count = len(per_sheet) if sheet_index < full_sheets else remainder
+        placements.extend(placement._replace(sheet=sheet_index) for placement in per_sheet[:count])
+
+    return sheet_plan._replace(placements=tuple(placements))
+
+
+def plan_true_shape_layout(snapshot, sheet, quantity, kerf=0.0, part_id='part', rotations=(0.0, 180.0),
+                           tolerance=0.02, nfp_cache=None):
+    """
+    Plan a layout of identical parts nested by their outline instead of their bounding box
+
+    The outer loop of the part is nested with no-fit polygons, so notched,
+    curved or tapered parts can interlock. Holes stay empty. The block pattern
+    layout is kept instead when it fits at least as many parts, and is the
+    only layout when the part has no single closed outline.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the spacing between parts (cm)
+        part_id: Identifier stored on each placement
+        rotations: Angles in degrees the part may be placed at
+        tolerance: Largest deviation of the flattened outline from arcs and splines (cm)
+        nfp_cache: Optional nfpCache.NfpCache that keeps NFPs between runs
+
+    Returns:
+        PlacementPlan: The planned layout on one sheet; part_area is the outline area
+    """
+    pattern_plan = plan_pattern_layout(snapshot.bbox, sheet, quantity, kerf, part_id)
+    part = true_shape_part(snapshot, quantity, part_id, tolerance)
+    if part is None:
+        return pattern_plan
+
+    solution = nestingAlgorithm.nfp_nesting(
+        sheet.width, sheet.height, [part], sheet.edge_clearance, sheet.gutter_size + kerf, rotations, nfp_cache
+    )
+    if len(solution['placements']) <= pattern_plan.parts_placed:
+        return pattern_plan
+
+    return _outline_plan(snapshot, sheet, kerf, part_id, solution['placements'], part['polygon'],
+                         abs(partSnapshot.polygon_area(part['polygon'])))
+
+
+def true_shape_part(snapshot, quantity, part_id='part', tolerance=0.02):
+    """
+    Describe a part for nestingAlgorithm.nfp_nesting from its sketch geometry
+
+    The inner loops of the sketch become the part's holes, which nfp_nesting
+    fills with smaller parts of the same run.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        quantity: Number of parts requested
+        part_id: Identifier stored on each placement
+        tolerance: Largest deviation of the flattened loops from arcs and splines (cm)
+
+    Returns:
+        dict: 'id', 'polygon', 'holes' and 'quantity', or None if the snapshot has no single outline
+    """
+    outer, holes = partSnapshot.part_outline(snapshot, tolerance)
+    if outer is None:
+        return None
+    return {'id': part_id, 'polygon': outer, 'holes': holes, 'quantity': max(0, quantity)}
+
+
+def plan_lattice_layout(snapshot, sheet, quantity, kerf=0.0, part_id='part', angles=(0.0, 90.0), tolerance=0.02):
+    """
+    Plan a layout of identical parts on the densest lattice of the part and its 180 degree copy
+
+    Suited to runs of hundreds or thousands of one irregular part. The block
+    pattern layout is kept instead when it fits at least as many parts, and
+    is the only layout when the part has no single closed outline.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the spacing between parts (cm)
+        part_id: Identifier stored on each placement
+        angles: Part angles the lattice rows are built for
+        tolerance: Largest deviation of the flattened outline from arcs and splines (cm)
+
+    Returns:
+        PlacementPlan: The planned layout on one sheet, lowest rows first; part_area is the outline area
+    """
+    pattern_plan = plan_pattern_layout(snapshot.bbox, sheet, quantity, kerf, part_id)
+    outer, _ = partSnapshot.part_outline(snapshot, tolerance)
+    if outer is None:
+        return pattern_plan
+
+    # Each angle is a lattice of its own, so angles giving mirror images of a layout count once
+    angles = partSnapshot.distinct_rotations([outer], angles, tolerance, layout_symmetry=True)
+    positions = latticePacking.lattice_layout(
+        outer, sheet.width - 2 * sheet.edge_clearance, sheet.height - 2 * sheet.edge_clearance,
+        sheet.gutter_size + kerf, angles
+    )[:max(0, quantity)]
+    if len(positions) <= pattern_plan.parts_placed:
+        return pattern_plan
+
+    solved_placements = [{'x': sheet.edge_clearance + x, 'y': sheet.edge_clearance + y, 'rotation': angle}
+                         for angle, x, y in positions]
+    return _outline_plan(snapshot, sheet, kerf, part_id, solved_placements, outer,
+                         abs(partSnapshot.polygon_area(outer)))
+
+
+def plan_raster_layout(snapshot, sheet, quantity, kerf=0.0, part_id='part', rotations=(0.0, 90.0, 180.0, 270.0),
+                       tolerance=0.02, time_limit=nestingAlgorithm.RASTER_TIME_LIMIT, progress=None):
+    """
+    Plan a layout of identical parts nested as bitmasks on an occupancy grid
+
+    Works for any closed sketch geometry, arcs, splines and holes included,
+    refining from a coarse grid to a fine one within the time limit. The
+    block pattern layout is kept instead when it fits at least as many parts,
+    and without NumPy the exact true-shape layout is used.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the spacing between parts (cm)
+        part_id: Identifier stored on each placement
+        rotations: Angles in degrees the part may be placed at
+        tolerance: Largest deviation of the flattened curves from arcs and splines (cm)
+        time_limit: Seconds after which no finer grid is started
+        progress: Optional callable receiving the nestingAlgorithm solution of each grid
+
+    Returns:
+        PlacementPlan: The planned layout on one sheet; part_area is the area inside the loops
+    """
+    if not occupancyGrid.HAS_NUMPY:
+        return plan_true_shape_layout(snapshot, sheet, quantity, kerf, part_id, tolerance=tolerance)
+
+    pattern_plan = plan_pattern_layout(snapshot.bbox, sheet, quantity, kerf, part_id)
+    loops = partSnapshot.closed_loops(snapshot, tolerance)
+    if not loops:
+        return pattern_plan
+
+    solution = nestingAlgorithm.raster_nesting(
+        sheet.width, sheet.height, [{'id': part_id, 'loops': loops, 'quantity': max(0, quantity)}],
+        sheet.edge_clearance, sheet.gutter_size + kerf, rotations, time_limit=time_limit, progress=progress
+    )
+    if len(solution['placements']) <= pattern_plan.parts_placed:
+        return pattern_plan
+
+    return _outline_plan(snapshot, sheet, kerf, part_id, solution['placements'],
+                         [point for loop in loops for point in loop], occupancyGrid.loops_area(loops))
+
+
+def plan_rectilinear_layout(snapshot, sheet, quantity, kerf=0.0, part_id='part', tolerance=0.02):
+    """
+    Plan a layout of identical rectilinear parts packed as a few linked rectangles
+
+    L, T and U shaped parts are split into rectangles that MaxRects places
+    together, so parts can reach into each other's notches at rectangle
+    packing speed. The block pattern layout is kept instead when it fits at
+    least as many parts, and is the only layout when the outline is not
+    rectilinear or needs more than RECTILINEAR_MAX_RECTANGLES rectangles.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the spacing between parts (cm)
+        part_id: Identifier stored on each placement
+        tolerance: Largest deviation of the flattened outline from arcs and splines (cm)
+
+    Returns:
+        PlacementPlan: The planned layout on one sheet; part_area is the outline area
+    """
+    pattern_plan = plan_pattern_layout(snapshot.bbox, sheet, quantity, kerf, part_id)
+    outer, _ = partSnapshot.part_outline(snapshot, tolerance)
+    rects = rectangleDecomposition.decompose(outer) if outer is not None else None
+    if not rects or not 1 < len(rects) <= rectangleDecomposition.RECTILINEAR_MAX_RECTANGLES:
+        return pattern_plan
+
+    part = {
+        'id': part_id,
+        'width': max(x for x, _ in outer) - min(x for x, _ in outer),
+        'height': max(y for _, y in outer) - min(y for _, y in outer),
+        'quantity': max(0, quantity),
+        'rects': rects
+    }
+    solution = nestingAlgorithm.bin_packing_nesting(sheet.width, sheet.height, [part],
+                                                    sheet.edge_clearance, sheet.gutter_size + kerf)
+    if len(solution['placements']) <= pattern_plan.parts_placed:
+        return pattern_plan
+
+    return _outline_plan(snapshot, sheet, kerf, part_id, solution['placements'], outer,
+                         abs(partSnapshot.polygon_area(outer)))
+
+
+def plan_pair_layout(snapshot, sheet, quantity, kerf=0.0, part_id='part', tolerance=0.02):
+    """
+    Plan a layout of identical parts packed as interlocking pairs
+
+    The part and a copy, turned 180 degrees or not, are joined at the touching
+    position with the smallest bounding box (pairClustering.best_pair), and
+    the block pattern layout packs those boxes. Triangles, trapezoids and L
+    shapes pair up into near-rectangles this way. The block pattern layout of
+    single parts is kept instead when it fits at least as many parts or no
+    pair saves PAIR_MIN_GAIN of the box area.
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        sheet: SheetSettings describing the sheet
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the spacing between parts (cm)
+        part_id: Identifier stored on each placement
+        tolerance: Largest deviation of the flattened outline from arcs and splines (cm)
+
+    Returns:
+        PlacementPlan: The planned layout on one sheet; part_area is the outline area
+    """
+    pattern_plan = plan_pattern_layout(snapshot.bbox, sheet, quantity, kerf, part_id)
+    outer, _ = partSnapshot.part_outline(snapshot, tolerance)
+    if outer is None or quantity < 2:
+        return pattern_plan
+
+    spacing = sheet.gutter_size + kerf
+    _, pairs = pairClustering.cluster_pairs([{'id': part_id, 'polygon': outer, 'quantity': quantity}], spacing)
+    if not pairs:
+        return pattern_plan
+
+    pair_id, pair = next(iter(pairs.items()))
+    solution = nestingAlgorithm.pattern_nesting(sheet.width, sheet.height, pair.width, pair.height,
+                                                (quantity + 1) // 2, sheet.edge_clearance, spacing,
+                                                part_id=pair_id)
+    placements = pairClustering.expand_pairs(solution['placements'], pairs)[:quantity]
+    if len(placements) <= pattern_plan.parts_placed:
+        return pattern_plan
+
+    return _outline_plan(snapshot, sheet, kerf, part_id, placements, outer,
+                         abs(partSnapshot.polygon_area(outer)))
+
+
+def _outline_plan(snapshot, sheet, kerf, part_id, solved_placements, outline_points, part_area):
+    """Turn placements of the outline's rotated bounding box into a plan that places the part's"""
+    min_x, max_x, min_y, max_y = snapshot.bbox
+    corners = ((min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y))
+    offsets = {}
+    placements = []
+    for placement in solved_placements:
+        angle = placement['rotation']
+        if angle not in offsets:
+            cos_a = math.cos(math.radians(angle))
+            sin_a = math.sin(math.radians(angle))
+            offsets[angle] = (
+                min(cos_a * x - sin_a * y for x, y in outline_points) - min(cos_a * x - sin_a * y for x, y in corners),
+                min(sin_a * x + cos_a * y for x, y in outline_points) - min(sin_a * x + cos_a * y for x, y in corners)
+            )
+        offset_x, offset_y = offsets[angle]
+        placements.append(Placement(placement['x'] - offset_x, placement['y'] - offset_y, float(angle) % 360, part_id))
+
+    return PlacementPlan(
+        sheet=sheet,
+        part_bbox=snapshot.bbox,
+        part_width=(max_x - min_x) + kerf,
+        part_height=(max_y - min_y) + kerf,
+        placements=tuple(placements),
+        rotated=any(placement.rotation for placement in placements),
+        part_area=part_area
+    )
+
+
+def plan_stock_layout(part_bbox, stocks, quantity, kerf=0.0, part_id='part', use_pattern=True,
+                      objective=nestingAlgorithm.STOCK_OBJECTIVE_AREA,
+                      time_limit=nestingAlgorithm.PATTERN_TIME_LIMIT):
+    """
+    Plan identical parts on the cheapest combination of stock sheet sizes
+
+    Each stock size is solved once for the number of parts one sheet holds.
+    The number of sheets of each size is then chosen so that they hold the
+    quantity at the lowest total sheet area or cost.
+
+    Args:
+        part_bbox: Bounding box of the source part (min_x, max_x, min_y, max_y)
+        stocks: StockSheet sizes to choose from, at least one
+        quantity: Number of parts requested
+        kerf: Kerf compensation added to the part footprint (cm)
+        part_id: Identifier stored on each placement
+        use_pattern: Use the block pattern layout instead of a plain grid
+        objective: nestingAlgorithm.STOCK_OBJECTIVE_AREA or STOCK_OBJECTIVE_COST; the cost
+                   objective needs a cost on every stock sheet
+        time_limit: Seconds allowed for the pattern search over all stock sizes
+
+    Returns:
+        PlacementPlan: The planned layout with repeated full sheets collapsed
+                       (see collapse_repeated_sheets) and the size of every
+                       sheet in sheet_sizes; empty if the part fits no
+                       stock size
+
+    Raises:
+        ValueError: If the cost objective is used and a stock sheet has no cost
+    """
+    use_cost = objective == nestingAlgorithm.STOCK_OBJECTIVE_COST
+    missing = [stock.name for stock in stocks if stock.cost is None]
+    if use_cost and missing:
+        raise ValueError(f"Stock sheets without a cost: {', '.join(missing)}")
+
+    sheet_plans = []
+    for stock in stocks:
+        if use_pattern:
+            sheet_plan = plan_pattern_layout(part_bbox, stock.sheet, quantity, kerf, part_id,
+                                             time_limit / max(1, len(stocks)))
+        else:
+            sheet_plan = plan_grid_layout(part_bbox, stock.sheet, quantity, kerf, optimize_rotation=True,
+                                          part_id=part_id)
+        sheet_plans.append(sheet_plan)
+
+    costs = [stock.cost if use_cost else stock.sheet.width * stock.sheet.height for stock in stocks]
+
+    counts = _cheapest_cover([sheet_plan.parts_placed for sheet_plan in sheet_plans], costs, quantity)
+    if not any(counts or ()):
+        return sheet_plans[0]._replace(placements=())
+
+    # Larger sheets first, so only the last sheet is partly filled
+    order = sorted((i for i in range(len(stocks)) if counts[i]), key=lambda i: -sheet_plans[i].parts_placed)
+    placements = []
+    multiplicity = []
+    sheet_sizes = []
+    remaining = quantity
+    for i in order:
+        per_sheet = sheet_plans[i].placements
+        full_sheets = min(counts[i], remaining // len(per_sheet))
+        sheet_counts = [(len(per_sheet), full_sheets)] if full_sheets else []
+        if counts[i] > full_sheets and remaining > full_sheets * len(per_sheet):
+            sheet_counts.append((remaining - full_sheets * len(per_sheet), 1))
+        for count, repeats in sheet_counts:
+            placements.extend(placement._replace(sheet=len(multiplicity)) for placement in per_sheet[:count])
+            multiplicity.append(repeats)
+            sheet_sizes.append(stocks[i].sheet)
+            remaining -= count * repeats
+
+    first = sheet_plans[order[0]]
+    return first._replace(
+        placements=tuple(placements),
+        rotated=any(placement.rotation for placement in placements),
+        sheet_multiplicity=tuple(multiplicity),
+        sheet_sizes=tuple(sheet_sizes)
+    )
+
+
+def _cheapest_cover(capacities, costs, quantity):
+    """
+    Choose how many sheets of each size hold quantity parts at the lowest cost
+
+    Returns:
+        list: Number of sheets of each size, or None if no size holds a part
+    """
+    options = [i for i in range(len(capacities)) if capacities[i] > 0]
+    if not options:
+        return None
+
+    # Any set of at least best_capacity other sheets has a subset whose capacities add up
+    # to a multiple of best_capacity, which the best-value size holds as cheaply, so only
+    # a bounded remainder needs the exact search and the rest are best-value sheets
+    best = min(options, key=lambda i: (costs[i] / capacities[i], -capacities[i]))
+    best_capacity = capacities[best]
+    bound = best_capacity * max(capacities[i] for i in options)
+    fixed = max(0, (quantity - bound) // best_capacity)
+    demand = quantity - fixed * best_capacity
+
+    lowest = [0.0] + [math.inf] * demand
+    choice = [-1] * (demand + 1)
+    for count in range(1, demand + 1):
+        for i in options:
+            cost = costs[i] + lowest[max(0, count - capacities[i])]
+            if cost < lowest[count]:
+                lowest[count] = cost
+                choice[count] = i
+
+    counts = [0] * len(capacities)
+    counts[best] = fixed
+    count = demand
+    while count > 0:
+        i = choice[count]
+        counts[i] += 1
+        count = max(0, count - capacities[i])
+    return counts
+
+
+def collapse_repeated_sheets(plan):
+    """
+    Merge sheets with identical layouts into one sheet with a multiplicity
+
+    Only one copy of a repeated layout then has to be emitted or exported.
+    Sheets keep the order in which each layout first appears.
+
+    Returns:
+        PlacementPlan: The plan with every distinct sheet layout once
+    """
+    by_sheet = {}
+    for placement in plan.placements:
+        by_sheet.setdefault(placement.sheet, []).append(placement)
+
+    layouts = {}
+    order = []
+    for sheet_index in sorted(by_sheet):
+        key = tuple(sorted((round(p.x, 6), round(p.y, 6), round(p.rotation, 6), p.part_id)
+                           for p in by_sheet[sheet_index]))
+        if key not in layouts:
+            layouts[key] = [sheet_index, 0]
+            order.append(key)
+        layouts[key][1] += plan.multiplicity(sheet_index)
+
+    placements = []
+    multiplicity = []
+    for new_index, key in enumerate(order):
+        sheet_index, count = layouts[key]
+        placements.extend(placement._replace(sheet=new_index) for placement in by_sheet[sheet_index])
+        multiplicity.append(count)
+
+    return plan._replace(placements=tuple(placements), sheet_multiplicity=tuple(multiplicity))
+
+
+def shard_plan(plan, entities_per_part, max_entities_per_shard):
+    """
+    Split a plan into smaller plans so no sketch has to hold too many entities
+
+    Placements are grouped by sheet first. Within a sheet they are ordered
+    bottom to top, left to right, so every shard covers a compact band of the
+    sheet.
+
+    Args:
+        plan: The PlacementPlan to split
+        entities_per_part: Number of sketch entities one placed part creates
+        max_entities_per_shard: Entity budget of a single shard
+
+    Returns:
+        tuple: PlacementPlans, in sheet order
+    """
+    parts_per_shard = max(1, max_entities_per_shard // max(1, entities_per_part))
+
+    by_sheet = {}
+    for placement in plan.placements:
+        by_sheet.setdefault(placement.sheet, []).append(placement)
+
+    shards = []
+    for sheet_index in sorted(by_sheet):
+        placements = sorted(by_sheet[sheet_index], key=lambda p: (p.y, p.x))
+        for start in range(0, len(placements), parts_per_shard):
+            shards.append(plan._replace(placements=tuple(placements[start:start + parts_per_shard])))
+    return tuple(shards)
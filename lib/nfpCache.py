@@ -0,0 +1,224 @@
+"""
+Content-addressed cache of no-fit polygons.
+
+An NFP depends only on the two outlines, their angles and the spacing, so it
+is stored under a hash of exactly those. Outlines are hashed in a canonical
+form (moved to the origin, counter-clockwise, starting at the lowest-left
+vertex), so the same part drawn somewhere else or traced from another vertex
+finds the same entry. Entries are kept in memory with least-recently-used
+eviction and, when a directory is given, as one JSON file per entry, so later
+jobs and re-solves after a setting change skip the computation.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    from . import noFitPolygon
+except ImportError:
+    import noFitPolygon
+
+# Bump when the NFP construction changes so stale files are never read
+CACHE_VERSION = 1
+
+# Entries kept in memory
+NFP_CACHE_SIZE = 2000
+
+# Decimals of the coordinates, angles and spacing that make up a key
+KEY_DECIMALS = 6
+
+# Default folder for cache files
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.advancedNesting', 'nfpCache')
+
+
+def canonical_polygon(points):
+    """
+    Get a polygon in the form used for hashing
+
+    Returns:
+        tuple: Rounded (x, y) tuples, counter-clockwise, relative to the
+               bounding box corner and starting at the lowest-left vertex
+    """
+    if noFitPolygon.signed_area(points) < 0:
+        points = points[::-1]
+    min_x = min(x for x, _ in points)
+    min_y = min(y for _, y in points)
+    points = [(round(x - min_x, KEY_DECIMALS) + 0.0, round(y - min_y, KEY_DECIMALS) + 0.0) for x, y in points]
+    start = min(range(len(points)), key=lambda i: (points[i][1], points[i][0]))
+    return tuple(points[start:] + points[:start])
+
+
+def nfp_key(polygon_a, angle_a, polygon_b, angle_b, spacing):
+    """
+    Hash the inputs of an NFP
+
+    Returns:
+        str: Hex digest that names the NFP of polygon_b at angle_b moving around polygon_a at angle_a
+    """
+    data = json.dumps([
+        CACHE_VERSION,
+        noFitPolygon.SPACING_SIDES,
+        canonical_polygon(polygon_a),
+        round(angle_a % 360, KEY_DECIMALS),
+        canonical_polygon(polygon_b),
+        round(angle_b % 360, KEY_DECIMALS),
+        round(spacing, KEY_DECIMALS)
+    ], separators=(',', ':'))
+    return hashlib.sha256(data.encode('ascii')).hexdigest()
+
+
+class NfpCache:
+    """
+    NFPs by content hash, in memory and optionally on disk
+
+    hits        -- lookups answered from memory
+    disk_hits   -- lookups answered from a cache file
+    misses      -- lookups that had to build the NFP
+    """
+
+    def __init__(self, directory=None, max_entries=NFP_CACHE_SIZE):
+        """
+        Args:
+            directory: Folder for cache files, or None to keep entries in memory only
+            max_entries: Most entries kept in memory
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get a cached NFP by key, or None"""
+        nfp = self._entries.pop(key, None)
+        if nfp is not None:
+            self._entries[key] = nfp
+            self.hits += 1
+            return nfp
+
+        nfp = self._read(key)
+        if nfp is not None:
+            self._remember(key, nfp)
+            self.disk_hits += 1
+        return nfp
+
+    def put(self, key, nfp):
+        """Store an NFP in memory and, with a directory, on disk"""
+        self._remember(key, nfp)
+        self._write(key, nfp)
+
+    def nfp(self, polygon_a, angle_a, polygon_b, angle_b, spacing=0.0):
+        """
+        Get the NFP of polygon_b moving around polygon_a, building it on a miss
+
+        Both polygons are rotated to their angle and moved so their bounding
+        box corner is the reference point, as in noFitPolygon.NfpPacker.
+
+        Returns:
+            noFitPolygon.NoFitPolygon: The NFP
+        """
+        key = nfp_key(polygon_a, angle_a, polygon_b, angle_b, spacing)
+        nfp = self.get(key)
+        if nfp is None:
+            self.misses += 1
+            fixed = noFitPolygon.convex_decomposition(noFitPolygon.rotate_polygon(polygon_a, angle_a)[0])
+            moving = noFitPolygon.convex_decomposition(noFitPolygon.rotate_polygon(polygon_b, angle_b)[0])
+            nfp = noFitPolygon.no_fit_polygon(fixed, moving, spacing)
+            self.put(key, nfp)
+        return nfp
+
+    def source(self, polygons, spacing=0.0):
+        """
+        Get an nfp_source for noFitPolygon.NfpPacker
+
+        Args:
+            polygons: Dict of unrotated outlines by part id
+            spacing: Spacing the packer uses
+
+        Returns:
+            callable: (fixed_key, moving_key) -> NoFitPolygon for shape keys of (part id, angle)
+        """
+        def nfp_source(fixed_key, moving_key):
+            return self.nfp(polygons[fixed_key[0]], fixed_key[1], polygons[moving_key[0]], moving_key[1], spacing)
+        return nfp_source
+
+    def stats(self):
+        """
+        Get the counters and sizes of the cache
+
+        Returns:
+            dict: hits, disk_hits, misses, entries (in memory), disk_entries and disk_bytes
+        """
+        disk_entries = 0
+        disk_bytes = 0
+        if self.directory and os.path.isdir(self.directory):
+            for folder, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith('.json'):
+                        disk_entries += 1
+                        disk_bytes += os.path.getsize(os.path.join(folder, name))
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'disk_entries': disk_entries,
+            'disk_bytes': disk_bytes
+        }
+
+    def clear(self, disk=False):
+        """Forget the entries in memory and reset the counters; with disk, delete the cache files too"""
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if disk and self.directory and os.path.isdir(self.directory):
+            for folder, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith('.json'):
+                        os.remove(os.path.join(folder, name))
+
+    def _remember(self, key, nfp):
+        self._entries.pop(key, None)
+        self._entries[key] = nfp
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def _path(self, key):
+        # Two-character subfolders keep directories small
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as stream:
+                data = json.load(stream)
+            return noFitPolygon.NoFitPolygon([[tuple(point) for point in piece] for piece in data['pieces']],
+                                             [tuple(point) for point in data['candidates']])
+        except (OSError, ValueError, KeyError, TypeError):
+            # A missing, partly written or outdated file is a miss
+            return None
+
+    def _write(self, key, nfp):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see half an entry
+            handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+            try:
+                with os.fdopen(handle, 'w') as stream:
+                    json.dump({'pieces': nfp.pieces, 'candidates': nfp.candidates}, stream, separators=(',', ':'))
+                os.replace(temporary, path)
+            except OSError:
+                os.remove(temporary)
+                raise
+        except OSError:
+            # The cache is an optimization; a read-only or full disk only costs speed
+            pass
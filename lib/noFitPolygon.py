@@ -0,0 +1,549 @@
+"""
+No-fit polygons and bottom-left-fill placement for true-shape nesting.
+
+Parts are simple polygons (their outer loop). The no-fit polygon (NFP) of a
+fixed part A and a moving part B is the set of reference positions of B at
+which B overlaps A. It is built as the union of the Minkowski sums of the
+convex pieces of A with the reflected convex pieces of B, grown by the
+spacing between parts. The union is never formed: a position is blocked when
+it lies strictly inside any piece, and candidate positions are the piece
+vertices and the crossings of piece edges.
+
+The reference point of a part at an angle is the lower-left corner of its
+rotated bounding box, the same convention as nestingPlanner placements. An
+NFP only depends on the two shapes and the spacing, so it is built once per
+pair of part shapes and translated to every placed copy.
+"""
+
+import heapq
+import math
+
+# Positions closer than this to a piece boundary count as touching, not overlapping
+EPSILON = 1e-7
+
+# Sides of the polygon that stands in for the circle of the spacing between parts
+SPACING_SIDES = 8
+
+
+def signed_area(points):
+    """Signed area of a polygon; positive when its points run counter-clockwise"""
+    area = 0.0
+    for i in range(len(points)):
+        x1, y1 = points[i - 1]
+        x2, y2 = points[i]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def convex_hull(points):
+    """
+    Convex hull of a point set (monotone chain)
+
+    Returns:
+        list: Hull vertices counter-clockwise, without collinear points
+    """
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and _cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    upper = []
+    for point in reversed(points):
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+    return lower[:-1] + upper[:-1]
+
+
+def rotate_polygon(points, angle):
+    """
+    Rotate a polygon counter-clockwise about the origin and move the lower-left
+    corner of its bounding box onto the origin
+
+    Returns:
+        tuple: (points, width, height) of the rotated polygon
+    """
+    radians = math.radians(angle)
+    cos_a = math.cos(radians)
+    sin_a = math.sin(radians)
+
+    # Snap exact quarter turns so 90 degree copies stay on the grid
+    if abs(cos_a) < 1e-12:
+        cos_a = 0.0
+    if abs(sin_a) < 1e-12:
+        sin_a = 0.0
+
+    rotated = [(cos_a * x - sin_a * y, sin_a * x + cos_a * y) for x, y in points]
+    min_x = min(x for x, _ in rotated)
+    min_y = min(y for _, y in rotated)
+    rotated = [(x - min_x, y - min_y) for x, y in rotated]
+    return rotated, max(x for x, _ in rotated), max(y for _, y in rotated)
+
+
+def _clean_polygon(points):
+    """Make a polygon counter-clockwise and drop repeated and collinear points"""
+    if signed_area(points) < 0:
+        points = points[::-1]
+
+    cleaned = list(points)
+    changed = True
+    while changed and len(cleaned) > 3:
+        changed = False
+        for i in range(len(cleaned)):
+            previous, current, following = cleaned[i - 1], cleaned[i], cleaned[(i + 1) % len(cleaned)]
+            if current == previous or abs(_cross(previous, current, following)) <= 1e-10:
+                del cleaned[i]
+                changed = True
+                break
+    return cleaned
+
+
+def _is_convex(points):
+    return all(_cross(points[i - 2], points[i - 1], points[i]) >= -EPSILON for i in range(len(points)))
+
+
+def _triangulate(points):
+    """Ear clipping triangulation of a counter-clockwise simple polygon, as index triples"""
+    indices = list(range(len(points)))
+    triangles = []
+    guard = 0
+    while len(indices) > 3 and guard < 2 * len(points) ** 2:
+        guard += 1
+        for i in range(len(indices)):
+            a, b, c = indices[i - 1], indices[i], indices[(i + 1) % len(indices)]
+            if _cross(points[a], points[b], points[c]) <= EPSILON:
+                continue
+
+            # An ear holds no other vertex of the remaining polygon
+            if any(_point_in_triangle(points[other], points[a], points[b], points[c])
+                   for other in indices if other not in (a, b, c)):
+                continue
+
+            triangles.append((a, b, c))
+            del indices[i]
+            break
+        else:
+            # Degenerate input: drop a vertex so the loop always ends
+            del indices[0]
+    if len(indices) == 3:
+        triangles.append(tuple(indices))
+    return triangles
+
+
+def _point_in_triangle(point, a, b, c):
+    return _cross(a, b, point) >= 0 and _cross(b, c, point) >= 0 and _cross(c, a, point) >= 0
+
+
+def convex_decomposition(points):
+    """
+    Split a simple polygon into convex pieces
+
+    Triangulates the polygon and then removes every diagonal whose two sides
+    merge into a convex piece (Hertel-Mehlhorn), which leaves few pieces.
+
+    Returns:
+        list: Convex pieces as counter-clockwise lists of (x, y) tuples
+    """
+    points = _clean_polygon(points)
+    if _is_convex(points):
+        return [points]
+
+    pieces = [list(triangle) for triangle in _triangulate(points)]
+    merged = True
+    while merged:
+        merged = False
+        edges = {}
+        for piece_index, piece in enumerate(pieces):
+            for i in range(len(piece)):
+                edges[(piece[i - 1], piece[i])] = piece_index
+
+        for (a, b), first in edges.items():
+            second = edges.get((b, a))
+            if second is None or second == first:
+                continue
+
+            # Rotate the first piece to run b ... a and the second to run a ... b
+            piece = pieces[first]
+            start = piece.index(b)
+            first_run = piece[start:] + piece[:start]
+            piece = pieces[second]
+            start = piece.index(a)
+            second_run = piece[start:] + piece[:start]
+            candidate = first_run + second_run[1:-1]
+
+            if _is_convex([points[i] for i in candidate]):
+                pieces[first] = candidate
+                del pieces[second]
+                merged = True
+                break
+
+    return [[points[i] for i in piece] for piece in pieces]
+
+
+def minkowski_sum(first, second):
+    """Minkowski sum of two convex polygons, as a counter-clockwise convex polygon"""
+    return convex_hull([(ax + bx, ay + by) for ax, ay in first for bx, by in second])
+
+
+def spacing_polygon(spacing):
+    """Convex polygon around the origin that holds the circle of radius spacing"""
+    if spacing <= 0:
+        return [(0.0, 0.0)]
+    radius = spacing / math.cos(math.pi / SPACING_SIDES)
+    return [(radius * math.cos(2 * math.pi * (i + 0.5) / SPACING_SIDES),
+             radius * math.sin(2 * math.pi * (i + 0.5) / SPACING_SIDES)) for i in range(SPACING_SIDES)]
+
+
+def _segment_intersection(p1, p2, p3, p4):
+    """Crossing point of segments p1-p2 and p3-p4, or None"""
+    d1x, d1y = p2[0] - p1[0], p2[1] - p1[1]
+    d2x, d2y = p4[0] - p3[0], p4[1] - p3[1]
+    denominator = d1x * d2y - d1y * d2x
+    if abs(denominator) < 1e-12:
+        return None
+    ox, oy = p3[0] - p1[0], p3[1] - p1[1]
+    t = (ox * d2y - oy * d2x) / denominator
+    u = (ox * d1y - oy * d1x) / denominator
+    if -EPSILON <= t <= 1 + EPSILON and -EPSILON <= u <= 1 + EPSILON:
+        return (p1[0] + t * d1x, p1[1] + t * d1y)
+    return None
+
+
+def _inside_convex(piece, x, y):
+    """Whether a point lies strictly inside a counter-clockwise convex polygon"""
+    previous_x, previous_y = piece[-1]
+    for current_x, current_y in piece:
+        if (current_x - previous_x) * (y - previous_y) - (current_y - previous_y) * (x - previous_x) <= EPSILON:
+            return False
+        previous_x, previous_y = current_x, current_y
+    return True
+
+
+class NoFitPolygon:
+    """
+    No-fit polygon of a moving shape around a fixed shape at the origin
+
+    pieces      -- convex pieces whose union is the NFP
+    bounds      -- (min_x, min_y, max_x, max_y) of each piece
+    extent      -- bounds of the whole NFP
+    edges       -- (x1, y1, x2, y2, min_x, min_y, max_x, max_y) of each edge of each piece
+    candidates  -- piece vertices and piece edge crossings on the NFP boundary
+    """
+
+    __slots__ = ('pieces', 'bounds', 'extent', 'edges', 'candidates')
+
+    def __init__(self, pieces, candidates=None):
+        """
+        Args:
+            pieces: Convex pieces as counter-clockwise lists of (x, y) tuples
+            candidates: Candidate positions computed before, e.g. by a cache; found here when None
+        """
+        self.pieces = pieces
+        self.edges = [[(x1, y1, x2, y2, min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+                       for (x1, y1), (x2, y2) in zip(piece[-1:] + piece[:-1], piece)] for piece in pieces]
+        self.bounds = [(min(x for x, _ in piece), min(y for _, y in piece),
+                        max(x for x, _ in piece), max(y for _, y in piece)) for piece in pieces]
+        self.extent = (min(b[0] for b in self.bounds), min(b[1] for b in self.bounds),
+                       max(b[2] for b in self.bounds), max(b[3] for b in self.bounds))
+
+        if candidates is not None:
+            self.candidates = candidates
+            return
+
+        points = [point for piece in pieces for point in piece]
+        for i, first in enumerate(pieces):
+            for j in range(i + 1, len(pieces)):
+                if not _bounds_overlap(self.bounds[i], self.bounds[j]):
+                    continue
+                second = pieces[j]
+                for k in range(len(first)):
+                    for m in range(len(second)):
+                        point = _segment_intersection(first[k - 1], first[k], second[m - 1], second[m])
+                        if point is not None:
+                            points.append(point)
+
+        # Points inside another piece are inside the NFP, so they can never be a position
+        self.candidates = [point for point in set(points) if not self.blocks(point[0], point[1])]
+
+    def blocks(self, x, y):
+        """Whether a position relative to the fixed shape overlaps it"""
+        for (min_x, min_y, max_x, max_y), piece in zip(self.bounds, self.pieces):
+            if min_x < x < max_x and min_y < y < max_y and _inside_convex(piece, x, y):
+                return True
+        return False
+
+
+def _bounds_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def no_fit_polygon(fixed_pieces, moving_pieces, spacing=0.0):
+    """
+    Build the NFP of a moving shape around a fixed shape
+
+    Args:
+        fixed_pieces: Convex pieces of the fixed shape
+        moving_pieces: Convex pieces of the moving shape, relative to its reference point
+        spacing: Smallest gap to keep between the shapes
+
+    Returns:
+        NoFitPolygon: The NFP, relative to the fixed shape's reference point
+    """
+    gap = spacing_polygon(spacing)
+    pieces = []
+    for fixed in fixed_pieces:
+        for moving in moving_pieces:
+            piece = minkowski_sum(fixed, [(-x, -y) for x, y in moving])
+            if spacing > 0:
+                piece = minkowski_sum(piece, gap)
+            pieces.append(piece)
+    return NoFitPolygon(pieces)
+
+
+class NfpPacker:
+    """
+    Bottom-left-fill placement of polygon shapes on one sheet
+
+    Shapes are registered once with add_shape and identified by a key, such
+    as (part id, angle). Every shape keeps a heap of candidate positions,
+    lowest first. Parts are only ever added, so a position that is blocked
+    once stays blocked and is dropped for good; each candidate is checked
+    against the placed parts near it through a grid of their footprints.
+    """
+
+    def __init__(self, width, height, spacing=0.0, nfp_source=None):
+        """
+        Args:
+            width: Usable sheet width; parts are placed in [0, width]
+            height: Usable sheet height
+            spacing: Smallest gap between parts
+            nfp_source: Optional callable (fixed_key, moving_key) -> NoFitPolygon
+                        used instead of building every NFP here
+        """
+        self.width = width
+        self.height = height
+        self.spacing = spacing
+        self.nfp_source = nfp_source
+        self.shapes = {}
+        self.placed = []
+        self._nfps = {}
+        self._candidates = {}
+        self._seen = {}
+        self._grid = {}
+        self._cell = 1.0
+
+    def add_shape(self, key, polygon):
+        """
+        Register a shape that can be placed
+
+        Args:
+            key: Hashable identifier of the shape
+            polygon: Outer loop with its bounding box lower-left corner at the origin
+        """
+        width = max(x for x, _ in polygon)
+        height = max(y for _, y in polygon)
+        self.shapes[key] = (convex_decomposition(polygon), width, height)
+        cell = max(self._cell, width + self.spacing, height + self.spacing)
+        if cell != self._cell:
+            self._cell = cell
+            self._grid = {}
+            for index, (placed_key, x, y) in enumerate(self.placed):
+                _, placed_width, placed_height = self.shapes[placed_key]
+                for grid_cell in self._cells(x, y, x + placed_width, y + placed_height):
+                    self._grid.setdefault(grid_cell, []).append(index)
+
+        # The corners of the sheet area this shape can reach are the first candidates
+        max_x = self.width - width
+        max_y = self.height - height
+        heap = []
+        if max_x >= -EPSILON and max_y >= -EPSILON:
+            heap = [(0.0, 0.0), (0.0, max(0.0, max_x)), (max(0.0, max_y), 0.0), (max(0.0, max_y), max(0.0, max_x))]
+            heapq.heapify(heap)
+        self._candidates[key] = heap
+        self._seen[key] = set()
+        for index in range(len(self.placed)):
+            self._add_candidates(index, key)
+
+    def fits(self, key):
+        """Whether a shape fits on the empty sheet"""
+        _, width, height = self.shapes[key]
+        return width <= self.width + EPSILON and height <= self.height + EPSILON
+
+    def nfp(self, fixed_key, moving_key):
+        """NFP of one registered shape moving around another"""
+        pair = (fixed_key, moving_key)
+        nfp = self._nfps.get(pair)
+        if nfp is None:
+            if self.nfp_source is not None:
+                nfp = self.nfp_source(fixed_key, moving_key)
+            else:
+                nfp = no_fit_polygon(self.shapes[fixed_key][0], self.shapes[moving_key][0], self.spacing)
+            self._nfps[pair] = nfp
+        return nfp
+
+    def find_position(self, key):
+        """
+        Get the lowest, then leftmost, free position of a shape
+
+        Returns:
+            tuple: (x, y), or None if the shape no longer fits anywhere
+        """
+        heap = self._candidates[key]
+        while heap:
+            y, x = heap[0]
+            if self._is_free(key, x, y):
+                return (x, y)
+            heapq.heappop(heap)
+        return None
+
+    def place(self, key, x, y):
+        """Place a shape at a position and add the positions it creates for every shape"""
+        _, width, height = self.shapes[key]
+        index = len(self.placed)
+        self.placed.append((key, x, y))
+        for cell in self._cells(x, y, x + width, y + height):
+            self._grid.setdefault(cell, []).append(index)
+
+        for moving_key in self.shapes:
+            self._add_candidates(index, moving_key)
+
+    def insert(self, key):
+        """Place a shape at its bottom-left position; returns (x, y) or None"""
+        position = self.find_position(key)
+        if position is not None:
+            self.place(key, *position)
+        return position
+
+    def _cells(self, min_x, min_y, max_x, max_y):
+        cell = self._cell
+        for i in range(int(math.floor(min_x / cell)), int(math.floor(max_x / cell)) + 1):
+            for j in range(int(math.floor(min_y / cell)), int(math.floor(max_y / cell)) + 1):
+                yield (i, j)
+
+    def _nearby(self, min_x, min_y, max_x, max_y):
+        found = set()
+        for cell in self._cells(min_x, min_y, max_x, max_y):
+            found.update(self._grid.get(cell, ()))
+        return found
+
+    def _is_free(self, key, x, y):
+        _, width, height = self.shapes[key]
+        if x < -EPSILON or y < -EPSILON or x > self.width - width + EPSILON or y > self.height - height + EPSILON:
+            return False
+
+        spacing = self.spacing
+        cell = self._cell
+        grid = self._grid
+        placed = self.placed
+        nfps = self._nfps
+        checked = set()
+        for i in range(int(math.floor((x - spacing) / cell)), int(math.floor((x + width + spacing) / cell)) + 1):
+            for j in range(int(math.floor((y - spacing) / cell)), int(math.floor((y + height + spacing) / cell)) + 1):
+                for index in grid.get((i, j), ()):
+                    if index in checked:
+                        continue
+                    checked.add(index)
+                    placed_key, placed_x, placed_y = placed[index]
+                    nfp = nfps.get((placed_key, key)) or self.nfp(placed_key, key)
+                    if nfp.blocks(x - placed_x, y - placed_y):
+                        return False
+        return True
+
+    def _add_candidates(self, placed_index, moving_key):
+        """Add the NFP boundary points of a placed part, and crossings with its neighbours, as candidates"""
+        placed_key, placed_x, placed_y = self.placed[placed_index]
+        _, width, height = self.shapes[moving_key]
+        max_x = self.width - width
+        max_y = self.height - height
+        if max_x < -EPSILON or max_y < -EPSILON:
+            return
+
+        heap = self._candidates[moving_key]
+        nfp = self.nfp(placed_key, moving_key)
+
+        seen = self._seen[moving_key]
+
+        def push(x, y):
+            if -EPSILON <= x <= max_x + EPSILON and -EPSILON <= y <= max_y + EPSILON:
+                # Touching parts share many NFP points, so each position is queued once
+                rounded = (round(y, 6), round(x, 6))
+                if rounded not in seen:
+                    seen.add(rounded)
+                    heapq.heappush(heap, (min(max(y, 0.0), max(max_y, 0.0)), min(max(x, 0.0), max(max_x, 0.0))))
+
+        for x, y in nfp.candidates:
+            push(x + placed_x, y + placed_y)
+
+        # Crossings with the edges of the area the moving shape can reach
+        boundary = ((0.0, 0.0), (max_x, 0.0), (max_x, max_y), (0.0, max_y))
+        pieces = [[(x + placed_x, y + placed_y) for x, y in piece] for piece in nfp.pieces]
+        for piece in pieces:
+            for k in range(len(piece)):
+                for m in range(4):
+                    point = _segment_intersection(piece[k - 1], piece[k], boundary[m - 1], boundary[m])
+                    if point is not None:
+                        push(*point)
+
+        # Crossings with the NFPs of the placed parts around this one
+        extent = nfp.extent
+        min_x, min_y = placed_x + extent[0], placed_y + extent[1]
+        max_ex, max_ey = placed_x + extent[2], placed_y + extent[3]
+        spacing = self.spacing
+        for index in self._nearby(min_x - spacing, min_y - spacing,
+                                  max_ex + width + spacing, max_ey + height + spacing):
+            if index == placed_index:
+                continue
+            other_key, other_x, other_y = self.placed[index]
+            other = self.nfp(other_key, moving_key)
+            for edges, bounds in zip(nfp.edges, nfp.bounds):
+                for other_edges, other_bounds in zip(other.edges, other.bounds):
+                    # Only edges that reach into the overlap of the two pieces can cross
+                    overlap = (max(bounds[0] + placed_x, other_bounds[0] + other_x),
+                               max(bounds[1] + placed_y, other_bounds[1] + other_y),
+                               min(bounds[2] + placed_x, other_bounds[2] + other_x),
+                               min(bounds[3] + placed_y, other_bounds[3] + other_y))
+                    if overlap[0] > overlap[2] or overlap[1] > overlap[3]:
+                        continue
+                    for point in _edge_crossings(edges, placed_x, placed_y, other_edges, other_x, other_y, overlap):
+                        push(*point)
+
+
+def _edge_crossings(edges, dx, dy, other_edges, other_dx, other_dy, overlap):
+    """Crossings of two translated edge lists inside a rectangle"""
+    min_x, min_y, max_x, max_y = overlap
+    first = [(x1 + dx, y1 + dy, x2 + dx, y2 + dy) for x1, y1, x2, y2, ex1, ey1, ex2, ey2 in edges
+             if ex1 + dx <= max_x and ex2 + dx >= min_x and ey1 + dy <= max_y and ey2 + dy >= min_y]
+    if not first:
+        return []
+    second = [(x1 + other_dx, y1 + other_dy, x2 + other_dx, y2 + other_dy)
+              for x1, y1, x2, y2, ex1, ey1, ex2, ey2 in other_edges
+              if ex1 + other_dx <= max_x and ex2 + other_dx >= min_x and
+              ey1 + other_dy <= max_y and ey2 + other_dy >= min_y]
+
+    points = []
+    for x1, y1, x2, y2 in first:
+        d1x = x2 - x1
+        d1y = y2 - y1
+        for x3, y3, x4, y4 in second:
+            d2x = x4 - x3
+            d2y = y4 - y3
+            denominator = d1x * d2y - d1y * d2x
+            if abs(denominator) < 1e-12:
+                continue
+            ox = x3 - x1
+            oy = y3 - y1
+            t = (ox * d2y - oy * d2x) / denominator
+            if t < -EPSILON or t > 1 + EPSILON:
+                continue
+            u = (ox * d1y - oy * d1x) / denominator
+            if -EPSILON <= u <= 1 + EPSILON:
+                points.append((x1 + t * d1x, y1 + t * d1y))
+    return points
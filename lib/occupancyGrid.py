@@ -0,0 +1,229 @@
+"""
+Raster nesting on a sheet occupancy grid.
+
+Every part is drawn once per angle into a bitmask of square cells: a cell is
+set when the part covers its center or any of the part's edges pass through
+it, so the mask holds the whole part and holes stay clear. Arcs, splines and
+holes need no special cases once the outline is a set of closed loops.
+
+Whether a part at a given offset from a placed part overlaps it is the
+cross-correlation of the two masks, computed once per pair of shapes with an
+FFT. That blocked map is the raster counterpart of a no-fit polygon: placing
+a part ORs it into the free-position map of every shape, and the next
+bottom-left position is the first free cell of that map.
+
+NumPy is required; callers check HAS_NUMPY and use exact geometry otherwise.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from . import partSnapshot
+except ImportError:
+    import partSnapshot
+
+HAS_NUMPY = np is not None
+
+
+def loops_area(loops):
+    """
+    Area covered by closed loops under the even-odd rule
+
+    A loop inside an odd number of other loops is a hole.
+
+    Returns:
+        float: The area
+    """
+    area = 0.0
+    for index, loop in enumerate(loops):
+        depth = sum(1 for other_index, other in enumerate(loops)
+                    if other_index != index and partSnapshot.point_in_polygon(loop[0][0], loop[0][1], other))
+        area += abs(partSnapshot.polygon_area(loop)) * (-1 if depth % 2 else 1)
+    return area
+
+
+def rasterize(loops, angle, resolution, dilation=0.0):
+    """
+    Draw closed loops, rotated about the origin, into a bitmask
+
+    Args:
+        loops: Closed loops as lists of (x, y) tuples; holes are filled by the even-odd rule
+        angle: Counter-clockwise rotation in degrees
+        resolution: Cell size
+        dilation: Distance to grow the shape by, e.g. the spacing between parts
+
+    Returns:
+        tuple: (mask, margin) where mask is a bool array indexed [row, column]
+               from the lower-left corner of the rotated bounding box, extended
+               by margin cells on every side for the dilation
+    """
+    radians = math.radians(angle)
+    cos_a = math.cos(radians)
+    sin_a = math.sin(radians)
+
+    # Snap exact quarter turns so 90 degree copies stay on the grid
+    if abs(cos_a) < 1e-12:
+        cos_a = 0.0
+    if abs(sin_a) < 1e-12:
+        sin_a = 0.0
+
+    rotated = [np.array([(cos_a * x - sin_a * y, sin_a * x + cos_a * y) for x, y in loop]) for loop in loops]
+    min_x = min(loop[:, 0].min() for loop in rotated)
+    min_y = min(loop[:, 1].min() for loop in rotated)
+    rotated = [(loop - (min_x, min_y)) / resolution for loop in rotated]
+    columns = max(1, int(math.ceil(max(loop[:, 0].max() for loop in rotated) - 1e-9)))
+    rows = max(1, int(math.ceil(max(loop[:, 1].max() for loop in rotated) - 1e-9)))
+
+    starts = np.concatenate([np.roll(loop, 1, axis=0) for loop in rotated])
+    ends = np.concatenate(rotated)
+    mask = np.zeros((rows, columns), dtype=bool)
+
+    # Cells whose center is inside, row by row from the sorted edge crossings
+    x1, y1, x2, y2 = starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+    centers_x = np.arange(columns) + 0.5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for row in range(rows):
+            center_y = row + 0.5
+            crossing = (y1 > center_y) != (y2 > center_y)
+            xs = np.sort(x1[crossing] + (center_y - y1[crossing]) * (x2[crossing] - x1[crossing]) /
+                         (y2[crossing] - y1[crossing]))
+            mask[row] = np.searchsorted(xs, centers_x) % 2 == 1
+
+    # Cells an edge passes through, sampled at a quarter of a cell
+    lengths = np.hypot(x2 - x1, y2 - y1)
+    steps = np.ceil(lengths * 4).astype(int) + 1
+    t = np.concatenate([np.linspace(0, 1, count) for count in steps])
+    edge = np.repeat(np.arange(len(steps)), steps)
+    columns_hit = np.clip((x1[edge] + t * (x2[edge] - x1[edge])).astype(int), 0, columns - 1)
+    rows_hit = np.clip((y1[edge] + t * (y2[edge] - y1[edge])).astype(int), 0, rows - 1)
+    mask[rows_hit, columns_hit] = True
+
+    if dilation <= 0:
+        return mask, 0
+
+    # Cells hold their shape anywhere inside, so cell centers must be a diagonal further apart
+    radius = dilation / resolution + math.sqrt(2)
+    margin = int(math.ceil(radius))
+    grown = np.zeros((rows + 2 * margin, columns + 2 * margin), dtype=bool)
+    for dy in range(-margin, margin + 1):
+        for dx in range(-margin, margin + 1):
+            if dx * dx + dy * dy <= radius * radius:
+                grown[margin + dy:margin + dy + rows, margin + dx:margin + dx + columns] |= mask
+    return grown, margin
+
+
+def blocked_offsets(fixed_mask, moving_mask, moving_margin):
+    """
+    Offsets of a moving shape from a fixed shape at which they overlap
+
+    Args:
+        fixed_mask: Bitmask of the fixed shape
+        moving_mask: Dilated bitmask of the moving shape
+        moving_margin: Margin of the moving mask from rasterize
+
+    Returns:
+        tuple: (blocked, row_offset, column_offset) where blocked[i, j] tells whether
+               the moving shape overlaps at row_offset + i, column_offset + j cells
+               from the fixed shape
+    """
+    rows = fixed_mask.shape[0] + moving_mask.shape[0] - 1
+    columns = fixed_mask.shape[1] + moving_mask.shape[1] - 1
+    correlation = np.fft.irfft2(np.fft.rfft2(fixed_mask, (rows, columns)) *
+                                np.conj(np.fft.rfft2(moving_mask, (rows, columns))), (rows, columns))
+
+    # Move negative offsets from the end of the circular correlation to the front
+    correlation = np.roll(correlation, (moving_mask.shape[0] - 1, moving_mask.shape[1] - 1), axis=(0, 1))
+    return (correlation > 0.5,
+            moving_margin - (moving_mask.shape[0] - 1),
+            moving_margin - (moving_mask.shape[1] - 1))
+
+
+class GridPacker:
+    """
+    Bottom-left-fill placement of bitmask shapes on one sheet
+
+    Each shape keeps a map of the positions blocked for it, indexed by the
+    cell of its mask's lower-left corner. Maps only gain blocked cells, so
+    the search for the first free cell resumes where it last stopped.
+    """
+
+    def __init__(self, rows, columns):
+        """
+        Args:
+            rows: Grid rows of the usable sheet area
+            columns: Grid columns of the usable sheet area
+        """
+        self.rows = rows
+        self.columns = columns
+        self.shapes = {}
+        self.placed = []
+        self._blocked = {}
+        self._pairs = {}
+        self._next = {}
+
+    def add_shape(self, key, mask, grown_mask, margin):
+        """
+        Register a shape that can be placed
+
+        Args:
+            key: Hashable identifier of the shape
+            mask: Bitmask of the shape
+            grown_mask: Bitmask grown by the spacing to keep from other shapes
+            margin: Margin of grown_mask from rasterize
+        """
+        self.shapes[key] = (mask, grown_mask, margin)
+        rows = self.rows - mask.shape[0] + 1
+        columns = self.columns - mask.shape[1] + 1
+        self._blocked[key] = np.zeros((max(0, rows), max(0, columns)), dtype=bool)
+        self._next[key] = 0
+        for fixed_key, row, column in self.placed:
+            self._block(fixed_key, row, column, key)
+
+    def find_position(self, key):
+        """
+        Get the lowest, then leftmost, free cell of a shape
+
+        Returns:
+            tuple: (row, column), or None if the shape no longer fits anywhere
+        """
+        blocked = self._blocked[key]
+        if not blocked.size:
+            return None
+        flat = blocked.reshape(-1)
+        start = self._next[key]
+        if start >= flat.size:
+            return None
+        index = start + int(np.argmin(flat[start:]))
+        if flat[index]:
+            self._next[key] = flat.size
+            return None
+        self._next[key] = index
+        return divmod(index, blocked.shape[1])
+
+    def place(self, key, row, column):
+        """Place a shape at a cell and block the positions it covers for every shape"""
+        self.placed.append((key, row, column))
+        for moving_key in self.shapes:
+            self._block(key, row, column, moving_key)
+
+    def _block(self, fixed_key, row, column, moving_key):
+        pair = (fixed_key, moving_key)
+        if pair not in self._pairs:
+            moving = self.shapes[moving_key]
+            self._pairs[pair] = blocked_offsets(self.shapes[fixed_key][0], moving[1], moving[2])
+        offsets, row_offset, column_offset = self._pairs[pair]
+
+        blocked = self._blocked[moving_key]
+        top = row + row_offset
+        left = column + column_offset
+        bottom = min(blocked.shape[0], top + offsets.shape[0])
+        right = min(blocked.shape[1], left + offsets.shape[1])
+        if bottom <= 0 or right <= 0 or top >= blocked.shape[0] or left >= blocked.shape[1]:
+            return
+        blocked[max(0, top):bottom, max(0, left):right] |= \
+            offsets[max(0, -top):bottom - top, max(0, -left):right - left]
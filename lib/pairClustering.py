@@ -0,0 +1,214 @@
+"""
+Interlocking pairs of irregular parts for the rectangle engines.
+
+Two L shapes, trapezoids or triangles, one turned 180 degrees against the
+other, often make a near-rectangle whose bounding box is much smaller than
+the boxes of the two parts. The touching positions of one part around the
+other lie on the boundary of their no-fit polygon, so its vertices and the
+points along its edges where the two boxes line up are scored by the box of
+the pair, and the smallest box wins.
+
+cluster_pairs matches part types with themselves and with each other and
+turns the pairs worth making into super-parts: plain rectangles with a
+quantity, ready for any rectangle engine. expand_pairs turns the placed
+super-parts back into placements of the parts they hold.
+"""
+
+from typing import NamedTuple, Tuple
+
+try:
+    from . import noFitPolygon, rectangleDecomposition
+except ImportError:
+    import noFitPolygon
+    import rectangleDecomposition
+
+# Smallest fraction of the two parts' box area a pair must save to be used
+PAIR_MIN_GAIN = 0.05
+
+
+class Pair(NamedTuple):
+    """
+    Two parts placed together as one rectangle
+
+    members -- (part_id, angle, dx, dy, width, height) of each part, dx and dy being
+               the lower-left corner of its rotated bounding box inside the pair's box
+    width   -- Width of the pair's bounding box
+    height  -- Height of the pair's bounding box
+    area    -- Area of the two parts
+    """
+    members: Tuple[Tuple[object, float, float, float, float, float], ...]
+    width: float
+    height: float
+    area: float
+
+    @property
+    def density(self):
+        return self.area / (self.width * self.height)
+
+
+def _shape(polygon, angle):
+    points, width, height = noFitPolygon.rotate_polygon(polygon, angle)
+    return noFitPolygon.convex_decomposition(points), width, height
+
+
+def _aligned_positions(nfp, xs, ys):
+    """
+    Positions on the NFP boundary where the moving part's x or y takes one of the given values
+
+    Sliding one part along another changes the pair's box linearly until the
+    parts' boxes line up, so the smallest box is at an NFP vertex or at one of
+    these points.
+    """
+    positions = []
+    for edges in nfp.edges:
+        for x1, y1, x2, y2, _, _, _, _ in edges:
+            for value, start, end in [(x, x1, x2) for x in xs] + [(y, y1, y2) for y in ys]:
+                if start == end or not min(start, end) <= value <= max(start, end):
+                    continue
+                t = (value - start) / (end - start)
+                x, y = x1 + t * (x2 - x1), y1 + t * (y2 - y1)
+                if not nfp.blocks(x, y):
+                    positions.append((x, y))
+    return positions
+
+
+def best_pair(first, second, spacing=0.0, angles=(0.0, 90.0), first_id='first', second_id='second'):
+    """
+    Find the touching arrangement of two parts with the smallest bounding box
+
+    The second part is tried turned 180 degrees against the first and at the
+    same angle, at every vertex of their no-fit polygon and where the boxes of
+    the two parts line up along its edges.
+
+    Args:
+        first: Outer loop of the first part as (x, y) points
+        second: Outer loop of the second part as (x, y) points
+        spacing: Smallest gap between the parts
+        angles: Angles of the first part to try; angles a quarter turn apart give the same pair
+        first_id: Part id stored on the first member
+        second_id: Part id stored on the second member
+
+    Returns:
+        Pair: The densest pair, or None if no touching position was found
+    """
+    area = abs(noFitPolygon.signed_area(first)) + abs(noFitPolygon.signed_area(second))
+    # Turning both parts a quarter turn turns the pair's box with them, so only the angle
+    # within a quarter turn matters
+    quarter_angles = []
+    for angle in angles:
+        if all(round((angle - other) % 90, 6) % 90 != 0 for other in quarter_angles):
+            quarter_angles.append(angle)
+
+    best = None
+    for angle in quarter_angles:
+        pieces, width, height = _shape(first, angle)
+        for second_angle in ((angle + 180) % 360, angle):
+            second_pieces, second_width, second_height = _shape(second, second_angle)
+            nfp = noFitPolygon.no_fit_polygon(pieces, second_pieces, spacing)
+            aligned = _aligned_positions(nfp, (0.0, width - second_width), (0.0, height - second_height))
+            for x, y in nfp.candidates + aligned:
+                left, bottom = min(0.0, x), min(0.0, y)
+                box_width = max(width, x + second_width) - left
+                box_height = max(height, y + second_height) - bottom
+                if best is None or box_width * box_height < best.width * best.height - 1e-9:
+                    best = Pair(((first_id, angle, -left, -bottom, width, height),
+                                 (second_id, second_angle, x - left, y - bottom, second_width, second_height)),
+                                box_width, box_height, area)
+    return best
+
+
+def cluster_pairs(parts_list, spacing=0.0, angles=(0.0, 90.0), min_gain=PAIR_MIN_GAIN):
+    """
+    Group irregular parts into interlocking pairs for the rectangle engines
+
+    Every pairing of a part type with itself and with each other type is
+    scored by the box area it saves, counting the spacing each box reserves.
+    Pairs are made greedily, best saving first, while both part types have
+    copies left. Work grows with the square of the number of part types.
+
+    Args:
+        parts_list: List of parts with 'id', 'polygon' (outer loop as (x, y) points) and 'quantity'
+        spacing: Smallest gap between parts
+        angles: Angles of the first part of a pair to try
+        min_gain: Smallest fraction of the box area a pair must save
+
+    Returns:
+        tuple: (items, pairs) where items is a parts list with 'id', 'width', 'height' and
+               'quantity' for the rectangle engines, and pairs maps the id of every
+               super-part in it to its Pair; other items are single parts by their own id
+    """
+    boxes = {}
+    for part in parts_list:
+        _, width, height = noFitPolygon.rotate_polygon(part['polygon'], 0.0)
+        boxes[part['id']] = (width, height)
+
+    def box_area(width, height):
+        return (width + spacing) * (height + spacing)
+
+    candidates = []
+    for i, first in enumerate(parts_list):
+        for second in parts_list[i:]:
+            if first is second and first['quantity'] < 2:
+                continue
+            pair = best_pair(first['polygon'], second['polygon'], spacing, angles, first['id'], second['id'])
+            if pair is None:
+                continue
+            separate = box_area(*boxes[first['id']]) + box_area(*boxes[second['id']])
+            gain = 1 - box_area(pair.width, pair.height) / separate
+            if gain >= min_gain:
+                candidates.append((gain, pair))
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+    remaining = {part['id']: part['quantity'] for part in parts_list}
+    items = []
+    pairs = {}
+    for _, pair in candidates:
+        first_id, second_id = pair.members[0][0], pair.members[1][0]
+        if first_id == second_id:
+            count = remaining[first_id] // 2
+        else:
+            count = min(remaining[first_id], remaining[second_id])
+        if count <= 0:
+            continue
+        remaining[first_id] -= count
+        remaining[second_id] -= count
+        pair_id = f"pair:{len(pairs)}"
+        pairs[pair_id] = pair
+        items.append({'id': pair_id, 'width': pair.width, 'height': pair.height, 'quantity': count})
+
+    for part in parts_list:
+        if remaining[part['id']] > 0:
+            width, height = boxes[part['id']]
+            items.append({'id': part['id'], 'width': width, 'height': height, 'quantity': remaining[part['id']]})
+    return items, pairs
+
+
+def expand_pairs(placements, pairs):
+    """
+    Turn placements of super-parts into placements of the parts they hold
+
+    Args:
+        placements: Placements from a rectangle engine, with 'part_id', 'x', 'y' and 'rotated'
+        pairs: Pairs by super-part id, from cluster_pairs
+
+    Returns:
+        list: Placements with 'part_id', 'x' and 'y' of the lower-left corner of the rotated
+              part's bounding box, 'rotation' in degrees and 'rotated'; other keys, such as
+              'sheet', are kept
+    """
+    expanded = []
+    for placement in placements:
+        pair = pairs.get(placement['part_id'])
+        if pair is None:
+            rotation = 90 if placement['rotated'] else 0
+            expanded.append(dict(placement, rotation=rotation))
+            continue
+
+        turn = 90 if placement['rotated'] else 0
+        for part_id, angle, dx, dy, width, height in pair.members:
+            (x, y, _, _), = rectangleDecomposition.rotate_rectangles([(dx, dy, width, height)],
+                                                                     pair.width, pair.height, turn)
+            rotation = (angle + turn) % 360
+            expanded.append(dict(placement, part_id=part_id, x=placement['x'] + x, y=placement['y'] + y,
+                                 rotation=rotation, rotated=rotation % 180 != 0))
+    return expanded
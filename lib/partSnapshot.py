@@ -0,0 +1,666 @@
+"""
+Compact, Fusion-independent snapshot of a part's sketch geometry.
+
+Reading curve properties through the Fusion API is slow, so the geometry of
+the selected sketch is read once into flat arrays and every placement and
+rotation is generated from this snapshot. All lengths are in cm and all
+angles are in radians.
+"""
+
+import math
+from array import array
+
+try:
+    from . import noFitPolygon
+except ImportError:
+    import noFitPolygon
+
+
+class PartSnapshot:
+    """
+    Array-backed copy of the curves in a part sketch
+
+    lines    -- (x1, y1, x2, y2) per line
+    arcs     -- (center_x, center_y, start_x, start_y, sweep) per arc, sweeping counter-clockwise
+    circles  -- (center_x, center_y, radius) per circle
+    splines  -- fit points (x, y) of all fitted splines, split by spline_offsets
+    """
+
+    __slots__ = ('lines', 'arcs', 'circles', 'spline_points', 'spline_offsets', '_bbox')
+
+    LINE_STRIDE = 4
+    ARC_STRIDE = 5
+    CIRCLE_STRIDE = 3
+
+    def __init__(self):
+        self.lines = array('d')
+        self.arcs = array('d')
+        self.circles = array('d')
+        self.spline_points = array('d')
+        self.spline_offsets = array('l', [0])
+        self._bbox = None
+
+    def add_line(self, x1, y1, x2, y2):
+        self.lines.extend((x1, y1, x2, y2))
+        self._bbox = None
+
+    def add_arc(self, center_x, center_y, start_x, start_y, sweep):
+        self.arcs.extend((center_x, center_y, start_x, start_y, sweep))
+        self._bbox = None
+
+    def add_circle(self, center_x, center_y, radius):
+        self.circles.extend((center_x, center_y, radius))
+        self._bbox = None
+
+    def add_spline(self, points):
+        for x, y in points:
+            self.spline_points.extend((x, y))
+        self.spline_offsets.append(len(self.spline_points))
+        self._bbox = None
+
+    @property
+    def line_count(self):
+        return len(self.lines) // self.LINE_STRIDE
+
+    @property
+    def arc_count(self):
+        return len(self.arcs) // self.ARC_STRIDE
+
+    @property
+    def circle_count(self):
+        return len(self.circles) // self.CIRCLE_STRIDE
+
+    @property
+    def spline_count(self):
+        return len(self.spline_offsets) - 1
+
+    @property
+    def curve_count(self):
+        return self.line_count + self.arc_count + self.circle_count + self.spline_count
+
+    def splines(self):
+        """Yield the flat (x, y, x, y, ...) fit point array of each spline"""
+        offsets = self.spline_offsets
+        for i in range(len(offsets) - 1):
+            yield self.spline_points[offsets[i]:offsets[i + 1]]
+
+    def rotated(self, angle):
+        """
+        Get a copy of the snapshot rotated counter-clockwise about the origin
+
+        Args:
+            angle: Rotation in radians
+
+        Returns:
+            PartSnapshot: The rotated copy
+        """
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+
+        def rotate(values, stride, points):
+            # Rotate the first points (x, y) of every record; radii and sweeps are unchanged
+            values = array('d', values)
+            for i in range(0, len(values), stride):
+                for j in range(i, i + 2 * points, 2):
+                    x, y = values[j], values[j + 1]
+                    values[j] = cos_a * x - sin_a * y
+                    values[j + 1] = sin_a * x + cos_a * y
+            return values
+
+        snapshot = PartSnapshot()
+        snapshot.lines = rotate(self.lines, self.LINE_STRIDE, 2)
+        snapshot.arcs = rotate(self.arcs, self.ARC_STRIDE, 2)
+        snapshot.circles = rotate(self.circles, self.CIRCLE_STRIDE, 1)
+        snapshot.spline_points = rotate(self.spline_points, 2, 1)
+        snapshot.spline_offsets = array('l', self.spline_offsets)
+        return snapshot
+
+    @property
+    def bbox(self):
+        """Bounding box (min_x, max_x, min_y, max_y), or None for an empty snapshot"""
+        if self._bbox is None:
+            self._bbox = self._calculate_bbox()
+        return self._bbox
+
+    def _calculate_bbox(self):
+        xs = []
+        ys = []
+
+        lines = self.lines
+        for i in range(0, len(lines), self.LINE_STRIDE):
+            xs.extend((lines[i], lines[i + 2]))
+            ys.extend((lines[i + 1], lines[i + 3]))
+
+        circles = self.circles
+        for i in range(0, len(circles), self.CIRCLE_STRIDE):
+            cx, cy, r = circles[i], circles[i + 1], circles[i + 2]
+            xs.extend((cx - r, cx + r))
+            ys.extend((cy - r, cy + r))
+
+        arcs = self.arcs
+        for i in range(0, len(arcs), self.ARC_STRIDE):
+            for x, y in arc_extreme_points(*arcs[i:i + self.ARC_STRIDE]):
+                xs.append(x)
+                ys.append(y)
+
+        points = self.spline_points
+        xs.extend(points[0::2])
+        ys.extend(points[1::2])
+
+        if not xs:
+            return None
+        return (min(xs), max(xs), min(ys), max(ys))
+
+
+def arc_extreme_points(center_x, center_y, start_x, start_y, sweep):
+    """
+    Get the points that bound an arc: its end points and any axis crossings
+
+    Returns:
+        list: (x, y) tuples
+    """
+    radius = math.hypot(start_x - center_x, start_y - center_y)
+    start_angle = math.atan2(start_y - center_y, start_x - center_x)
+    end_angle = start_angle + sweep
+    points = [(start_x, start_y),
+              (center_x + radius * math.cos(end_angle), center_y + radius * math.sin(end_angle))]
+
+    # Add every quarter-turn direction swept by the arc
+    quarter = math.ceil(start_angle / (math.pi / 2))
+    while quarter * (math.pi / 2) <= end_angle:
+        angle = quarter * (math.pi / 2)
+        points.append((center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)))
+        quarter += 1
+
+    return points
+
+
+def arc_points(center_x, center_y, start_x, start_y, sweep, tolerance):
+    """
+    Approximate an arc by a polyline whose chords stay within tolerance of it
+
+    Returns:
+        list: (x, y) tuples from the start to the end of the arc
+    """
+    radius = math.hypot(start_x - center_x, start_y - center_y)
+    start_angle = math.atan2(start_y - center_y, start_x - center_x)
+    if radius > tolerance:
+        step = 2 * math.acos(1 - tolerance / radius)
+    else:
+        step = math.pi / 2
+    segments = max(1, math.ceil(abs(sweep) / step))
+    return [(center_x + radius * math.cos(start_angle + sweep * i / segments),
+             center_y + radius * math.sin(start_angle + sweep * i / segments)) for i in range(segments + 1)]
+
+
+def closed_loops(snapshot, tolerance=0.02):
+    """
+    Chain the curves of a snapshot into closed polygons
+
+    Curves are joined where their end points meet within tolerance; arcs,
+    circles and splines are flattened with chords at most tolerance from the
+    curve. Chains that do not close are ignored.
+
+    Args:
+        snapshot: The PartSnapshot to read
+        tolerance: Largest gap between joined curves and largest chord error (cm)
+
+    Returns:
+        list: Closed loops as lists of (x, y) tuples, without repeating the first point
+    """
+    loops = []
+    chains = []
+
+    lines = snapshot.lines
+    for i in range(0, len(lines), snapshot.LINE_STRIDE):
+        chains.append([(lines[i], lines[i + 1]), (lines[i + 2], lines[i + 3])])
+
+    arcs = snapshot.arcs
+    for i in range(0, len(arcs), snapshot.ARC_STRIDE):
+        chains.append(arc_points(*arcs[i:i + snapshot.ARC_STRIDE], tolerance))
+
+    circles = snapshot.circles
+    for i in range(0, len(circles), snapshot.CIRCLE_STRIDE):
+        center_x, center_y, radius = circles[i:i + snapshot.CIRCLE_STRIDE]
+        loops.append(arc_points(center_x, center_y, center_x + radius, center_y, 2 * math.pi, tolerance)[:-1])
+
+    for spline in snapshot.splines():
+        chains.append(list(zip(spline[0::2], spline[1::2])))
+
+    # Index chain ends on a grid of the tolerance so matching ends are found directly
+    def key(point):
+        return (round(point[0] / tolerance), round(point[1] / tolerance))
+
+    ends = {}
+    for index, chain in enumerate(chains):
+        for point in (chain[0], chain[-1]):
+            ends.setdefault(key(point), []).append(index)
+
+    def find_next(point, used):
+        cell_x, cell_y = key(point)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for index in ends.get((cell_x + dx, cell_y + dy), ()):
+                    if index in used:
+                        continue
+                    chain = chains[index]
+                    if math.hypot(chain[0][0] - point[0], chain[0][1] - point[1]) <= tolerance:
+                        return index, chain
+                    if math.hypot(chain[-1][0] - point[0], chain[-1][1] - point[1]) <= tolerance:
+                        return index, chain[::-1]
+        return None, None
+
+    used = set()
+    for start_index, start_chain in enumerate(chains):
+        if start_index in used:
+            continue
+        used.add(start_index)
+        loop = list(start_chain)
+        while math.hypot(loop[-1][0] - loop[0][0], loop[-1][1] - loop[0][1]) > tolerance or len(loop) < 3:
+            index, chain = find_next(loop[-1], used)
+            if index is None:
+                break
+            used.add(index)
+            loop.extend(chain[1:])
+        else:
+            loops.append(loop[:-1])
+
+    return loops
+
+
+def polygon_area(points):
+    """Signed area of a polygon; positive when its points run counter-clockwise"""
+    area = 0.0
+    for i in range(len(points)):
+        x1, y1 = points[i - 1]
+        x2, y2 = points[i]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def point_in_polygon(x, y, points):
+    """Whether a point lies inside a polygon, by the even-odd rule"""
+    inside = False
+    x1, y1 = points[-1]
+    for x2, y2 in points:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def part_outline(snapshot, tolerance=0.02):
+    """
+    Get the outer loop and the holes of a part
+
+    The largest closed loop is the outline and every other loop must lie
+    inside it; a sketch of several separate shapes is not treated as one part.
+
+    Returns:
+        tuple: (outer, holes) with the outer loop counter-clockwise and every
+               hole clockwise, or (None, []) if the snapshot has no single outline
+    """
+    loops = closed_loops(snapshot, tolerance)
+    if not loops:
+        return None, []
+
+    loops.sort(key=lambda loop: abs(polygon_area(loop)), reverse=True)
+    outer = loops[0] if polygon_area(loops[0]) > 0 else loops[0][::-1]
+    if not all(point_in_polygon(loop[0][0], loop[0][1], outer) for loop in loops[1:]):
+        return None, []
+
+    holes = [loop if polygon_area(loop) < 0 else loop[::-1] for loop in loops[1:]]
+    return outer, holes
+
+
+# Most grid lines along each axis when searching for rectangles inside a region
+INSCRIBED_GRID_LINES = 48
+
+
+def _grid_lines(values, count):
+    values = sorted(set(values))
+    if len(values) <= count:
+        return values
+    low, high = values[0], values[-1]
+    return [low + (high - low) * i / (count - 1) for i in range(count)]
+
+
+def _crosses_open_box(x1, y1, x2, y2, left, bottom, right, top):
+    """Whether a segment passes through the inside of a box, not just along its sides"""
+    start, end = 0.0, 1.0
+    for delta, low, high, origin in ((x2 - x1, left, right, x1), (y2 - y1, bottom, top, y1)):
+        if delta == 0:
+            if not low < origin < high:
+                return False
+            continue
+        t1 = (low - origin) / delta
+        t2 = (high - origin) / delta
+        start = max(start, min(t1, t2))
+        end = min(end, max(t1, t2))
+    return end - start > 1e-12
+
+
+def inscribed_rectangles(loops, max_rectangles=4, min_fraction=0.05, grid_lines=INSCRIBED_GRID_LINES):
+    """
+    Find large axis-aligned rectangles inside a region
+
+    The region is cut into cells by grid lines through the loop corners, or
+    evenly spaced lines for curved loops. Cells no edge passes through are
+    inside or outside as a whole. The largest rectangle of inside cells is
+    taken, its cells are removed, and the search repeats.
+
+    Args:
+        loops: Closed loops bounding the region by the even-odd rule, e.g. a hole and the islands in it
+        max_rectangles: Most rectangles to return
+        min_fraction: Smallest rectangle to return, as a fraction of the first one's area
+        grid_lines: Most grid lines along each axis
+
+    Returns:
+        list: Non-overlapping (x, y, width, height) rectangles, largest first
+    """
+    points = [point for loop in loops for point in loop]
+    if len(points) < 3:
+        return []
+    xs = _grid_lines([x for x, _ in points], grid_lines)
+    ys = _grid_lines([y for _, y in points], grid_lines)
+    edges = [(loop[i - 1], loop[i]) for loop in loops for i in range(len(loop))]
+
+    inside = []
+    for bottom, top in zip(ys, ys[1:]):
+        band = [(x1, y1, x2, y2) for (x1, y1), (x2, y2) in edges if min(y1, y2) < top and max(y1, y2) > bottom]
+        middle = (bottom + top) / 2
+        crossings = sorted(x1 + (middle - y1) * (x2 - x1) / (y2 - y1)
+                           for x1, y1, x2, y2 in band if (y1 > middle) != (y2 > middle))
+        row = []
+        for left, right in zip(xs, xs[1:]):
+            center = (left + right) / 2
+            row.append(sum(1 for x in crossings if x < center) % 2 == 1 and
+                       not any(_crosses_open_box(*edge, left, bottom, right, top) for edge in band))
+        inside.append(row)
+
+    rectangles = []
+    while len(rectangles) < max_rectangles:
+        best = None
+        for first_row in range(len(inside)):
+            columns = [True] * (len(xs) - 1)
+            for last_row in range(first_row, len(inside)):
+                columns = [free and cell for free, cell in zip(columns, inside[last_row])]
+                height = ys[last_row + 1] - ys[first_row]
+                start = None
+                for column, free in enumerate(columns + [False]):
+                    if free and start is None:
+                        start = column
+                    elif not free and start is not None:
+                        area = (xs[column] - xs[start]) * height
+                        if best is None or area > best[0]:
+                            best = (area, first_row, last_row, start, column - 1)
+                        start = None
+        if best is None or (rectangles and best[0] < min_fraction * rectangles[0][2] * rectangles[0][3]):
+            break
+
+        _, first_row, last_row, first_column, last_column = best
+        rectangles.append((xs[first_column], ys[first_row],
+                           xs[last_column + 1] - xs[first_column], ys[last_row + 1] - ys[first_row]))
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                inside[row][column] = False
+    return rectangles
+
+
+def curve_points(snapshot, tolerance=0.02):
+    """
+    Get points along every curve of a snapshot
+
+    Arcs and circles are flattened with chords at most tolerance from the
+    curve; splines contribute their fit points.
+
+    Returns:
+        list: (x, y) tuples
+    """
+    points = []
+    lines = snapshot.lines
+    for i in range(0, len(lines), snapshot.LINE_STRIDE):
+        points.append((lines[i], lines[i + 1]))
+        points.append((lines[i + 2], lines[i + 3]))
+
+    arcs = snapshot.arcs
+    for i in range(0, len(arcs), snapshot.ARC_STRIDE):
+        points.extend(arc_points(*arcs[i:i + snapshot.ARC_STRIDE], tolerance))
+
+    circles = snapshot.circles
+    for i in range(0, len(circles), snapshot.CIRCLE_STRIDE):
+        center_x, center_y, radius = circles[i:i + snapshot.CIRCLE_STRIDE]
+        points.extend(arc_points(center_x, center_y, center_x + radius, center_y, 2 * math.pi, tolerance))
+
+    points.extend(zip(snapshot.spline_points[0::2], snapshot.spline_points[1::2]))
+    return points
+
+
+def min_area_rectangle(points):
+    """
+    Find the smallest rectangle around points with rotating calipers
+
+    One side of the smallest rectangle lies on an edge of the convex hull.
+    Calipers on the far side, top and left of each hull edge only ever move
+    forward, so all edges are checked in one pass after the O(n log n) hull.
+
+    Returns:
+        tuple: (angle, width, height) where rotating the points by angle radians
+               makes the rectangle axis-aligned; angle is within a quarter turn of 0
+    """
+    hull = noFitPolygon.convex_hull(points)
+    count = len(hull)
+    if count < 3:
+        xs = [x for x, _ in points] or [0.0]
+        ys = [y for _, y in points] or [0.0]
+        return 0.0, max(xs) - min(xs), max(ys) - min(ys)
+
+    def dot(index, dx, dy):
+        x, y = hull[index % count]
+        return x * dx + y * dy
+
+    best = None
+    right = top = left = 0
+    for i in range(count):
+        (x1, y1), (x2, y2) = hull[i], hull[(i + 1) % count]
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length == 0:
+            continue
+        dx, dy = (x2 - x1) / length, (y2 - y1) / length
+        nx, ny = -dy, dx
+
+        # The hull is counter-clockwise, so each caliper follows the one before it
+        if i == 0:
+            right = top = left = 1
+        right = max(right, i + 1)
+        while dot(right + 1, dx, dy) > dot(right, dx, dy) + 1e-12:
+            right += 1
+        top = max(top, right)
+        while dot(top + 1, nx, ny) > dot(top, nx, ny) + 1e-12:
+            top += 1
+        left = max(left, top)
+        while dot(left + 1, dx, dy) < dot(left, dx, dy) - 1e-12:
+            left += 1
+
+        width = dot(right, dx, dy) - dot(left, dx, dy)
+        height = dot(top, nx, ny) - (x1 * nx + y1 * ny)
+        if best is None or width * height < best[1] * best[2] - 1e-12:
+            best = (-math.atan2(dy, dx), width, height)
+
+    angle, width, height = best
+    # Turn by the smallest amount; a quarter turn only swaps the sides
+    while angle > math.pi / 4:
+        angle -= math.pi / 2
+        width, height = height, width
+    while angle <= -math.pi / 4:
+        angle += math.pi / 2
+        width, height = height, width
+    return angle, width, height
+
+
+def orient_to_min_area(snapshot, tolerance=0.02, min_gain=0.01):
+    """
+    Rotate a part so its bounding box is the smallest rectangle around it
+
+    Parts drawn at an angle get a much larger axis-aligned box than they
+    need, which every rectangle-based layout pays for.
+
+    Args:
+        snapshot: The PartSnapshot to orient
+        tolerance: Largest chord error of flattened arcs and circles (cm)
+        min_gain: Smallest fraction of box area saved that is worth a rotation
+
+    Returns:
+        tuple: (snapshot, angle) with the rotated snapshot and the rotation in
+               radians, or the snapshot unchanged and 0.0
+    """
+    points = curve_points(snapshot, tolerance)
+    if not points:
+        return snapshot, 0.0
+
+    angle, _, _ = min_area_rectangle(points)
+    if angle == 0:
+        return snapshot, 0.0
+
+    # Compare the exact boxes, so a flattened circle is not turned for nothing
+    rotated = snapshot.rotated(angle)
+    min_x, max_x, min_y, max_y = snapshot.bbox
+    rotated_min_x, rotated_max_x, rotated_min_y, rotated_max_y = rotated.bbox
+    if ((rotated_max_x - rotated_min_x) * (rotated_max_y - rotated_min_y) >
+            (max_x - min_x) * (max_y - min_y) * (1 - min_gain)):
+        return snapshot, 0.0
+    return rotated, angle
+
+
+# Cells along the longer side of a part when matching its loops against a turned copy
+SYMMETRY_GRID_CELLS = 32
+
+
+class _BoundaryGrid:
+    """Edges of closed loops bucketed on a square grid for distance queries"""
+
+    def __init__(self, loops, cell):
+        self.cell = cell
+        self.cells = {}
+        for loop in loops:
+            for i in range(len(loop)):
+                (x1, y1), (x2, y2) = loop[i - 1], loop[i]
+                for column in range(int(math.floor(min(x1, x2) / cell)), int(math.floor(max(x1, x2) / cell)) + 1):
+                    for row in range(int(math.floor(min(y1, y2) / cell)), int(math.floor(max(y1, y2) / cell)) + 1):
+                        self.cells.setdefault((column, row), []).append((x1, y1, x2, y2))
+
+    def near(self, x, y, distance):
+        """Whether a point lies within distance of an edge; distance must not exceed the cell size"""
+        column, row = int(math.floor(x / self.cell)), int(math.floor(y / self.cell))
+        limit = distance * distance
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                for x1, y1, x2, y2 in self.cells.get((column + dc, row + dr), ()):
+                    dx, dy = x2 - x1, y2 - y1
+                    length = dx * dx + dy * dy
+                    t = 0.0 if length == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length))
+                    if (x1 + t * dx - x) ** 2 + (y1 + t * dy - y) ** 2 <= limit:
+                        return True
+        return False
+
+
+def _centroid(points):
+    """Area centroid of a polygon, or the mean of its points when it has no area"""
+    area = polygon_area(points)
+    if abs(area) < 1e-12:
+        return sum(x for x, _ in points) / len(points), sum(y for _, y in points) / len(points)
+    cx = cy = 0.0
+    for i in range(len(points)):
+        x1, y1 = points[i - 1]
+        x2, y2 = points[i]
+        cross = x1 * y2 - x2 * y1
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    return cx / (6 * area), cy / (6 * area)
+
+
+def symmetric_under(loops, angle, mirrored=False, tolerance=0.02):
+    """
+    Whether a part looks the same after a turn, optionally mirrored first
+
+    The turned copy is moved onto the part by the centroid of the largest
+    loop. Every point of either must lie within tolerance of the other's
+    edges, so flattened arcs that start at different points still match.
+
+    Args:
+        loops: Closed loops of the part as lists of (x, y) points
+        angle: Counter-clockwise turn in degrees
+        mirrored: Mirror the part across the x axis before turning it
+        tolerance: Largest distance between matching boundaries (cm)
+
+    Returns:
+        bool: True if the turned part covers the same area as the part
+    """
+    loops = [loop for loop in loops if loop]
+    if not loops:
+        return False
+    cos_a = math.cos(math.radians(angle))
+    sin_a = math.sin(math.radians(angle))
+    sign = -1 if mirrored else 1
+    turned = [[(cos_a * x - sin_a * sign * y, sin_a * x + cos_a * sign * y) for x, y in loop] for loop in loops]
+
+    largest = max(range(len(loops)), key=lambda index: abs(polygon_area(loops[index])))
+    cx, cy = _centroid(loops[largest])
+    turned_cx, turned_cy = _centroid(turned[largest])
+    turned = [[(x - turned_cx + cx, y - turned_cy + cy) for x, y in loop] for loop in turned]
+
+    xs = [x for loop in loops for x, _ in loop]
+    ys = [y for loop in loops for _, y in loop]
+    cell = max(tolerance, max(max(xs) - min(xs), max(ys) - min(ys)) / SYMMETRY_GRID_CELLS)
+    for fixed, moved in ((loops, turned), (turned, loops)):
+        grid = _BoundaryGrid(fixed, cell)
+        if not all(grid.near(x, y, tolerance) for loop in moved for x, y in loop):
+            return False
+    return True
+
+
+def distinct_rotations(loops, rotations, tolerance=0.02, layout_symmetry=False):
+    """
+    Drop the rotations that give the same part as an earlier one
+
+    A rectangle or any part with a half-turn symmetry looks the same at 0 and
+    180 degrees, and a square at all four quarter turns, so the searches over
+    rotations only need one angle of each kind.
+
+    With layout_symmetry every angle is solved as a layout of its own on a
+    rectangular sheet. A layout turned half a turn or mirrored across the
+    sheet axes fits as many parts, so an angle also counts as seen when the
+    part at it is the mirror image or half turn of the part at a kept angle,
+    as with an L with equal arms at 0 and 90 degrees.
+
+    Args:
+        loops: Closed loops of the part as lists of (x, y) points
+        rotations: Angles in degrees, counter-clockwise, in order of preference
+        tolerance: Largest distance between matching boundaries (cm)
+        layout_symmetry: Also drop angles whose layouts are mirror images or half turns of a kept one
+
+    Returns:
+        list: The rotations to search, in their given order
+    """
+    checks = {}
+
+    def symmetric(angle, mirrored):
+        key = (round(angle % 360, 6) % 360, mirrored)
+        if key not in checks:
+            checks[key] = key[0] == 0 and not mirrored or symmetric_under(loops, key[0], mirrored, tolerance)
+        return checks[key]
+
+    kept = []
+    for angle in rotations:
+        for other in kept:
+            # The part at angle is the part at other turned by the difference
+            if symmetric(angle - other, False):
+                break
+            # or, mirrored or turned half a turn on the sheet, the part at other
+            if layout_symmetry and (symmetric(other - angle + 180, False) or
+                                    symmetric(-angle - other, True) or
+                                    symmetric(180 - angle - other, True)):
+                break
+        else:
+            kept.append(angle)
+    return kept
@@ -0,0 +1,142 @@
+"""
+Rectangle decomposition of rectilinear parts.
+
+Brackets, frames and other parts whose outline has only horizontal and
+vertical edges are split into a few rectangles. The rectangle packers place
+those rectangles together, at fixed offsets from each other, so the free
+space in a notch stays free for other parts instead of being lost inside the
+part's bounding box.
+
+The outline is cut into slabs at every vertex, once along each axis.
+Neighbouring slabs with the same span are merged, and the direction that
+gives fewer rectangles is kept, which is two rectangles for an L or a T and
+three for a U.
+"""
+
+# Relative size of the deviation from an axis that still counts as axis aligned
+RECTILINEAR_TOLERANCE = 1e-6
+
+# Parts needing more rectangles are packed by their bounding box
+RECTILINEAR_MAX_RECTANGLES = 8
+
+
+def _snap(values, tolerance):
+    """Map each value to the first of the values within tolerance of it, in sorted order"""
+    snapped = {}
+    current = None
+    for value in sorted(set(values)):
+        if current is None or value - current > tolerance:
+            current = value
+        snapped[value] = current
+    return snapped
+
+
+def rectilinear_corners(polygon, tolerance=RECTILINEAR_TOLERANCE):
+    """
+    Get the corners of an outline that only has horizontal and vertical edges
+
+    Args:
+        polygon: Outer loop of the part as (x, y) points
+        tolerance: Largest deviation from an axis, relative to the outline size
+
+    Returns:
+        list: Corner points with snapped coordinates, or None if the outline is not rectilinear
+    """
+    if not polygon or len(polygon) < 4:
+        return None
+    xs = [x for x, _ in polygon]
+    ys = [y for _, y in polygon]
+    limit = tolerance * max(max(xs) - min(xs), max(ys) - min(ys), 1e-12)
+    snap_x = _snap(xs, limit)
+    snap_y = _snap(ys, limit)
+    points = []
+    for x, y in polygon:
+        point = (snap_x[x], snap_y[y])
+        if not points or point != points[-1]:
+            points.append(point)
+    while len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+
+    corners = []
+    for index, (x, y) in enumerate(points):
+        previous_x, previous_y = points[index - 1]
+        next_x, next_y = points[(index + 1) % len(points)]
+        if x != previous_x and y != previous_y:
+            return None
+        # Drop points in the middle of a straight edge
+        if x == previous_x == next_x or y == previous_y == next_y:
+            continue
+        corners.append((x, y))
+    return corners if len(corners) >= 4 else None
+
+
+def _slab_rectangles(corners):
+    """Rectangles from cutting the outline at every corner x and merging equal neighbouring slabs"""
+    xs = sorted(set(x for x, _ in corners))
+    edges = [(corners[i - 1], corners[i]) for i in range(len(corners))]
+    horizontal = [(min(a[0], b[0]), max(a[0], b[0]), a[1]) for a, b in edges if a[1] == b[1]]
+
+    rectangles = []
+    open_spans = {}  # (bottom, top) -> left x of the rectangle being extended
+    for left, right in zip(xs, xs[1:]):
+        middle = (left + right) / 2
+        crossings = sorted(y for start, end, y in horizontal if start < middle < end)
+        spans = set(zip(crossings[0::2], crossings[1::2]))
+        for span in list(open_spans):
+            if span not in spans:
+                rectangles.append((open_spans.pop(span), span[0], left, span[1]))
+        for span in spans:
+            open_spans.setdefault(span, left)
+    rectangles.extend((start, bottom, xs[-1], top) for (bottom, top), start in open_spans.items())
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in rectangles]
+
+
+def decompose(polygon, tolerance=RECTILINEAR_TOLERANCE):
+    """
+    Split a rectilinear outline into a few non-overlapping rectangles
+
+    Args:
+        polygon: Outer loop of the part as (x, y) points
+        tolerance: Largest deviation from an axis, relative to the outline size
+
+    Returns:
+        list: (x, y, width, height) rectangles measured from the lower-left corner of the
+              outline's bounding box, largest first, or None if the outline is not rectilinear
+    """
+    corners = rectilinear_corners(polygon, tolerance)
+    if corners is None:
+        return None
+
+    by_columns = _slab_rectangles(corners)
+    by_rows = [(y, x, height, width)
+               for x, y, width, height in _slab_rectangles([(y, x) for x, y in corners])]
+    rectangles = by_rows if len(by_rows) < len(by_columns) else by_columns
+
+    min_x = min(x for x, _ in corners)
+    min_y = min(y for _, y in corners)
+    rectangles = [(x - min_x, y - min_y, width, height) for x, y, width, height in rectangles]
+    rectangles.sort(key=lambda rect: rect[2] * rect[3], reverse=True)
+    return rectangles
+
+
+def rotate_rectangles(rectangles, width, height, angle):
+    """
+    Turn rectangles with the bounding box that holds them by a multiple of 90 degrees
+
+    Args:
+        rectangles: (x, y, width, height) rectangles from the lower-left corner of the box
+        width: Width of the box
+        height: Height of the box
+        angle: Counter-clockwise rotation in degrees, a multiple of 90
+
+    Returns:
+        list: The rectangles measured from the lower-left corner of the turned box
+    """
+    quarter_turns = int(round(angle / 90.0)) % 4
+    if quarter_turns == 1:
+        return [(height - y - h, x, h, w) for x, y, w, h in rectangles]
+    if quarter_turns == 2:
+        return [(width - x - w, height - y - h, w, h) for x, y, w, h in rectangles]
+    if quarter_turns == 3:
+        return [(y, width - x - w, h, w) for x, y, w, h in rectangles]
+    return list(rectangles)
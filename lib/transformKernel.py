@@ -0,0 +1,194 @@
+"""
+Batched placement transforms for part snapshots.
+
+Every placement of a part is a rotation about the origin followed by a
+translation that moves the rotated bounding box onto the placement point
+(see nestingPlanner.placement_transform). This module applies all placements
+of a part to all of its control points in one NumPy operation, so emission
+only has to make API calls on precomputed coordinates.
+
+NumPy is not bundled with every Fusion 360 Python, so a pure-Python path
+with identical results is used when it is unavailable.
+"""
+
+import math
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+class PlacedGeometry(NamedTuple):
+    """
+    Transformed snapshot geometry, indexed by placement first
+
+    lines[i]    -- [x1, y1, x2, y2] rows for placement i
+    circles[i]  -- [center_x, center_y, radius] rows for placement i
+    arcs[i]     -- [center_x, center_y, start_x, start_y, sweep] rows for placement i
+    splines[i]  -- flat [x, y, x, y, ...] fit point lists for placement i
+    """
+    lines: list
+    circles: list
+    arcs: list
+    splines: list
+
+
+def transform_points(points, part_bbox, placements):
+    """
+    Apply every placement to every point
+
+    Args:
+        points: Sequence of (x, y) source points
+        part_bbox: Source bounding box (min_x, max_x, min_y, max_y)
+        placements: Sequence of (x, y, angle_degrees) placements
+
+    Returns:
+        (N, M, 2) array of transformed points, or nested lists without NumPy
+    """
+    if HAS_NUMPY:
+        return _transform_points_numpy(points, part_bbox, placements)
+    return _transform_points_python(points, part_bbox, placements)
+
+
+def _transform_points_numpy(points, part_bbox, placements):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    placements = np.asarray(placements, dtype=float).reshape(-1, 3)
+    min_x, max_x, min_y, max_y = part_bbox
+
+    angles = np.radians(placements[:, 2])
+    cos_a = np.cos(angles)
+    sin_a = np.sin(angles)
+
+    # Snap exact quarter turns so 90 degree copies stay on the grid
+    cos_a[np.abs(cos_a) < 1e-12] = 0.0
+    sin_a[np.abs(sin_a) < 1e-12] = 0.0
+
+    # Translation that puts the rotated bounding box corner on the placement point
+    corners = np.array([[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y]])
+    corner_x = cos_a[:, None] * corners[:, 0] - sin_a[:, None] * corners[:, 1]
+    corner_y = sin_a[:, None] * corners[:, 0] + cos_a[:, None] * corners[:, 1]
+    tx = placements[:, 0] - corner_x.min(axis=1)
+    ty = placements[:, 1] - corner_y.min(axis=1)
+
+    result = np.empty((placements.shape[0], points.shape[0], 2))
+    result[:, :, 0] = cos_a[:, None] * points[:, 0] - sin_a[:, None] * points[:, 1] + tx[:, None]
+    result[:, :, 1] = sin_a[:, None] * points[:, 0] + cos_a[:, None] * points[:, 1] + ty[:, None]
+    return result
+
+
+def _transform_points_python(points, part_bbox, placements):
+    min_x, max_x, min_y, max_y = part_bbox
+    corners = ((min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y))
+    points = [(float(x), float(y)) for x, y in points]
+
+    result = []
+    for x, y, angle in placements:
+        angle = math.radians(angle)
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        if abs(cos_a) < 1e-12:
+            cos_a = 0.0
+        if abs(sin_a) < 1e-12:
+            sin_a = 0.0
+
+        tx = x - min(cos_a * cx - sin_a * cy for cx, cy in corners)
+        ty = y - min(sin_a * cx + cos_a * cy for cx, cy in corners)
+        result.append([[cos_a * px - sin_a * py + tx, sin_a * px + cos_a * py + ty] for px, py in points])
+    return result
+
+
+def snapshot_control_points(snapshot):
+    """
+    Collect the control points of a snapshot in a fixed order
+
+    Lines contribute start and end, circles their center, arcs center and
+    start, and splines all fit points.
+
+    Returns:
+        list: (x, y) tuples
+    """
+    points = []
+    lines = snapshot.lines
+    for i in range(0, len(lines), snapshot.LINE_STRIDE):
+        points.append((lines[i], lines[i + 1]))
+        points.append((lines[i + 2], lines[i + 3]))
+
+    circles = snapshot.circles
+    for i in range(0, len(circles), snapshot.CIRCLE_STRIDE):
+        points.append((circles[i], circles[i + 1]))
+
+    arcs = snapshot.arcs
+    for i in range(0, len(arcs), snapshot.ARC_STRIDE):
+        points.append((arcs[i], arcs[i + 1]))
+        points.append((arcs[i + 2], arcs[i + 3]))
+
+    spline_points = snapshot.spline_points
+    for i in range(0, len(spline_points), 2):
+        points.append((spline_points[i], spline_points[i + 1]))
+
+    return points
+
+
+def transform_snapshot(snapshot, part_bbox, placements):
+    """
+    Transform all curves of a snapshot for every placement
+
+    Args:
+        snapshot: partSnapshot.PartSnapshot of the part
+        part_bbox: Bounding box used by the planner (min_x, max_x, min_y, max_y)
+        placements: Sequence of (x, y, angle_degrees) placements
+
+    Returns:
+        PlacedGeometry: Transformed coordinates as plain Python lists
+    """
+    placements = [tuple(p) for p in placements]
+    count = len(placements)
+    line_count = snapshot.line_count
+    circle_count = snapshot.circle_count
+    arc_count = snapshot.arc_count
+
+    points = snapshot_control_points(snapshot)
+    if not points or not count:
+        return PlacedGeometry([[] for _ in range(count)], [[] for _ in range(count)],
+                              [[] for _ in range(count)], [[] for _ in range(count)])
+
+    transformed = transform_points(points, part_bbox, placements)
+
+    circle_start = 2 * line_count
+    arc_start = circle_start + circle_count
+    spline_start = arc_start + 2 * arc_count
+
+    if HAS_NUMPY:
+        lines = transformed[:, :circle_start].reshape(count, line_count, 4)
+        circles = np.concatenate(
+            (transformed[:, circle_start:arc_start],
+             np.broadcast_to(np.asarray(snapshot.circles[2::3]).reshape(1, -1, 1), (count, circle_count, 1))),
+            axis=2
+        )
+        arcs = np.concatenate(
+            (transformed[:, arc_start:spline_start].reshape(count, arc_count, 4),
+             np.broadcast_to(np.asarray(snapshot.arcs[4::5]).reshape(1, -1, 1), (count, arc_count, 1))),
+            axis=2
+        )
+        lines, circles, arcs = lines.tolist(), circles.tolist(), arcs.tolist()
+        spline_rows = transformed[:, spline_start:].reshape(count, -1).tolist()
+    else:
+        radii = snapshot.circles[2::3]
+        sweeps = snapshot.arcs[4::5]
+        lines, circles, arcs, spline_rows = [], [], [], []
+        for rows in transformed:
+            lines.append([rows[2 * i] + rows[2 * i + 1] for i in range(line_count)])
+            circles.append([rows[circle_start + i] + [radii[i]] for i in range(circle_count)])
+            arcs.append([rows[arc_start + 2 * i] + rows[arc_start + 2 * i + 1] + [sweeps[i]]
+                         for i in range(arc_count)])
+            spline_rows.append([value for point in rows[spline_start:] for value in point])
+
+    # Split the flat spline coordinates back into individual splines
+    offsets = snapshot.spline_offsets
+    splines = [[row[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)] for row in spline_rows]
+
+    return PlacedGeometry(lines, circles, arcs, splines)
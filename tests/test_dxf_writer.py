@@ -0,0 +1,75 @@
+import sys
+import os
+import io
+import math
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the modules to test
+from lib import dxfWriter, partSnapshot, transformKernel
+
+def read_entities(text):
+    """Parse DXF text into (entity type, {group code: [values]}) pairs"""
+    lines = text.split('\n')
+    pairs = list(zip(lines[0::2], lines[1::2]))
+    entities = []
+    in_entities = False
+    for code, value in pairs:
+        if code == '2' and value == 'ENTITIES':
+            in_entities = True
+        elif code == '0' and in_entities:
+            if value == 'ENDSEC':
+                break
+            entities.append((value, {}))
+        elif entities and in_entities:
+            entities[-1][1].setdefault(code, []).append(float(value) if code != '8' else value)
+    return entities
+
+class TestDxfWriter(unittest.TestCase):
+    """Tests for the streaming DXF writer"""
+
+    def test_write_dxf(self):
+        """Test that every placed curve becomes one DXF entity"""
+        snapshot = partSnapshot.PartSnapshot()
+        snapshot.add_line(0, 0, 4, 0)
+        snapshot.add_circle(1, 1, 0.5)
+        snapshot.add_arc(3, 1, 4, 1, math.pi / 2)
+        snapshot.add_spline([(0, 2), (2, 3), (4, 2)])
+        placed = transformKernel.transform_snapshot(snapshot, snapshot.bbox, [(0, 0, 0), (10, 0, 0)])
+
+        stream = io.StringIO()
+        count = dxfWriter.write_dxf(stream, placed)
+        text = stream.getvalue()
+
+        # Splines are left to per-entity emission
+        self.assertEqual(count, 6)
+        self.assertIn('$ACADVER\n1\nAC1009\n', text)
+        self.assertNotIn('$INSUNITS', text)
+        self.assertTrue(text.endswith('0\nEOF\n'))
+
+        entities = read_entities(text)
+        self.assertEqual([name for name, _ in entities], ['LINE', 'CIRCLE', 'ARC'] * 2)
+
+        line = entities[3][1]
+        # Lengths are written in millimetres
+        self.assertEqual((line['10'][0], line['20'][0], line['11'][0], line['21'][0]), (100, 0, 140, 0))
+        self.assertEqual(entities[1][1]['40'][0], 5)
+
+        arc = entities[2][1]
+        self.assertAlmostEqual(arc['40'][0], 10)
+        self.assertAlmostEqual(arc['50'][0], 0)
+        self.assertAlmostEqual(arc['51'][0], 90)
+
+    def test_arc_angles_wrap(self):
+        """Test that arc angles stay within 0-360 degrees"""
+        stream = io.StringIO()
+        dxfWriter.write_arc(stream, 0, 0, 0, -1, math.pi)
+        arc = read_entities('0\nSECTION\n2\nENTITIES\n' + stream.getvalue())[0][1]
+        self.assertAlmostEqual(arc['50'][0], 270)
+        self.assertAlmostEqual(arc['51'][0], 90)
+
+
+if __name__ == '__main__':
+    unittest.main()
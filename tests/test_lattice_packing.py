@@ -0,0 +1,53 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import latticePacking, noFitPolygon
+
+TRIANGLE = [(0, 0), (8, 0), (0, 6)]
+
+
+class TestLatticePacking(unittest.TestCase):
+    """Tests for single and double lattice packing of one part"""
+
+    def test_rectangle_lattice(self):
+        """Test that a rectangle gives a plain grid with the spacing between parts"""
+        lattice = latticePacking.find_lattices([(0, 0), (4, 0), (4, 2), (0, 2)], 0.5, double=False)[0]
+        self.assertAlmostEqual(lattice.u_x, 4.5)
+        self.assertAlmostEqual(lattice.v_x, 0)
+        self.assertAlmostEqual(lattice.v_y, 2.5)
+
+    def test_double_lattice(self):
+        """Test that triangles and their 180 degree copies tile the plane without gaps"""
+        lattice = latticePacking.find_lattices(TRIANGLE)[0]
+        self.assertEqual(len(lattice.members), 2)
+        self.assertAlmostEqual(lattice.area_per_part, 24)
+
+        # A single lattice of triangles leaves half of every cell empty
+        single = latticePacking.find_lattices(TRIANGLE, double=False)[0]
+        self.assertGreater(single.area_per_part, 40)
+
+    def test_lattice_layout(self):
+        """Test that the tiled lattice stays in the rectangle without overlaps"""
+        placements = latticePacking.lattice_layout(TRIANGLE, 60, 40, spacing=0.3)
+        self.assertGreater(len(placements), 70)
+        self.assertEqual(placements, sorted(placements, key=lambda placement: (placement[2], placement[1])))
+
+        shapes = []
+        for angle, x, y in placements:
+            points, width, height = noFitPolygon.rotate_polygon(TRIANGLE, angle)
+            self.assertTrue(-1e-6 <= x and x + width <= 60 + 1e-6)
+            self.assertTrue(-1e-6 <= y and y + height <= 40 + 1e-6)
+            shapes.append([(px + x, py + y) for px, py in points])
+        for i in range(len(shapes)):
+            for j in range(i + 1, len(shapes)):
+                nfp = noFitPolygon.no_fit_polygon([shapes[i]], [shapes[j]], 0.29)
+                self.assertFalse(nfp.blocks(0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
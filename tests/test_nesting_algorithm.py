@@ -60,6 +60,42 @@ class TestNestingAlgorithm(unittest.TestCase):
         # Should return all zeros since part won't fit
         self.assertEqual(result, (False, 0, 0))  
     
+    def test_capacity_sweep(self):
+        """Test that the sweep agrees with get_optimal_rotation with and without NumPy"""
+        sheet_sizes = [(100, 50), (30, 20), (5, 5)]
+        clearances = [0, 1, 3]
+        gutters = [0, 0.25, 0.5]
+        kerfs = [0, 0.1]
+
+        rows = nestingAlgorithm.capacity_sweep(20, 5, sheet_sizes, clearances, gutters, kerfs)
+        self.assertEqual(len(rows), 3 * 3 * 3 * 2)
+        for row in rows:
+            rotate, per_row, per_column = nestingAlgorithm.get_optimal_rotation(
+                20 + row['kerf'], 5 + row['kerf'], row['sheet_width'], row['sheet_height'],
+                row['edge_clearance'], row['gutter_size'])
+            self.assertEqual(row['parts_per_sheet'], max(0, per_row) * max(0, per_column))
+            if row['parts_per_sheet']:
+                self.assertEqual(row['rotated'], rotate)
+
+        with mock.patch.object(nestingAlgorithm, 'np', None):
+            python_rows = nestingAlgorithm.capacity_sweep(20, 5, sheet_sizes, clearances, gutters, kerfs)
+        self.assertEqual([r['parts_per_sheet'] for r in python_rows], [r['parts_per_sheet'] for r in rows])
+        for python_row, row in zip(python_rows, rows):
+            self.assertAlmostEqual(python_row['utilization'], row['utilization'])
+
+    def test_capacity_pareto(self):
+        """Test that only rows where more spacing costs parts are kept"""
+        rows = nestingAlgorithm.capacity_sweep(10, 5, [(100, 50)], [0.5, 1, 2], [0, 0.25, 0.5, 1])
+        pareto = nestingAlgorithm.capacity_pareto(rows)
+
+        self.assertEqual(pareto[0]['parts_per_sheet'], max(r['parts_per_sheet'] for r in rows))
+        for row in rows:
+            dominated = any(other['parts_per_sheet'] >= row['parts_per_sheet'] and
+                            other['gutter_size'] >= row['gutter_size'] and
+                            other['edge_clearance'] >= row['edge_clearance'] and other is not row
+                            for other in pareto)
+            self.assertNotEqual(row in pareto, dominated)
+
     def test_bin_packing_nesting(self):
         """Test the bin packing algorithm"""
         # Simple test case with one part
@@ -104,6 +140,427 @@ class TestNestingAlgorithm(unittest.TestCase):
         self.assertEqual(len([p for p in result['placements'] if p['part_id'] == 'part1']), 5)
         self.assertEqual(len([p for p in result['placements'] if p['part_id'] == 'part2']), 3)
 
+    def assertNoOverlap(self, placements, sizes, sheet_width, sheet_height, edge_clearance):
+        """Check that placed parts stay inside the clearance and do not overlap"""
+        boxes = []
+        for placement in placements:
+            width, height = sizes[placement['part_id']]
+            if placement['rotated']:
+                width, height = height, width
+            box = (placement['x'], placement['y'], placement['x'] + width, placement['y'] + height)
+            self.assertGreaterEqual(box[0], edge_clearance - 1e-9)
+            self.assertGreaterEqual(box[1], edge_clearance - 1e-9)
+            self.assertLessEqual(box[2], sheet_width - edge_clearance + 1e-9)
+            self.assertLessEqual(box[3], sheet_height - edge_clearance + 1e-9)
+            for other in boxes:
+                overlap = min(box[2], other[2]) - max(box[0], other[0]), min(box[3], other[3]) - max(box[1], other[1])
+                self.assertFalse(overlap[0] > 1e-9 and overlap[1] > 1e-9)
+            boxes.append(box)
+
+    def test_maxrects_heuristics(self):
+        """Test that every MaxRects rule produces a valid packing"""
+        parts_list = [
+            {'id': 'tall', 'width': 6, 'height': 30, 'quantity': 4},
+            {'id': 'flat', 'width': 25, 'height': 7, 'quantity': 6},
+            {'id': 'small', 'width': 4, 'height': 4, 'quantity': 40}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        for heuristic in (nestingAlgorithm.MAXRECTS_BEST_SHORT_SIDE_FIT, nestingAlgorithm.MAXRECTS_BEST_AREA_FIT,
+                          nestingAlgorithm.MAXRECTS_BOTTOM_LEFT, nestingAlgorithm.MAXRECTS_CONTACT_POINT):
+            with self.subTest(heuristic=heuristic):
+                result = nestingAlgorithm.bin_packing_nesting(100, 50, parts_list, 1, 0.5, heuristic=heuristic)
+                self.assertEqual(len(result['placements']), 50)
+                self.assertNoOverlap(result['placements'], sizes, 100, 50, 1)
+                self.assertAlmostEqual(result['utilization'], (4 * 180 + 6 * 175 + 40 * 16) / 50)
+
+        with self.assertRaises(ValueError):
+            nestingAlgorithm.MaxRectsBin(10, 10, 'unknown')
+
+    def test_maxrects_fill_and_rotation(self):
+        """Test an exact fill, a part that only fits rotated, and the free list after placing"""
+        parts_list = [{'id': 'quarter', 'width': 50, 'height': 25, 'quantity': 5}]
+        result = nestingAlgorithm.bin_packing_nesting(100, 50, parts_list, 0, 0)
+        self.assertEqual(len(result['placements']), 4)
+        self.assertAlmostEqual(result['utilization'], 100)
+        self.assertAlmostEqual(result['unused_area'], 0)
+
+        parts_list = [{'id': 'long', 'width': 20, 'height': 10, 'quantity': 1}]
+        result = nestingAlgorithm.bin_packing_nesting(10, 20, parts_list, 0, 0)
+        self.assertTrue(result['placements'][0]['rotated'])
+        result = nestingAlgorithm.bin_packing_nesting(10, 20, parts_list, 0, 0, allow_rotation=False)
+        self.assertEqual(result['placements'], [])
+
+        # Two maximal free rectangles remain next to a corner part, neither inside the other
+        packer = nestingAlgorithm.MaxRectsBin(10, 10)
+        packer.place(0, 0, 4, 3)
+        self.assertEqual(sorted(packer.free_rects), [(0, 3, 10, 7), (4, 0, 6, 10)])
+
+    def test_rectilinear_parts(self):
+        """Test that parts given as linked rectangles leave their notch to other parts"""
+        bracket = {'id': 'bracket', 'width': 10, 'height': 10, 'quantity': 1,
+                   'rects': [(0, 0, 4, 10), (4, 0, 6, 4)]}
+        square = {'id': 'square', 'width': 6, 'height': 6, 'quantity': 1}
+
+        result = nestingAlgorithm.bin_packing_nesting(10, 10, [{k: v for k, v in bracket.items() if k != 'rects'},
+                                                               square], 0, 0)
+        self.assertEqual([p['part_id'] for p in result['placements']], ['bracket'])
+
+        result = nestingAlgorithm.bin_packing_nesting(10, 10, [bracket, square], 0, 0)
+        self.assertEqual(result['placements'], [
+            {'part_id': 'bracket', 'x': 0, 'y': 0, 'rotated': False, 'rotation': 0},
+            {'part_id': 'square', 'x': 4, 'y': 4, 'rotated': False}
+        ])
+        self.assertAlmostEqual(result['utilization'], 100)
+
+        # The gutter is kept inside the notch, and a turned bracket is reported by its angle
+        result = nestingAlgorithm.bin_packing_nesting(11, 11, [bracket, dict(square, width=5, height=5)], 0.5, 0.5)
+        self.assertEqual(len(result['placements']), 2)
+        self.assertAlmostEqual(result['placements'][1]['x'], 5)
+        result = nestingAlgorithm.multi_sheet_nesting(10, 10, [dict(bracket, quantity=2), dict(square, quantity=2)],
+                                                      0, 0, allow_rotation=False)
+        self.assertEqual(result['sheets_required'], 2)
+        self.assertEqual([p['rotation'] for p in result['placements'] if p['part_id'] == 'bracket'], [0, 0])
+
+        packer = nestingAlgorithm.MaxRectsBin(10, 10)
+        packer.place(0, 0, 10, 6)
+        shapes = [(0, 10, 10, bracket['rects']), (180, 10, 10, [(6, 0, 4, 10), (0, 6, 6, 4)])]
+        self.assertIsNone(packer.insert_group(shapes))
+        packer = nestingAlgorithm.MaxRectsBin(10, 10)
+        packer.place(0, 0, 6, 6)
+        self.assertEqual(packer.insert_group(shapes), (0, 0, 180))
+        self.assertEqual(packer.free_rects, [])
+
+    def test_skyline_nesting(self):
+        """Test that the skyline packer produces a valid packing, with and without the waste map"""
+        parts_list = [
+            {'id': 'strip', 'width': 13, 'height': 2, 'quantity': 300},
+            {'id': 'tile', 'width': 7, 'height': 5, 'quantity': 300},
+            {'id': 'post', 'width': 4, 'height': 9, 'quantity': 200}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        for use_waste_map in (False, True):
+            with self.subTest(use_waste_map=use_waste_map):
+                result = nestingAlgorithm.skyline_nesting(300, 150, parts_list, 1, 0.3, use_waste_map=use_waste_map)
+                self.assertEqual(len(result['placements']), 800)
+                self.assertNoOverlap(result['placements'], sizes, 300, 150, 1)
+
+        # The sheet fits 4 of 5 copies when both rows are used
+        result = nestingAlgorithm.skyline_nesting(100, 50, [{'id': 'q', 'width': 50, 'height': 25, 'quantity': 5}], 0, 0)
+        self.assertEqual(len(result['placements']), 4)
+        self.assertAlmostEqual(result['utilization'], 100)
+
+    def test_skyline_waste_map(self):
+        """Test that the gap below a part spanning a step is reused"""
+        packer = nestingAlgorithm.SkylineBin(10, 10, use_waste_map=True)
+        self.assertEqual(packer.insert(4, 1, allow_rotation=False), (0, 0, False))
+
+        # A full-width part rests on the step and leaves a 6 x 1 gap below it
+        self.assertEqual(packer.insert(10, 3, allow_rotation=False), (0, 1, False))
+        self.assertEqual(list(packer.segments()), [(0, 4, 10)])
+        self.assertEqual(packer.insert(5, 1, allow_rotation=False), (4, 0, False))
+
+        # Without the waste map the same part goes on top of the skyline
+        packer = nestingAlgorithm.SkylineBin(10, 10)
+        packer.insert(4, 1, allow_rotation=False)
+        packer.insert(10, 3, allow_rotation=False)
+        self.assertEqual(packer.insert(5, 1, allow_rotation=False), (0, 4, False))
+        self.assertEqual(list(packer.segments()), [(0, 5, 5), (5, 4, 5)])
+
+    def test_guillotine_nesting(self):
+        """Test guillotine packings for every split rule and stage limit"""
+        parts_list = [
+            {'id': 'door', 'width': 18, 'height': 40, 'quantity': 4},
+            {'id': 'shelf', 'width': 30, 'height': 8, 'quantity': 6},
+            {'id': 'block', 'width': 5, 'height': 5, 'quantity': 30}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        def leaves(node):
+            if 'children' not in node:
+                return [node['part']] if node['part'] is not None else []
+            return [index for child in node['children'] for index in leaves(child)]
+
+        for split_rule in (nestingAlgorithm.GUILLOTINE_SPLIT_SHORTER_AXIS, nestingAlgorithm.GUILLOTINE_SPLIT_LONGER_AXIS,
+                           nestingAlgorithm.GUILLOTINE_SPLIT_MIN_AREA):
+            for max_stages in (None, 2, 3):
+                with self.subTest(split_rule=split_rule, max_stages=max_stages):
+                    result = nestingAlgorithm.guillotine_nesting(120, 60, parts_list, 1, 0.4, split_rule=split_rule,
+                                                                 max_stages=max_stages)
+                    placed = len(result['placements'])
+                    self.assertNoOverlap(result['placements'], sizes, 120, 60, 1)
+                    self.assertEqual(sorted(leaves(result['cut_tree'])), list(range(placed)))
+                    if max_stages is None:
+                        self.assertEqual(placed, 40)
+                    else:
+                        # Fewer stages can leave parts out, but never break the limit
+                        self.assertGreater(placed, 0)
+                        self.assertLessEqual(result['stages'], max_stages)
+
+        # A layout without a cut order is still returned, without its cuts
+        with mock.patch.object(nestingAlgorithm, 'build_cut_tree', return_value=None):
+            result = nestingAlgorithm.guillotine_nesting(120, 60, parts_list, 1, 0.4, merge=False)
+        self.assertEqual(len(result['placements']), 40)
+        self.assertIsNone(result['cut_tree'])
+        self.assertIsNone(result['stages'])
+
+        with self.assertRaises(ValueError):
+            nestingAlgorithm.GuillotineBin(10, 10, 'diagonal')
+
+    def test_build_cut_tree(self):
+        """Test the cut tree of a simple layout and that a pinwheel has none"""
+        # Two columns: the left one holds two parts on top of each other
+        rects = [(0, 0, 4, 5), (0, 5, 4, 5), (4, 0, 6, 10)]
+        cut_tree, stages = nestingAlgorithm.build_cut_tree(rects, (0, 0, 10, 10))
+        self.assertEqual(stages, 2)
+        self.assertEqual(cut_tree['direction'], nestingAlgorithm.CUT_VERTICAL)
+        self.assertEqual(cut_tree['cuts'], [4])
+        self.assertEqual(cut_tree['children'][0]['cuts'], [5])
+        self.assertEqual(cut_tree['children'][1]['part'], 2)
+
+        pinwheel = [(0, 0, 6, 4), (6, 0, 4, 6), (4, 6, 6, 4), (0, 4, 4, 6), (4, 4, 2, 2)]
+        self.assertIsNone(nestingAlgorithm.build_cut_tree(pinwheel, (0, 0, 10, 10)))
+
+    def test_solve_identical_rectangles(self):
+        """Test that block patterns beat plain grids and produce valid layouts"""
+        # (width, height, part width, part height, plain grid count, expected count, pattern)
+        cases = [
+            (40, 50, 10, 7, 28, 28, nestingAlgorithm.PATTERN_ONE_BLOCK),
+            (22, 16, 5, 3, 21, 22, nestingAlgorithm.PATTERN_TWO_BLOCK),
+            (57, 44, 12, 5, 33, 40, nestingAlgorithm.PATTERN_FIVE_BLOCK)
+        ]
+        for width, height, part_width, part_height, grid_count, expected, pattern in cases:
+            with self.subTest(width=width, height=height):
+                count, blocks, found_pattern = nestingAlgorithm.solve_identical_rectangles(
+                    width, height, part_width, part_height, time_limit=None)
+                self.assertEqual(count, expected)
+                self.assertEqual(found_pattern, pattern)
+                self.assertGreaterEqual(count, grid_count)
+
+                positions = nestingAlgorithm.expand_blocks(blocks, part_width, part_height)
+                self.assertEqual(len(positions), count)
+                placements = [{'part_id': 'p', 'x': x, 'y': y, 'rotated': rotated} for x, y, rotated in positions]
+                self.assertNoOverlap(placements, {'p': (part_width, part_height)}, width, height, 0)
+
+    def test_pattern_nesting(self):
+        """Test the solution dict of the pattern solver"""
+        result = nestingAlgorithm.pattern_nesting(58, 45, 12, 5, 100, 0.5, 0)
+        self.assertEqual(result['capacity'], 40)
+        self.assertEqual(len(result['placements']), 40)
+        self.assertAlmostEqual(result['utilization'], 40 * 60 / (58 * 45) * 100)
+
+        result = nestingAlgorithm.pattern_nesting(58, 45, 12, 5, 10, 0.5, 0)
+        self.assertEqual(len(result['placements']), 10)
+        self.assertGreaterEqual(min(p['x'] for p in result['placements']), 0.5)
+
+    def test_knapsack_nesting(self):
+        """Test the two-stage knapsack respects demand and beats plain strips of one part"""
+        parts_list = [
+            {'id': 'wide', 'width': 37, 'height': 11, 'quantity': 6},
+            {'id': 'square', 'width': 13, 'height': 13, 'quantity': 20},
+            {'id': 'narrow', 'width': 6, 'height': 24, 'quantity': 9}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        result = nestingAlgorithm.knapsack_nesting(122, 61, parts_list, 1, 0.3, time_limit=None)
+        self.assertEqual(result['method'], 'knapsack')
+        self.assertNoOverlap(result['placements'], sizes, 122, 61, 1)
+        for part in parts_list:
+            placed = len([p for p in result['placements'] if p['part_id'] == part['id']])
+            self.assertLessEqual(placed, part['quantity'])
+        self.assertGreater(result['utilization'], 80)
+
+        # Solving again with other quantities reuses the solver and its strip tables
+        solver = list(nestingAlgorithm._knapsack_solvers.values())[-1]
+        cached_strips = len(solver._strip_cache)
+        for part in parts_list:
+            part['quantity'] = 500
+        result = nestingAlgorithm.knapsack_nesting(122, 61, parts_list, 1, 0.3, time_limit=None)
+        self.assertNoOverlap(result['placements'], sizes, 122, 61, 1)
+        self.assertIs(list(nestingAlgorithm._knapsack_solvers.values())[-1], solver)
+        self.assertGreater(len(solver._strip_cache), cached_strips)
+
+    def test_knapsack_fallback(self):
+        """Test the fallback to MaxRects for too many part types"""
+        parts_list = [{'id': str(i), 'width': 3 + i, 'height': 2 + i, 'quantity': 2} for i in range(11)]
+        result = nestingAlgorithm.knapsack_nesting(100, 50, parts_list, 0, 0)
+        self.assertEqual(result['method'], 'heuristic')
+        self.assertEqual(len(result['placements']), 22)
+
+    def test_multi_sheet_nesting(self):
+        """Test that sheets are opened until every part is placed"""
+        parts_list = [
+            {'id': 'big', 'width': 40, 'height': 30, 'quantity': 7},
+            {'id': 'small', 'width': 9, 'height': 4, 'quantity': 60}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        result = nestingAlgorithm.multi_sheet_nesting(100, 50, parts_list, 1, 0.5)
+        self.assertEqual(len(result['placements']), 67)
+        self.assertEqual(result['unplaced'], {})
+        self.assertEqual(result['sheets_required'], len(result['sheets']))
+        self.assertEqual(result['sheets_required'], 3)
+        for index, sheet in enumerate(result['sheets']):
+            self.assertTrue(all(p['sheet'] == index for p in sheet['placements']))
+            self.assertNoOverlap(sheet['placements'], sizes, 100, 50, 1)
+
+        # Small parts fill the space left next to the big parts before a new sheet is opened
+        self.assertTrue(any(p['part_id'] == 'small' for p in result['sheets'][0]['placements']))
+
+        # Parts that do not fit an empty sheet and the sheet limit are reported
+        parts_list.append({'id': 'huge', 'width': 120, 'height': 10, 'quantity': 2})
+        result = nestingAlgorithm.multi_sheet_nesting(100, 50, parts_list, 1, 0.5, max_sheets=2)
+        self.assertEqual(result['sheets_required'], 2)
+        self.assertEqual(result['unplaced']['huge'], 2)
+        self.assertGreater(result['unplaced']['big'] + result['unplaced'].get('small', 0), 0)
+
+
+    def test_repeated_pattern_nesting(self):
+        """Test that a sheet pattern is repeated while the demand allows"""
+        parts_list = [
+            {'id': 'a', 'width': 20, 'height': 10, 'quantity': 100},
+            {'id': 'b', 'width': 9, 'height': 4, 'quantity': 130}
+        ]
+        sizes = {part['id']: (part['width'], part['height']) for part in parts_list}
+
+        result = nestingAlgorithm.repeated_pattern_nesting(100, 50, parts_list, 1, 0.5)
+        self.assertEqual(result['unplaced'], {})
+        self.assertGreater(result['patterns'][0]['multiplicity'], 1)
+        self.assertEqual(result['sheets_required'], sum(p['multiplicity'] for p in result['patterns']))
+
+        produced = {'a': 0, 'b': 0}
+        for index, pattern in enumerate(result['patterns']):
+            self.assertTrue(all(p['pattern'] == index for p in pattern['placements']))
+            self.assertNoOverlap(pattern['placements'], sizes, 100, 50, 1)
+            for placement in pattern['placements']:
+                produced[placement['part_id']] += pattern['multiplicity']
+        self.assertEqual(produced, {'a': 100, 'b': 130})
+
+        # The sheet limit leaves the rest of the demand unplaced
+        result = nestingAlgorithm.repeated_pattern_nesting(100, 50, parts_list, 1, 0.5, max_sheets=2)
+        self.assertEqual(result['sheets_required'], 2)
+        self.assertGreater(sum(result['unplaced'].values()), 0)
+
+
+    def test_stock_selection_nesting(self):
+        """Test that the cheapest mix of stock sizes is used"""
+        stock_list = [
+            {'id': 'large', 'width': 100, 'height': 50},
+            {'id': 'offcut', 'width': 25, 'height': 15}
+        ]
+        parts_list = [{'id': 'a', 'width': 20, 'height': 10, 'quantity': 37}]
+
+        # 18 parts fit on a large sheet and one on an offcut
+        result = nestingAlgorithm.stock_selection_nesting(stock_list, parts_list, 1, 0.5)
+        self.assertEqual([(p['stock'], p['multiplicity'], len(p['placements'])) for p in result['patterns']],
+                         [('large', 2, 18), ('offcut', 1, 1)])
+        self.assertEqual(result['total_cost'], 2 * 5000 + 375)
+        self.assertEqual(result['sheets_required'], 3)
+        self.assertEqual(result['unplaced'], {})
+        for pattern in result['patterns']:
+            self.assertNoOverlap(pattern['placements'], {'a': (20, 10)}, pattern['width'], pattern['height'], 1)
+
+        # A stock size without a cost cannot be compared with priced ones
+        mixed = [{'id': 'large', 'width': 300, 'height': 200}, {'id': 'small', 'width': 100, 'height': 60, 'cost': 30}]
+        with self.assertRaises(ValueError):
+            nestingAlgorithm.stock_selection_nesting(mixed, parts_list, 1, 0.5,
+                                                     objective=nestingAlgorithm.STOCK_OBJECTIVE_COST)
+        
+        # Sheets in stock and sheet costs are respected
+        stock_list[0].update(quantity=1, cost=1)
+        stock_list[1]['cost'] = 1
+        result = nestingAlgorithm.stock_selection_nesting(stock_list, parts_list, 1, 0.5,
+                                                          objective=nestingAlgorithm.STOCK_OBJECTIVE_COST)
+        self.assertEqual([(p['stock'], p['multiplicity']) for p in result['patterns']], [('large', 1), ('offcut', 19)])
+        self.assertEqual(result['total_cost'], 20)
+
+    def test_nfp_nesting(self):
+        """Test that irregular parts are nested by their outline"""
+        l_shape = [(0, 0), (10, 0), (10, 3), (3, 3), (3, 10), (0, 10)]
+        triangle = [(0, 0), (6, 0), (0, 6)]
+        parts_list = [
+            {'id': 'l', 'polygon': l_shape, 'quantity': 30},
+            {'id': 't', 'polygon': triangle, 'quantity': 10}
+        ]
+        result = nestingAlgorithm.nfp_nesting(62, 42, parts_list, 1, 0.2)
+
+        # Larger parts go first, lowest then leftmost
+        self.assertEqual(result['placements'][0], {'part_id': 'l', 'x': 1, 'y': 1, 'rotation': 0, 'rotated': False})
+        placed = {'l': 0, 't': 0}
+        for placement in result['placements']:
+            placed[placement['part_id']] += 1
+            self.assertIn(placement['rotation'], (0, 180))
+        self.assertGreater(placed['l'], 15)  # A grid of bounding boxes holds 15
+        self.assertEqual(placed['l'] + result['unplaced'].get('l', 0), 30)
+        self.assertEqual(placed['t'] + result['unplaced'].get('t', 0), 10)
+        self.assertAlmostEqual(result['unused_area'], 62 * 42 - placed['l'] * 51 - placed['t'] * 18)
+
+        # A square looks the same at every quarter turn, so only one rotation is searched
+        square = {'id': 's', 'polygon': [(0, 0), (4, 0), (4, 4), (0, 4)], 'quantity': 20}
+        result = nestingAlgorithm.nfp_nesting(30, 30, [square], 1, 0.2, rotations=(0, 90, 180, 270))
+        self.assertEqual(len(result['placements']), 20)
+        self.assertEqual({placement['rotation'] for placement in result['placements']}, {0})
+
+    def test_part_in_part(self):
+        """Test that small parts fill the holes of placed frames before the open sheet"""
+        frame = [(0, 0), (20, 0), (20, 20), (0, 20)]
+        hole = [(3, 3), (3, 17), (17, 17), (17, 3)]
+        square = [(0, 0), (4, 0), (4, 4), (0, 4)]
+        parts_list = [
+            {'id': 'frame', 'polygon': frame, 'holes': [hole], 'quantity': 1},
+            {'id': 'square', 'polygon': square, 'quantity': 12}
+        ]
+
+        # The sheet only holds the frame, and its 14 cm hole takes 3 by 3 squares with the spacing
+        result = nestingAlgorithm.nfp_nesting(22, 22, parts_list, 1, 0.5)
+        squares = [p for p in result['placements'] if p['part_id'] == 'square']
+        self.assertEqual(len(squares), 9)
+        self.assertEqual(result['unplaced'], {'square': 3})
+        for placement in squares:
+            self.assertTrue(4 + 0.5 - 1e-9 <= placement['x'] and placement['x'] + 4 <= 18 - 0.5 + 1e-9)
+            self.assertTrue(4 + 0.5 - 1e-9 <= placement['y'] and placement['y'] + 4 <= 18 - 0.5 + 1e-9)
+        self.assertAlmostEqual(result['unused_area'], 22 * 22 - (400 - 196) - 9 * 16)
+
+        # Without holes the frame covers its inside
+        del parts_list[0]['holes']
+        result = nestingAlgorithm.nfp_nesting(22, 22, parts_list, 1, 0.5)
+        self.assertEqual([p['part_id'] for p in result['placements']], ['frame'])
+
+        # An island in the hole is material, and parts in a hole fill their own holes in turn
+        island = [(8, 8), (12, 8), (12, 12), (8, 12)]
+        ring = [(0, 0), (12, 0), (12, 12), (0, 12)]
+        ring_hole = [(2, 2), (2, 10), (10, 10), (10, 2)]
+        parts_list = [
+            {'id': 'frame', 'polygon': frame, 'holes': [hole, island], 'quantity': 1},
+            {'id': 'ring', 'polygon': ring, 'holes': [ring_hole], 'quantity': 1},
+            {'id': 'square', 'polygon': square, 'quantity': 1}
+        ]
+        result = nestingAlgorithm.nfp_nesting(50, 22, parts_list, 1, 0.5)
+        self.assertEqual([(p['part_id'], p['x'], p['y']) for p in result['placements']],
+                         [('frame', 1, 1), ('ring', 21.5, 1), ('square', 24, 3.5)])
+
+        parts_list = [parts_list[0], {'id': 'small', 'polygon': [(0, 0), (2, 0), (2, 2), (0, 2)], 'quantity': 50}]
+        result = nestingAlgorithm.nfp_nesting(22, 22, parts_list, 1, 0.5)
+        smalls = [p for p in result['placements'] if p['part_id'] == 'small']
+        self.assertGreater(len(smalls), 10)
+        for placement in smalls:
+            self.assertFalse(placement['x'] + 2 > 8.5 and placement['x'] < 13.5 and
+                             placement['y'] + 2 > 8.5 and placement['y'] < 13.5)
+
+    def test_hole_index(self):
+        """Test that parts go to the narrowest hole rectangle that takes them"""
+        holes = nestingAlgorithm.HoleIndex(spacing=1)
+        holes.add_region(0, 0, 20, 20)
+        holes.add_region(50, 0, 8, 30)
+        holes.add_region(100, 0, 2, 2)
+        self.assertEqual(len(holes.regions), 2)
+
+        self.assertEqual(holes.insert(5, 5), (51, 1))
+        self.assertEqual(holes.insert(5, 5), (51, 7))
+        self.assertEqual(holes.insert(10, 5), (1, 1))
+        self.assertIsNone(holes.insert(19, 19))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,173 @@
+import sys
+import os
+import importlib
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# transformKernel is imported first so NumPy is loaded outside the patched modules
+from lib import nestingPlanner, partSnapshot, transformKernel
+
+# The emitter talks to the Fusion 360 API, so it is imported against mock adsk modules
+adsk = mock.MagicMock()
+with mock.patch.dict(sys.modules, {'adsk': adsk, 'adsk.core': adsk.core, 'adsk.fusion': adsk.fusion}):
+    nestingEmitter = importlib.import_module('lib.nestingEmitter')
+
+
+class TestLayoutWriter(unittest.TestCase):
+    """Tests for chunked sketch emission using mock Fusion objects"""
+
+    def setUp(self):
+        adsk.reset_mock()
+        self.snapshot = partSnapshot.PartSnapshot()
+        self.snapshot.add_line(0, 0, 10, 0)
+        self.snapshot.add_line(10, 0, 10, 5)
+        self.snapshot.add_circle(5, 2.5, 1)
+
+        sheet = nestingPlanner.SheetSettings(100, 50, 1, 0.5)
+        self.plan = nestingPlanner.plan_grid_layout(self.snapshot.bbox, sheet, quantity=40)
+
+        self.sketch = mock.MagicMock()
+        self.sketch.isComputeDeferred = False
+        self.progress = adsk.core.Application.get().userInterface.createProgressDialog()
+        self.progress.wasCancelled = False
+
+    def test_write(self):
+        """Test that every part is written with compute deferred"""
+        deferred_states = []
+        self.sketch.sketchCurves.sketchLines.addByTwoPoints.side_effect = \
+            lambda *args: deferred_states.append(self.sketch.isComputeDeferred)
+
+        writer = nestingEmitter.LayoutWriter(self.sketch, entities_per_chunk=30)
+        written = writer.write(self.snapshot, self.plan)
+
+        self.assertEqual(written, 40)
+        self.assertFalse(writer.cancelled)
+        self.assertEqual(self.sketch.sketchCurves.sketchLines.addByTwoPoints.call_count, 80)
+        self.assertEqual(self.sketch.sketchCurves.sketchCircles.addByCenterRadius.call_count, 40)
+        self.assertTrue(all(deferred_states))
+        self.assertFalse(self.sketch.isComputeDeferred)
+
+        # 10 parts per chunk gives 4 chunks, each followed by a chance to process events
+        self.assertEqual(adsk.doEvents.call_count, 4)
+        self.progress.hide.assert_called_once()
+
+    def test_failed_parts(self):
+        """Test that parts Fusion refuses to draw are not counted as written"""
+        calls = []
+        def add_line(*args):
+            calls.append(args)
+            if len(calls) in (1, 6):
+                raise RuntimeError('degenerate line')
+        self.sketch.sketchCurves.sketchLines.addByTwoPoints.side_effect = add_line
+
+        written = nestingEmitter.emit_plan(self.sketch, self.snapshot, self.plan)
+        self.assertEqual(written, 38)
+
+    def test_cancel(self):
+        """Test that cancelling stops after a complete chunk of parts"""
+        type(self.progress).wasCancelled = mock.PropertyMock(side_effect=[False, True])
+        self.addCleanup(delattr, type(self.progress), 'wasCancelled')
+
+        writer = nestingEmitter.LayoutWriter(self.sketch, entities_per_chunk=30)
+        written = writer.write(self.snapshot, self.plan)
+
+        self.assertTrue(writer.cancelled)
+        self.assertEqual(written, 20)
+        self.assertEqual(self.sketch.sketchCurves.sketchCircles.addByCenterRadius.call_count, 20)
+        self.assertFalse(self.sketch.isComputeDeferred)
+
+    def test_emit_plan_without_progress(self):
+        """Test that the plain emit_plan helper does not show a progress dialog"""
+        adsk.core.Application.get().userInterface.createProgressDialog.reset_mock()
+        written = nestingEmitter.emit_plan(self.sketch, self.snapshot, self.plan)
+
+        self.assertEqual(written, 40)
+        adsk.core.Application.get().userInterface.createProgressDialog.assert_not_called()
+
+    def test_write_layout_sketches(self):
+        """Test that a large layout is split over grouped sketches"""
+        component = mock.MagicMock()
+        created = []
+        def add_sketch(plane):
+            created.append(mock.MagicMock(isComputeDeferred=False))
+            created[-1].timelineObject.index = len(created) + 4
+            return created[-1]
+        component.sketches.add.side_effect = add_sketch
+        design = adsk.fusion.Design.cast.return_value
+        design.designType = adsk.fusion.DesignTypes.ParametricDesignType
+        timings = nestingEmitter.EmissionTimings(bulk_import_min_entities=10 ** 6)
+
+        with mock.patch.object(nestingEmitter, 'emission_timings', timings):
+            sketches, sheet_sketches, written, cancelled, emit_path = nestingEmitter.write_layout_sketches(
+                component, self.snapshot, self.plan, 'Layout', max_entities=45)
+
+        # 3 entities per part gives 15 parts per sketch
+        self.assertEqual(written, 40)
+        self.assertFalse(cancelled)
+        self.assertEqual(emit_path, nestingEmitter.EMIT_PATH_ENTITIES)
+        self.assertEqual([s.name for s in sketches], ['Layout - Sheet 1.1', 'Layout - Sheet 1.2', 'Layout - Sheet 1.3'])
+        self.assertEqual(sheet_sketches, {0: sketches[0]})
+        design.timeline.timelineGroups.add.assert_called_once_with(5, 7)
+
+        # A refused group leaves the sketches ungrouped
+        design.timeline.timelineGroups.add.side_effect = RuntimeError('no timeline')
+        self.assertFalse(nestingEmitter.group_in_timeline(component, sketches, 'Layout'))
+        design.timeline.timelineGroups.add.side_effect = None
+
+    def test_repeated_sheets(self):
+        """Test that a repeated sheet is written once and labelled with its count"""
+        sheet = nestingPlanner.SheetSettings(100, 50, 1, 0.5)
+        plan = nestingPlanner.plan_multi_sheet_layout(self.snapshot.bbox, sheet, quantity=200, use_pattern=False,
+                                                      collapse_repeats=True)
+        component = mock.MagicMock()
+        component.sketches.add.side_effect = lambda plane: mock.MagicMock(isComputeDeferred=False)
+        timings = nestingEmitter.EmissionTimings(bulk_import_min_entities=10 ** 6)
+
+        with mock.patch.object(nestingEmitter, 'emission_timings', timings):
+            sketches, sheet_sketches, written, cancelled, emit_path = nestingEmitter.write_layout_sketches(
+                component, self.snapshot, plan, 'Layout')
+
+        self.assertEqual(written, plan.parts_placed)
+        self.assertEqual([s.name for s in sketches], ['Layout - Sheet 1 (x2)', 'Layout - Sheet 2'])
+        self.assertEqual(sheet_sketches, {0: sketches[0], 1: sketches[1]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            exported = nestingEmitter.export_sheet_dxfs(directory, self.snapshot, plan, 'part')
+            self.assertEqual([(os.path.basename(path), count) for path, count in exported],
+                             [('part_sheet1_x2.dxf', 2), ('part_sheet2.dxf', 1)])
+            with open(exported[0][0]) as stream:
+                self.assertEqual(stream.read().count('CIRCLE'), 72)
+
+
+class TestEmissionTimings(unittest.TestCase):
+    """Tests for choosing between per-entity emission and DXF import"""
+
+    def test_threshold_before_measurements(self):
+        """Test that the entity threshold decides until both paths are measured"""
+        timings = nestingEmitter.EmissionTimings(bulk_import_min_entities=1000)
+        self.assertEqual(timings.choose(999), nestingEmitter.EMIT_PATH_ENTITIES)
+        self.assertEqual(timings.choose(1000), nestingEmitter.EMIT_PATH_DXF)
+
+        timings.record(nestingEmitter.EMIT_PATH_ENTITIES, 500, 1.0)
+        self.assertEqual(timings.choose(5000), nestingEmitter.EMIT_PATH_DXF)
+
+    def test_measured_choice(self):
+        """Test that measured timings pick the faster path for each size"""
+        timings = nestingEmitter.EmissionTimings()
+
+        # Per-entity: no overhead, 2 ms per entity. DXF: 1 s overhead, 0.1 ms per entity
+        for count in (100, 1000):
+            timings.record(nestingEmitter.EMIT_PATH_ENTITIES, count, count * 0.002)
+            timings.record(nestingEmitter.EMIT_PATH_DXF, count, 1 + count * 0.0001)
+
+        self.assertAlmostEqual(timings.estimate(nestingEmitter.EMIT_PATH_DXF, 10000), 2)
+        self.assertEqual(timings.choose(200), nestingEmitter.EMIT_PATH_ENTITIES)
+        self.assertEqual(timings.choose(5000), nestingEmitter.EMIT_PATH_DXF)
+
+
+if __name__ == '__main__':
+    unittest.main()
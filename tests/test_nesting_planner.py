@@ -0,0 +1,344 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import nestingAlgorithm, nestingPlanner, partSnapshot
+
+class TestNestingPlanner(unittest.TestCase):
+    """Tests for the Fusion-independent layout planner"""
+
+    def setUp(self):
+        self.sheet = nestingPlanner.SheetSettings(
+            width=100,
+            height=50,
+            edge_clearance=1,
+            gutter_size=0.5
+        )
+
+    def test_plan_grid_layout(self):
+        """Test a simple grid plan"""
+        plan = nestingPlanner.plan_grid_layout((0, 10, 0, 5), self.sheet, quantity=20)
+
+        self.assertEqual(plan.parts_placed, 20)
+        self.assertEqual((plan.parts_per_row, plan.parts_per_column), (9, 8))
+        self.assertFalse(plan.rotated)
+
+        # First row is filled before the second row starts
+        self.assertEqual(plan.placements[0][:2], (1, 1))
+        self.assertEqual(plan.placements[9][:2], (1, 6.5))
+
+        # Plans are immutable
+        with self.assertRaises(AttributeError):
+            plan.rotated = True
+
+    def test_plan_limited_by_sheet(self):
+        """Test that the plan never exceeds the sheet capacity"""
+        plan = nestingPlanner.plan_grid_layout((0, 10, 0, 5), self.sheet, quantity=1000)
+        self.assertEqual(plan.parts_placed, 72)
+
+        # A part larger than the sheet produces an empty plan
+        plan = nestingPlanner.plan_grid_layout((0, 150, 0, 100), self.sheet, quantity=5)
+        self.assertEqual(plan.parts_placed, 0)
+
+    def test_plan_rotation(self):
+        """Test that rotation is chosen when it fits more parts"""
+        plan = nestingPlanner.plan_grid_layout((0, 20, 0, 5), self.sheet, quantity=1000,
+                                               optimize_rotation=True)
+        self.assertTrue(plan.rotated)
+        self.assertEqual(plan.parts_placed, 17 * 2)
+        self.assertEqual((plan.part_width, plan.part_height), (5, 20))
+        self.assertTrue(all(p.rotation == 90 for p in plan.placements))
+
+    def test_plan_lattice_layout(self):
+        """Test that triangles pair up on a lattice and fill the sheet far better than their boxes"""
+        snapshot = partSnapshot.PartSnapshot()
+        outline = [(0, 0), (8, 0), (0, 6)]
+        for start, end in zip(outline, outline[1:] + outline[:1]):
+            snapshot.add_line(*start, *end)
+
+        plan = nestingPlanner.plan_lattice_layout(snapshot, self.sheet, quantity=1000)
+        pattern_plan = nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=1000)
+        self.assertGreater(plan.parts_placed, 1.5 * pattern_plan.parts_placed)
+        angles = sorted({placement.rotation for placement in plan.placements})
+        self.assertEqual(len(angles), 2)
+        self.assertEqual(angles[1] - angles[0], 180)
+        for placement in plan.placements:
+            cos_a, sin_a, tx, ty = plan.transform(placement)
+            for x, y in outline:
+                self.assertTrue(1 - 1e-6 <= cos_a * x - sin_a * y + tx <= 99 + 1e-6)
+                self.assertTrue(1 - 1e-6 <= sin_a * x + cos_a * y + ty <= 49 + 1e-6)
+
+        # The lattice is cut to the quantity, and the block pattern kept when it places as many
+        quantity = pattern_plan.parts_placed + 1
+        self.assertEqual(nestingPlanner.plan_lattice_layout(snapshot, self.sheet, quantity).parts_placed, quantity)
+        plan = nestingPlanner.plan_lattice_layout(snapshot, self.sheet, quantity=40)
+        self.assertEqual(plan, nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=40))
+
+    def test_plan_rectilinear_layout(self):
+        """Test that L-shaped brackets reach into each other's notches"""
+        snapshot = partSnapshot.PartSnapshot()
+        outline = [(0, 0), (10, 0), (10, 4), (4, 4), (4, 10), (0, 10)]
+        for start, end in zip(outline, outline[1:] + outline[:1]):
+            snapshot.add_line(*start, *end)
+
+        plan = nestingPlanner.plan_rectilinear_layout(snapshot, self.sheet, quantity=1000)
+        pattern_plan = nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=1000)
+        self.assertGreater(plan.parts_placed, 1.2 * pattern_plan.parts_placed)
+        self.assertEqual(plan.part_area, 64)
+        self.assertTrue(all(placement.rotation % 90 == 0 for placement in plan.placements))
+
+        # Every arm of every bracket lies on the sheet, apart from the other brackets by the gutter
+        placed_arms = []
+        for placement in plan.placements:
+            cos_a, sin_a, tx, ty = plan.transform(placement)
+            arms = []
+            for corners in (((0, 0), (4, 10)), ((4, 0), (10, 4))):
+                xs = [cos_a * x - sin_a * y + tx for x, y in corners]
+                ys = [sin_a * x + cos_a * y + ty for x, y in corners]
+                arms.append((min(xs), min(ys), max(xs), max(ys)))
+            for box in arms:
+                self.assertTrue(1 - 1e-6 <= box[0] and box[2] <= 99 + 1e-6)
+                self.assertTrue(1 - 1e-6 <= box[1] and box[3] <= 49 + 1e-6)
+                for other in placed_arms:
+                    self.assertFalse(min(box[2], other[2]) - max(box[0], other[0]) > -0.5 + 1e-6 and
+                                     min(box[3], other[3]) - max(box[1], other[1]) > -0.5 + 1e-6)
+            placed_arms.extend(arms)
+
+        # Outlines with sloped edges keep the block pattern layout
+        triangle = partSnapshot.PartSnapshot()
+        for start, end in (((0, 0), (8, 0)), ((8, 0), (0, 6)), ((0, 6), (0, 0))):
+            triangle.add_line(*start, *end)
+        self.assertEqual(nestingPlanner.plan_rectilinear_layout(triangle, self.sheet, quantity=100),
+                         nestingPlanner.plan_pattern_layout(triangle.bbox, self.sheet, quantity=100))
+
+    def test_plan_pair_layout(self):
+        """Test that triangles packed as interlocking pairs beat the block pattern"""
+        snapshot = partSnapshot.PartSnapshot()
+        for start, end in (((0, 0), (8, 0)), ((8, 0), (0, 6)), ((0, 6), (0, 0))):
+            snapshot.add_line(*start, *end)
+
+        plan = nestingPlanner.plan_pair_layout(snapshot, self.sheet, quantity=1000)
+        pattern_plan = nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=1000)
+        self.assertGreater(plan.parts_placed, 1.5 * pattern_plan.parts_placed)
+        self.assertEqual(plan.part_area, 24)
+        self.assertEqual(nestingPlanner.plan_pair_layout(snapshot, self.sheet, quantity=7).parts_placed, 7)
+
+        # Every corner of every triangle lies on the sheet
+        for placement in plan.placements:
+            cos_a, sin_a, tx, ty = plan.transform(placement)
+            for x, y in ((0, 0), (8, 0), (0, 6)):
+                self.assertTrue(1 - 1e-6 <= cos_a * x - sin_a * y + tx <= 99 + 1e-6)
+                self.assertTrue(1 - 1e-6 <= sin_a * x + cos_a * y + ty <= 49 + 1e-6)
+
+        # Rectangles do not pair up
+        square = partSnapshot.PartSnapshot()
+        for start, end in (((0, 0), (5, 0)), ((5, 0), (5, 5)), ((5, 5), (0, 5)), ((0, 5), (0, 0))):
+            square.add_line(*start, *end)
+        self.assertEqual(nestingPlanner.plan_pair_layout(square, self.sheet, quantity=100),
+                         nestingPlanner.plan_pattern_layout(square.bbox, self.sheet, quantity=100))
+
+    def test_plan_pattern_layout(self):
+        """Test that the pattern plan mixes orientations to fit more parts"""
+        sheet = nestingPlanner.SheetSettings(58, 45, 0.5, 0)
+        grid = nestingPlanner.plan_grid_layout((0, 12, 0, 5), sheet, quantity=100, optimize_rotation=True)
+        plan = nestingPlanner.plan_pattern_layout((0, 12, 0, 5), sheet, quantity=100)
+
+        self.assertEqual(grid.parts_placed, 33)
+        self.assertEqual(plan.parts_placed, 40)
+        self.assertTrue(plan.rotated)
+        self.assertEqual({p.rotation for p in plan.placements}, {0.0, 90.0})
+        self.assertEqual((plan.part_width, plan.part_height), (12, 5))
+
+        plan = nestingPlanner.plan_pattern_layout((0, 12, 0, 5), sheet, quantity=7)
+        self.assertEqual(plan.parts_placed, 7)
+
+    def test_plan_multi_sheet_layout(self):
+        """Test that full sheets repeat the single-sheet layout and the rest goes on the last sheet"""
+        single = nestingPlanner.plan_grid_layout((0, 10, 0, 5), self.sheet, quantity=1000, optimize_rotation=True)
+        plan = nestingPlanner.plan_multi_sheet_layout((0, 10, 0, 5), self.sheet, quantity=200, use_pattern=False)
+
+        self.assertEqual(single.parts_placed, 72)
+        self.assertEqual(plan.parts_placed, 200)
+        self.assertEqual(plan.sheet_count, 3)
+        self.assertEqual(len([p for p in plan.placements if p.sheet == 2]), 56)
+        self.assertAlmostEqual(plan.utilization, 200 * 50 / (3 * 5000) * 100)
+
+        # Later sheets are laid out to the right of the first one
+        first = plan.placements[0]
+        second_sheet = [p for p in plan.placements if p.sheet == 1][0]
+        positions = plan.layout_positions()
+        self.assertEqual(positions[72][0] - positions[0][0], self.sheet.width + nestingPlanner.SHEET_SPACING)
+        self.assertEqual((second_sheet.x, second_sheet.y), (first.x, first.y))
+        self.assertEqual(plan.transform(second_sheet)[2] - plan.transform(first)[2],
+                         self.sheet.width + nestingPlanner.SHEET_SPACING)
+
+    def test_collapse_repeated_sheets(self):
+        """Test that identical sheets are planned once with a multiplicity"""
+        expanded = nestingPlanner.plan_multi_sheet_layout((0, 10, 0, 5), self.sheet, quantity=200, use_pattern=False)
+        collapsed = nestingPlanner.collapse_repeated_sheets(expanded)
+        planned = nestingPlanner.plan_multi_sheet_layout((0, 10, 0, 5), self.sheet, quantity=200, use_pattern=False,
+                                                         collapse_repeats=True)
+
+        for plan in (collapsed, planned):
+            self.assertEqual(plan.sheet_count, 2)
+            self.assertEqual(plan.sheet_multiplicity, (2, 1))
+            self.assertEqual(plan.sheets_required, 3)
+            self.assertEqual(plan.parts_placed, 72 + 56)
+            self.assertEqual(plan.parts_total, 200)
+            self.assertAlmostEqual(plan.utilization, expanded.utilization)
+        self.assertEqual(collapsed.placements, planned.placements)
+
+        # Plans without repeats are unchanged
+        single = nestingPlanner.plan_grid_layout((0, 10, 0, 5), self.sheet, quantity=20)
+        self.assertEqual(single.multiplicity(0), 1)
+        self.assertEqual(nestingPlanner.collapse_repeated_sheets(single).placements, single.placements)
+
+    def test_plan_stock_layout(self):
+        """Test that identical parts are planned on the cheapest mix of stock sizes"""
+        offcut = nestingPlanner.SheetSettings(25, 15, 1, 0.5)
+        stocks = [
+            nestingPlanner.StockSheet('Large', self.sheet),
+            nestingPlanner.StockSheet('Offcut', offcut)
+        ]
+
+        # 18 parts fit on a large sheet and one on an offcut
+        plan = nestingPlanner.plan_stock_layout((0, 20, 0, 10), stocks, quantity=37)
+        self.assertEqual(plan.sheet_sizes, (self.sheet, offcut))
+        self.assertEqual(plan.sheet_multiplicity, (2, 1))
+        self.assertEqual(plan.parts_total, 37)
+        self.assertAlmostEqual(plan.utilization, 37 * 200 / (2 * 5000 + 375) * 100)
+        self.assertEqual(plan.sheet_origin(1), (self.sheet.width + nestingPlanner.SHEET_SPACING, 0.0))
+
+        # The cost objective needs a cost on every stock size, not the area in its place
+        stocks[1] = stocks[1]._replace(cost=6000)
+        with self.assertRaises(ValueError):
+            nestingPlanner.plan_stock_layout((0, 20, 0, 10), stocks, quantity=37,
+                                             objective=nestingPlanner.nestingAlgorithm.STOCK_OBJECTIVE_COST)
+
+        # Sheet costs can make the larger sheet the better choice
+        stocks[0] = stocks[0]._replace(cost=5000)
+        plan = nestingPlanner.plan_stock_layout((0, 20, 0, 10), stocks, quantity=37,
+                                                objective=nestingPlanner.nestingAlgorithm.STOCK_OBJECTIVE_COST)
+        self.assertEqual(plan.sheet_sizes, (self.sheet, self.sheet))
+        self.assertEqual(plan.sheet_multiplicity, (2, 1))
+
+        # Large quantities only search a bounded remainder
+        plan = nestingPlanner.plan_stock_layout((0, 20, 0, 10), stocks, quantity=100000)
+        self.assertEqual(plan.parts_total, 100000)
+
+    def test_plan_true_shape_layout(self):
+        """Test that parts are nested by their outline when that fits more of them"""
+        snapshot = partSnapshot.PartSnapshot()
+        outline = [(5, 2), (15, 2), (15, 5), (8, 5), (8, 12), (5, 12)]
+        for start, end in zip(outline, outline[1:] + outline[:1]):
+            snapshot.add_line(*start, *end)
+
+        plan = nestingPlanner.plan_true_shape_layout(snapshot, self.sheet, quantity=1000)
+        pattern_plan = nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=1000)
+        self.assertGreater(plan.parts_placed, pattern_plan.parts_placed)
+        self.assertEqual(plan.part_area, 51)
+        self.assertAlmostEqual(plan.utilization, plan.parts_placed * 51 / 5000 * 100)
+
+        # Every placed outline stays inside the edge clearance
+        for placement in plan.placements:
+            cos_a, sin_a, tx, ty = plan.transform(placement)
+            for x, y in outline:
+                self.assertGreaterEqual(cos_a * x - sin_a * y + tx, 1 - 1e-6)
+                self.assertLessEqual(sin_a * x + cos_a * y + ty, 49 + 1e-6)
+
+        # Repeating the sheet covers larger quantities
+        multi_plan = nestingPlanner.repeat_sheet_layout(plan, plan.parts_placed * 2 + 1, collapse_repeats=True)
+        self.assertEqual(multi_plan.sheet_multiplicity, (2, 1))
+        self.assertEqual(multi_plan.parts_total, plan.parts_placed * 2 + 1)
+
+        # Without a closed outline the block pattern is used
+        snapshot = partSnapshot.PartSnapshot()
+        snapshot.add_line(0, 0, 10, 0)
+        snapshot.add_line(10, 0, 10, 5)
+        plan = nestingPlanner.plan_true_shape_layout(snapshot, self.sheet, quantity=10)
+        self.assertEqual(plan, nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=10))
+
+    def test_true_shape_part(self):
+        """Test that a frame from a sketch fills its hole with another part of the run"""
+        frame = partSnapshot.PartSnapshot()
+        for start, end in (((0, 0), (20, 0)), ((20, 0), (20, 20)), ((20, 20), (0, 20)), ((0, 20), (0, 0))):
+            frame.add_line(*start, *end)
+        frame.add_circle(10, 10, 8)
+
+        part = nestingPlanner.true_shape_part(frame, quantity=2, part_id='frame')
+        self.assertEqual((part['id'], part['quantity'], len(part['holes'])), ('frame', 2, 1))
+        self.assertIsNone(nestingPlanner.true_shape_part(partSnapshot.PartSnapshot(), quantity=2))
+
+        # Two frames fill the sheet, so the washers only fit in their holes
+        washer = {'id': 'washer', 'polygon': [(0, 0), (5, 0), (5, 5), (0, 5)], 'quantity': 2}
+        solution = nestingAlgorithm.nfp_nesting(43, 22, [part, washer], 1, 0.5)
+        self.assertEqual([p['part_id'] for p in solution['placements']], ['frame', 'frame', 'washer', 'washer'])
+        self.assertEqual(solution['unplaced'], {})
+
+    def test_plan_raster_layout(self):
+        """Test that parts nested as bitmasks stay on the sheet and beat their bounding boxes"""
+        snapshot = partSnapshot.PartSnapshot()
+        outline = [(5, 2), (15, 2), (15, 5), (8, 5), (8, 12), (5, 12)]
+        for start, end in zip(outline, outline[1:] + outline[:1]):
+            snapshot.add_line(*start, *end)
+
+        pattern_plan = nestingPlanner.plan_pattern_layout(snapshot.bbox, self.sheet, quantity=1000)
+        if nestingPlanner.occupancyGrid.HAS_NUMPY:
+            plan = nestingPlanner.plan_raster_layout(snapshot, self.sheet, quantity=1000)
+            self.assertGreater(plan.parts_placed, pattern_plan.parts_placed)
+            self.assertAlmostEqual(plan.part_area, 51)
+            for placement in plan.placements:
+                cos_a, sin_a, tx, ty = plan.transform(placement)
+                for x, y in outline:
+                    self.assertTrue(1 - 1e-6 <= cos_a * x - sin_a * y + tx <= 99 + 1e-6)
+                    self.assertTrue(1 - 1e-6 <= sin_a * x + cos_a * y + ty <= 49 + 1e-6)
+
+        # Without NumPy the exact true-shape layout is used
+        with mock.patch.object(nestingPlanner.occupancyGrid, 'HAS_NUMPY', False):
+            plan = nestingPlanner.plan_raster_layout(snapshot, self.sheet, quantity=1000)
+        self.assertEqual(plan, nestingPlanner.plan_true_shape_layout(snapshot, self.sheet, quantity=1000))
+
+    def test_transform(self):
+        """Test that transforms move the part bounding box onto the placement"""
+        bbox = (2, 12, 3, 8)
+        plan = nestingPlanner.plan_grid_layout(bbox, self.sheet, quantity=1)
+        cos_a, sin_a, tx, ty = plan.transform(plan.placements[0])
+        self.assertEqual((cos_a, sin_a), (1, 0))
+        self.assertEqual((2 + tx, 3 + ty), (1, 1))
+
+        # A quarter turn puts the rotated box corner on the placement point
+        placement = nestingPlanner.Placement(30, 40, 90)
+        cos_a, sin_a, tx, ty = nestingPlanner.placement_transform(bbox, placement)
+        corners = [(2, 3), (12, 3), (12, 8), (2, 8)]
+        xs = [cos_a * x - sin_a * y + tx for x, y in corners]
+        ys = [sin_a * x + cos_a * y + ty for x, y in corners]
+        self.assertAlmostEqual(min(xs), 30)
+        self.assertAlmostEqual(min(ys), 40)
+        self.assertAlmostEqual(max(xs) - min(xs), 5)
+        self.assertAlmostEqual(max(ys) - min(ys), 10)
+
+    def test_shard_plan(self):
+        """Test that shards respect the entity budget and keep sheets apart"""
+        placements = tuple(nestingPlanner.Placement(x, y, sheet=sheet)
+                           for sheet in (1, 0) for y in (0, 10) for x in (0, 20, 40))
+        plan = nestingPlanner.PlacementPlan(self.sheet, (0, 10, 0, 5), 10, 5, placements)
+
+        shards = nestingPlanner.shard_plan(plan, entities_per_part=4, max_entities_per_shard=10)
+        self.assertEqual([s.parts_placed for s in shards], [2, 2, 2, 2, 2, 2])
+        self.assertEqual([s.placements[0].sheet for s in shards], [0, 0, 0, 1, 1, 1])
+
+        # Within a sheet the shards are bands from bottom to top
+        self.assertEqual([(p.x, p.y) for p in shards[1].placements], [(40, 0), (0, 10)])
+
+        # A part larger than the budget still gets a shard of its own
+        shards = nestingPlanner.shard_plan(plan, entities_per_part=50, max_entities_per_shard=10)
+        self.assertEqual(len(shards), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
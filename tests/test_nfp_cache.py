@@ -0,0 +1,88 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import nestingAlgorithm, nfpCache
+
+L_SHAPE = [(0, 0), (10, 0), (10, 3), (3, 3), (3, 10), (0, 10)]
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4)]
+
+
+class TestNfpCache(unittest.TestCase):
+    """Tests for the content-addressed no-fit polygon cache"""
+
+    def test_key(self):
+        """Test that keys depend on the shapes, not on where or how they were drawn"""
+        key = nfpCache.nfp_key(L_SHAPE, 0, SQUARE, 90, 0.5)
+
+        moved = [(x + 7.5, y - 2) for x, y in L_SHAPE]
+        reversed_from_other_vertex = (L_SHAPE[3:] + L_SHAPE[:3])[::-1]
+        self.assertEqual(nfpCache.nfp_key(moved, 0, SQUARE, 90, 0.5), key)
+        self.assertEqual(nfpCache.nfp_key(reversed_from_other_vertex, 360, SQUARE, 90, 0.5), key)
+
+        self.assertNotEqual(nfpCache.nfp_key(L_SHAPE, 0, SQUARE, 90, 0.6), key)
+        self.assertNotEqual(nfpCache.nfp_key(L_SHAPE, 180, SQUARE, 90, 0.5), key)
+        self.assertNotEqual(nfpCache.nfp_key(SQUARE, 90, L_SHAPE, 0, 0.5), key)
+
+    def test_memory_lru(self):
+        """Test hit and miss counts and least-recently-used eviction"""
+        cache = nfpCache.NfpCache(max_entries=2)
+        first = cache.nfp(L_SHAPE, 0, SQUARE, 0)
+        self.assertIs(cache.nfp(L_SHAPE, 0, SQUARE, 0), first)
+        cache.nfp(L_SHAPE, 0, SQUARE, 90)
+
+        # Using the first entry again makes the second the oldest
+        cache.nfp(L_SHAPE, 0, SQUARE, 0)
+        cache.nfp(L_SHAPE, 180, SQUARE, 0)
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.nfp(L_SHAPE, 0, SQUARE, 0), first)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+        cache.nfp(L_SHAPE, 0, SQUARE, 90)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_disk(self):
+        """Test that a new cache reads the entries written by an earlier one"""
+        with tempfile.TemporaryDirectory() as directory:
+            built = nfpCache.NfpCache(directory).nfp(L_SHAPE, 0, SQUARE, 0, 0.5)
+
+            cache = nfpCache.NfpCache(directory)
+            loaded = cache.nfp(L_SHAPE, 0, SQUARE, 0, 0.5)
+            stats = cache.stats()
+            self.assertEqual((stats['disk_hits'], stats['misses'], stats['disk_entries']), (1, 0, 1))
+            self.assertGreater(stats['disk_bytes'], 0)
+            self.assertEqual(loaded.pieces, [[tuple(point) for point in piece] for piece in built.pieces])
+            self.assertEqual(sorted(loaded.candidates), sorted(built.candidates))
+
+            # A damaged file is treated as a miss and rewritten
+            key = nfpCache.nfp_key(L_SHAPE, 0, SQUARE, 0, 0.5)
+            with open(os.path.join(directory, key[:2], key + '.json'), 'w') as stream:
+                stream.write('{"pieces": [')
+            cache = nfpCache.NfpCache(directory)
+            cache.nfp(L_SHAPE, 0, SQUARE, 0, 0.5)
+            self.assertEqual((cache.disk_hits, cache.misses), (0, 1))
+
+            cache.clear(disk=True)
+            self.assertEqual(cache.stats()['disk_entries'], 0)
+
+    def test_nfp_nesting(self):
+        """Test that nesting with a cache gives the same layout and reuses it on the next run"""
+        parts_list = [{'id': 'l', 'polygon': L_SHAPE, 'quantity': 40}]
+        expected = nestingAlgorithm.nfp_nesting(60, 40, parts_list, 1, 0.2)
+
+        cache = nfpCache.NfpCache()
+        result = nestingAlgorithm.nfp_nesting(60, 40, parts_list, 1, 0.2, nfp_cache=cache)
+        self.assertEqual(result['placements'], expected['placements'])
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+        nestingAlgorithm.nfp_nesting(80, 40, parts_list, 2, 0.2, nfp_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
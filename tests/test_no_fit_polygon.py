@@ -0,0 +1,95 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import noFitPolygon
+
+L_SHAPE = [(0, 0), (10, 0), (10, 3), (3, 3), (3, 10), (0, 10)]
+
+
+def overlaps(first, second):
+    """Whether two placed polygons overlap, by checking each polygon's pieces against the other's"""
+    for a in noFitPolygon.convex_decomposition(first):
+        for b in noFitPolygon.convex_decomposition(second):
+            nfp = noFitPolygon.no_fit_polygon([a], [b])
+            if nfp.blocks(0, 0):
+                return True
+    return False
+
+
+class TestNoFitPolygon(unittest.TestCase):
+    """Tests for no-fit polygons and bottom-left-fill placement"""
+
+    def test_convex_decomposition(self):
+        """Test that a concave polygon is split into convex pieces of the same area"""
+        pieces = noFitPolygon.convex_decomposition(L_SHAPE)
+        self.assertEqual(len(pieces), 2)
+        self.assertAlmostEqual(sum(noFitPolygon.signed_area(piece) for piece in pieces), 51)
+
+        # Convex input, in either direction, stays one piece
+        square = [(0, 0), (0, 4), (4, 4), (4, 0)]
+        self.assertEqual(len(noFitPolygon.convex_decomposition(square)), 1)
+
+    def test_no_fit_polygon(self):
+        """Test which positions of a square around an L-shape overlap it"""
+        pieces = noFitPolygon.convex_decomposition(L_SHAPE)
+        square = [(0, 0), (2, 0), (2, 2), (0, 2)]
+        nfp = noFitPolygon.no_fit_polygon(pieces, [square])
+
+        self.assertTrue(nfp.blocks(1, 1))
+        self.assertFalse(nfp.blocks(5, 5))  # In the notch of the L
+        self.assertFalse(nfp.blocks(3, 3))  # Touching both arms
+        self.assertIn((3, 3), nfp.candidates)
+
+        # Spacing grows the NFP by at least the gap
+        nfp = noFitPolygon.no_fit_polygon(pieces, [square], spacing=0.5)
+        self.assertTrue(nfp.blocks(3.4, 3.4))
+        self.assertFalse(nfp.blocks(4, 4))
+
+    def test_packer(self):
+        """Test that L-shapes interlock without overlaps and beat their bounding boxes"""
+        packer = noFitPolygon.NfpPacker(60, 40, spacing=0.2)
+        for angle in (0, 180):
+            packer.add_shape(angle, noFitPolygon.rotate_polygon(L_SHAPE, angle)[0])
+
+        while True:
+            positions = [(packer.find_position(angle), angle) for angle in (0, 180)]
+            positions = [(position, angle) for position, angle in positions if position is not None]
+            if not positions:
+                break
+            (x, y), angle = min(positions, key=lambda item: (item[0][1], item[0][0]))
+            packer.place(angle, x, y)
+
+        # A grid of bounding boxes holds 5 x 3 parts
+        self.assertGreater(len(packer.placed), 15)
+
+        placed = [[(px + x, py + y) for px, py in noFitPolygon.rotate_polygon(L_SHAPE, angle)[0]]
+                  for angle, x, y in packer.placed]
+        for polygon in placed:
+            self.assertTrue(all(-1e-6 <= x <= 60 + 1e-6 and -1e-6 <= y <= 40 + 1e-6 for x, y in polygon))
+        for i in range(len(placed)):
+            for j in range(i + 1, len(placed)):
+                self.assertFalse(overlaps(placed[i], placed[j]))
+
+    def test_shared_nfp_source(self):
+        """Test that NFPs come from the source when one is given"""
+        calls = []
+        def source(fixed_key, moving_key):
+            calls.append((fixed_key, moving_key))
+            return noFitPolygon.no_fit_polygon(packer.shapes[fixed_key][0], packer.shapes[moving_key][0])
+
+        packer = noFitPolygon.NfpPacker(30, 10, nfp_source=source)
+        packer.add_shape('square', [(0, 0), (4, 0), (4, 4), (0, 4)])
+        for _ in range(3):
+            packer.insert('square')
+
+        self.assertEqual([(x, y) for _, x, y in packer.placed], [(0, 0), (4, 0), (8, 0)])
+        self.assertEqual(calls, [('square', 'square')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import nestingAlgorithm, occupancyGrid
+
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4)]
+FRAME = [[(0, 0), (10, 0), (10, 10), (0, 10)], [(3, 3), (3, 7), (7, 7), (7, 3)]]
+
+
+@unittest.skipUnless(occupancyGrid.HAS_NUMPY, "NumPy is not installed")
+class TestOccupancyGrid(unittest.TestCase):
+    """Tests for raster nesting on an occupancy grid"""
+
+    def test_rasterize(self):
+        """Test that masks cover the part, keep holes clear and grow by the spacing"""
+        mask, margin = occupancyGrid.rasterize(FRAME, 0, 1)
+        self.assertEqual((mask.shape, margin), ((10, 10), 0))
+        self.assertTrue(mask[0].all() and mask[:, 0].all())
+        self.assertFalse(mask[4:6, 4:6].any())
+        self.assertEqual(occupancyGrid.loops_area(FRAME), 84)
+
+        # Edges that cut through a cell mark it even when its center is outside
+        mask, _ = occupancyGrid.rasterize([[(0, 0), (3.2, 0), (3.2, 2), (0, 2)]], 90, 1)
+        self.assertEqual(mask.shape, (4, 2))
+        self.assertTrue(mask.all())
+
+        grown, margin = occupancyGrid.rasterize([SQUARE], 0, 1, dilation=1)
+        self.assertEqual(margin, 3)
+        self.assertEqual(grown.shape, (10, 10))
+        self.assertTrue(grown[3:7, 1:9].all())
+        self.assertFalse(grown[0, 0])
+
+    def test_blocked_offsets(self):
+        """Test the offsets at which two masks overlap"""
+        mask, _ = occupancyGrid.rasterize([SQUARE], 0, 1)
+        blocked, row_offset, column_offset = occupancyGrid.blocked_offsets(mask, mask, 0)
+        self.assertEqual((row_offset, column_offset), (-3, -3))
+        self.assertEqual(blocked.shape, (7, 7))
+        self.assertTrue(blocked.all())
+
+    def test_grid_packer(self):
+        """Test bottom-left fill of masks"""
+        mask, _ = occupancyGrid.rasterize([SQUARE], 0, 1)
+        packer = occupancyGrid.GridPacker(8, 10)
+        packer.add_shape('square', mask, mask, 0)
+        positions = []
+        while True:
+            position = packer.find_position('square')
+            if position is None:
+                break
+            packer.place('square', *position)
+            positions.append(position)
+        self.assertEqual(positions, [(0, 0), (0, 4), (4, 0), (4, 4)])
+
+    def test_raster_nesting(self):
+        """Test that small parts drop into the holes of large ones"""
+        parts_list = [
+            {'id': 'frame', 'loops': FRAME, 'quantity': 1},
+            {'id': 'square', 'loops': [[(0, 0), (3, 0), (3, 3), (0, 3)]], 'quantity': 1}
+        ]
+        levels = []
+        result = nestingAlgorithm.raster_nesting(12, 12, parts_list, 1, 0.2, rotations=(0,),
+                                                 resolutions=(1, 0.25, 0.1), progress=levels.append)
+
+        # Coarse grids keep more room around parts, so only the finest fits the square in the hole
+        self.assertEqual([len(level['placements']) for level in levels], [1, 1, 2])
+        self.assertEqual(result['resolution'], 0.1)
+        square = result['placements'][1]
+        self.assertTrue(4 <= square['x'] <= 5 and 4 <= square['y'] <= 5)
+        self.assertAlmostEqual(result['unused_area'], 144 - 84 - 9)
+
+        # A time limit stops before the finer levels
+        levels = []
+        nestingAlgorithm.raster_nesting(12, 12, parts_list, 1, 0.2, rotations=(0,), resolutions=(1, 0.25),
+                                        time_limit=0, progress=levels.append)
+        self.assertEqual(len(levels), 1)
+
+        # An empty parts list gives an empty solution
+        result = nestingAlgorithm.raster_nesting(12, 12, [], 1, 0.2)
+        self.assertEqual(result['placements'], [])
+        self.assertEqual(result['unplaced'], {})
+        self.assertIsNone(result['resolution'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import nestingAlgorithm, noFitPolygon, pairClustering
+
+TRIANGLE = [(0, 0), (8, 0), (0, 6)]
+L_SHAPE = [(0, 0), (10, 0), (10, 3), (3, 3), (3, 10), (0, 10)]
+SQUARE = [(0, 0), (5, 0), (5, 5), (0, 5)]
+
+
+class TestPairClustering(unittest.TestCase):
+    """Tests for interlocking pairs of irregular parts"""
+
+    def assertNoOverlaps(self, parts, placements, spacing):
+        shapes = []
+        for placement in placements:
+            points, _, _ = noFitPolygon.rotate_polygon(parts[placement['part_id']], placement['rotation'])
+            shapes.append(noFitPolygon.convex_decomposition(
+                [(x + placement['x'], y + placement['y']) for x, y in points]))
+        for i in range(len(shapes)):
+            for j in range(i + 1, len(shapes)):
+                nfp = noFitPolygon.no_fit_polygon(shapes[i], shapes[j], spacing)
+                self.assertFalse(nfp.blocks(0, 0))
+
+    def test_best_pair(self):
+        """Test that a triangle and its 180 degree copy make a near-rectangle"""
+        pair = pairClustering.best_pair(TRIANGLE, TRIANGLE, first_id='tri', second_id='tri')
+        self.assertAlmostEqual(pair.width * pair.height, 48)
+        self.assertAlmostEqual(pair.density, 1)
+        self.assertEqual(sorted(member[1] for member in pair.members), [0, 180])
+
+        # Spacing opens the diagonal gap a little
+        spaced = pairClustering.best_pair(TRIANGLE, TRIANGLE, 0.3)
+        self.assertGreater(spaced.density, 0.9)
+        self.assertLess(spaced.density, 1)
+
+    def test_cluster_pairs(self):
+        """Test that pairs are made while copies last and the rest stays single"""
+        parts_list = [
+            {'id': 'tri', 'polygon': TRIANGLE, 'quantity': 5},
+            {'id': 'square', 'polygon': SQUARE, 'quantity': 2}
+        ]
+        items, pairs = pairClustering.cluster_pairs(parts_list, 0.3)
+        self.assertEqual(len(pairs), 1)
+        pair_id, pair = next(iter(pairs.items()))
+        self.assertEqual([member[0] for member in pair.members], ['tri', 'tri'])
+        self.assertEqual({item['id']: item['quantity'] for item in items}, {pair_id: 2, 'tri': 1, 'square': 2})
+
+        # Squares never save area by pairing
+        _, pairs = pairClustering.cluster_pairs([{'id': 'square', 'polygon': SQUARE, 'quantity': 10}])
+        self.assertEqual(pairs, {})
+
+    def test_expand_pairs(self):
+        """Test that turned super-parts give the parts they hold without overlaps"""
+        parts = {'L': L_SHAPE, 'tri': TRIANGLE}
+        _, pairs = pairClustering.cluster_pairs([{'id': 'L', 'polygon': L_SHAPE, 'quantity': 2}], 0.5)
+        pair_id, pair = next(iter(pairs.items()))
+        placements = [
+            {'part_id': pair_id, 'x': 0, 'y': 0, 'rotated': False, 'sheet': 0},
+            {'part_id': pair_id, 'x': pair.width + 0.5, 'y': 0, 'rotated': True, 'sheet': 0},
+            {'part_id': 'tri', 'x': 0, 'y': pair.height + 0.5, 'rotated': True, 'sheet': 0}
+        ]
+        expanded = pairClustering.expand_pairs(placements, pairs)
+        self.assertEqual([placement['part_id'] for placement in expanded], ['L', 'L', 'L', 'L', 'tri'])
+        self.assertTrue(all(placement['sheet'] == 0 for placement in expanded))
+        self.assertEqual(expanded[-1]['rotation'], 90)
+        self.assertEqual([placement['rotation'] % 90 == 0 for placement in expanded], [True] * 5)
+
+        # Turned pairs stay inside their box
+        for placement in expanded[2:4]:
+            _, width, height = noFitPolygon.rotate_polygon(L_SHAPE, placement['rotation'])
+            self.assertTrue(pair.width + 0.5 - 1e-6 <= placement['x'])
+            self.assertTrue(placement['x'] + width <= 0.5 + pair.width + pair.height + 1e-6)
+            self.assertTrue(placement['y'] + height <= pair.width + 1e-6)
+        self.assertNoOverlaps(parts, expanded, 0.49)
+
+    def test_pair_nesting(self):
+        """Test that mixed irregular parts fit more parts on a sheet as pairs"""
+        trapezoid = [(0, 0), (10, 0), (7, 5), (3, 5)]
+        parts = {'L': L_SHAPE, 'trap': trapezoid, 'tri': TRIANGLE}
+        parts_list = [
+            {'id': 'L', 'polygon': L_SHAPE, 'quantity': 40},
+            {'id': 'trap', 'polygon': trapezoid, 'quantity': 61},
+            {'id': 'tri', 'polygon': TRIANGLE, 'quantity': 45}
+        ]
+        solution = nestingAlgorithm.pair_nesting(100, 50, parts_list, 1, 0.3, max_sheets=1)
+        boxes = [{'id': part['id'], 'width': max(x for x, _ in part['polygon']),
+                  'height': max(y for _, y in part['polygon']), 'quantity': part['quantity']}
+                 for part in parts_list]
+        box_solution = nestingAlgorithm.multi_sheet_nesting(100, 50, boxes, 1, 0.3, max_sheets=1)
+        self.assertGreater(len(solution['placements']), len(box_solution['placements']))
+        self.assertEqual(sum(solution['unplaced'].values()) + len(solution['placements']), 146)
+        self.assertGreater(solution['pairs'], 0)
+
+        for placement in solution['placements']:
+            _, width, height = noFitPolygon.rotate_polygon(parts[placement['part_id']], placement['rotation'])
+            self.assertTrue(1 - 1e-6 <= placement['x'] and placement['x'] + width <= 99 + 1e-6)
+            self.assertTrue(1 - 1e-6 <= placement['y'] and placement['y'] + height <= 49 + 1e-6)
+        self.assertNoOverlaps(parts, solution['placements'], 0.29)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import sys
+import os
+import math
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import partSnapshot
+
+class TestPartSnapshot(unittest.TestCase):
+    """Tests for the array-backed part geometry snapshot"""
+
+    def test_counts(self):
+        """Test that curves are stored in their typed arrays"""
+        snapshot = partSnapshot.PartSnapshot()
+        snapshot.add_line(0, 0, 10, 0)
+        snapshot.add_line(10, 0, 10, 5)
+        snapshot.add_circle(5, 2.5, 1)
+        snapshot.add_arc(0, 0, 1, 0, math.pi / 2)
+        snapshot.add_spline([(0, 0), (1, 1), (2, 0)])
+
+        self.assertEqual(snapshot.line_count, 2)
+        self.assertEqual(snapshot.circle_count, 1)
+        self.assertEqual(snapshot.arc_count, 1)
+        self.assertEqual(snapshot.spline_count, 1)
+        self.assertEqual(snapshot.curve_count, 5)
+        self.assertEqual(list(next(snapshot.splines())), [0, 0, 1, 1, 2, 0])
+
+        # Snapshots use slots to stay compact
+        with self.assertRaises(AttributeError):
+            snapshot.extra = 1
+
+    def test_bbox(self):
+        """Test the bounding box of lines, circles and arcs"""
+        snapshot = partSnapshot.PartSnapshot()
+        self.assertIsNone(snapshot.bbox)
+
+        snapshot.add_line(0, 0, 10, 0)
+        self.assertEqual(snapshot.bbox, (0, 10, 0, 0))
+
+        # Adding geometry invalidates the cached box
+        snapshot.add_circle(5, 5, 2)
+        self.assertEqual(snapshot.bbox, (0, 10, 0, 7))
+
+        # A half circle arc above the x axis reaches its top point
+        snapshot = partSnapshot.PartSnapshot()
+        snapshot.add_arc(0, 0, 1, 0, math.pi)
+        min_x, max_x, min_y, max_y = snapshot.bbox
+        self.assertAlmostEqual(min_x, -1)
+        self.assertAlmostEqual(max_x, 1)
+        self.assertAlmostEqual(min_y, 0)
+        self.assertAlmostEqual(max_y, 1)
+
+    def test_part_outline(self):
+        """Test that curves are chained into an outer loop and its holes"""
+        snapshot = partSnapshot.PartSnapshot()
+        # L-shape drawn with lines in mixed directions and a rounded outer corner
+        snapshot.add_line(0, 0, 8, 0)
+        snapshot.add_arc(8, 2, 8, 0, math.pi / 2)
+        snapshot.add_line(10, 2, 10, 4)
+        snapshot.add_line(4, 4, 10, 4)
+        snapshot.add_line(4, 4, 4, 10)
+        snapshot.add_line(4, 10, 0, 10)
+        snapshot.add_line(0, 10, 0, 0)
+        snapshot.add_circle(2, 2, 1)
+
+        loops = partSnapshot.closed_loops(snapshot, tolerance=0.01)
+        self.assertEqual(len(loops), 2)
+
+        outer, holes = partSnapshot.part_outline(snapshot, tolerance=0.01)
+        self.assertEqual(len(holes), 1)
+        self.assertGreater(partSnapshot.polygon_area(outer), 0)
+        self.assertLess(partSnapshot.polygon_area(holes[0]), 0)
+        self.assertAlmostEqual(partSnapshot.polygon_area(outer), 64 - 4 + math.pi, delta=0.05)
+        self.assertAlmostEqual(partSnapshot.polygon_area(holes[0]), -math.pi, delta=0.05)
+
+        # An open chain has no outline, and neither do separate shapes
+        open_snapshot = partSnapshot.PartSnapshot()
+        open_snapshot.add_line(0, 0, 10, 0)
+        open_snapshot.add_line(10, 0, 10, 5)
+        self.assertEqual(partSnapshot.part_outline(open_snapshot), (None, []))
+
+        snapshot.add_circle(30, 30, 1)
+        self.assertEqual(partSnapshot.part_outline(snapshot), (None, []))
+
+    def test_inscribed_rectangles(self):
+        """Test that rectangles inside a hole avoid its islands and stay inside curved edges"""
+        frame = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        island = [(4, 4), (6, 4), (6, 6), (4, 6)]
+        self.assertEqual(partSnapshot.inscribed_rectangles([frame]), [(0, 0, 10, 10)])
+        self.assertEqual(partSnapshot.inscribed_rectangles([frame, island]),
+                         [(0, 0, 10, 4), (0, 6, 10, 4), (0, 4, 4, 2), (6, 4, 4, 2)])
+        self.assertEqual(len(partSnapshot.inscribed_rectangles([frame, island], max_rectangles=2)), 2)
+
+        # The largest square in a circle has sides of r * sqrt(2)
+        circle = [(5 * math.cos(2 * math.pi * i / 64), 5 * math.sin(2 * math.pi * i / 64)) for i in range(64)]
+        rectangles = partSnapshot.inscribed_rectangles([circle])
+        x, y, width, height = rectangles[0]
+        self.assertAlmostEqual(width * height, 50, delta=2.5)
+        for x, y, width, height in rectangles:
+            for corner in ((x, y), (x + width, y), (x, y + height), (x + width, y + height)):
+                self.assertLessEqual(math.hypot(*corner), 5 + 1e-9)
+
+    def test_distinct_rotations(self):
+        """Test that turns under which a part looks the same are searched once"""
+        eight = (0, 45, 90, 135, 180, 225, 270, 315)
+        rectangle = [[(0, 0), (10, 0), (10, 4), (0, 4)]]
+        square = [[(0, 0), (5, 0), (5, 5), (0, 5)]]
+        l_shape = [[(0, 0), (10, 0), (10, 3), (3, 3), (3, 10), (0, 10)]]
+        self.assertEqual(partSnapshot.distinct_rotations(rectangle, eight), [0, 45, 90, 135])
+        self.assertEqual(partSnapshot.distinct_rotations(square, eight), [0, 45])
+        self.assertEqual(partSnapshot.distinct_rotations(l_shape, eight), list(eight))
+
+        # An L with equal arms at 90 degrees is the mirror image of the L at 0 degrees
+        self.assertTrue(partSnapshot.symmetric_under(l_shape, 90, mirrored=True))
+        self.assertEqual(partSnapshot.distinct_rotations(l_shape, (0, 90), layout_symmetry=True), [0])
+        uneven = [[(0, 0), (10, 0), (10, 3), (3, 3), (3, 8), (0, 8)]]
+        self.assertEqual(partSnapshot.distinct_rotations(uneven, (0, 90), layout_symmetry=True), [0, 90])
+
+        # Flattened circles match although their points do not line up after the turn
+        flange = partSnapshot.PartSnapshot()
+        flange.add_circle(0, 0, 10)
+        for k in range(6):
+            flange.add_circle(7 * math.cos(math.pi * k / 3), 7 * math.sin(math.pi * k / 3), 1)
+        loops = partSnapshot.closed_loops(flange)
+        self.assertEqual(partSnapshot.distinct_rotations(loops, (0, 90, 180, 270)), [0, 90])
+
+        # A hole off the centre breaks the half-turn symmetry of a plate
+        plate = partSnapshot.PartSnapshot()
+        for start, end in zip(rectangle[0], rectangle[0][1:] + rectangle[0][:1]):
+            plate.add_line(*start, *end)
+        plate.add_circle(2, 2, 1)
+        loops = partSnapshot.closed_loops(plate)
+        self.assertEqual(partSnapshot.distinct_rotations(loops, (0, 90, 180, 270)), [0, 90, 180, 270])
+
+    def test_rotated(self):
+        """Test that every curve type turns about the origin"""
+        snapshot = partSnapshot.PartSnapshot()
+        snapshot.add_line(1, 0, 2, 0)
+        snapshot.add_circle(3, 0, 1)
+        snapshot.add_arc(0, 0, 1, 0, math.pi)
+        snapshot.add_spline([(1, 0), (2, 1)])
+
+        turned = snapshot.rotated(math.pi / 2)
+        self.assertEqual([round(value, 9) for value in turned.lines], [0, 1, 0, 2])
+        self.assertEqual([round(value, 9) for value in turned.circles], [0, 3, 1])
+        self.assertEqual([round(value, 9) for value in turned.arcs], [0, 0, 0, 1, round(math.pi, 9)])
+        self.assertEqual([round(value, 9) for value in turned.spline_points], [0, 1, -1, 2])
+        self.assertEqual(list(snapshot.lines), [1, 0, 2, 0])
+
+    def test_orient_to_min_area(self):
+        """Test that a part drawn at an angle is turned square to its smallest box"""
+        angle = math.radians(30)
+        corners = [(0, 0), (20, 0), (20, 4), (0, 4)]
+        corners = [(x * math.cos(angle) - y * math.sin(angle) + 5, x * math.sin(angle) + y * math.cos(angle))
+                   for x, y in corners]
+        snapshot = partSnapshot.PartSnapshot()
+        for start, end in zip(corners, corners[1:] + corners[:1]):
+            snapshot.add_line(*start, *end)
+
+        turn, width, height = partSnapshot.min_area_rectangle(corners)
+        self.assertAlmostEqual(turn, -angle)
+        self.assertAlmostEqual(width * height, 80)
+
+        oriented, turn = partSnapshot.orient_to_min_area(snapshot)
+        self.assertAlmostEqual(turn, -angle)
+        min_x, max_x, min_y, max_y = oriented.bbox
+        self.assertAlmostEqual(max_x - min_x, 20)
+        self.assertAlmostEqual(max_y - min_y, 4)
+
+        # Square parts and circles keep their orientation
+        circle = partSnapshot.PartSnapshot()
+        circle.add_circle(0, 0, 3)
+        self.assertIs(partSnapshot.orient_to_min_area(circle)[0], circle)
+        self.assertEqual(partSnapshot.orient_to_min_area(oriented)[1], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
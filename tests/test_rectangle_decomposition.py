@@ -0,0 +1,58 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the module to test
+from lib import partSnapshot, rectangleDecomposition
+
+L_SHAPE = [(0, 0), (10, 0), (10, 4), (4, 4), (4, 10), (0, 10)]
+T_SHAPE = [(0, 0), (4, 0), (4, 6), (10, 6), (10, 10), (-6, 10), (-6, 6), (0, 6)]
+U_SHAPE = [(0, 0), (9, 0), (9, 9), (6, 9), (6, 3), (3, 3), (3, 9), (0, 9)]
+
+
+class TestRectangleDecomposition(unittest.TestCase):
+    """Tests for splitting rectilinear outlines into rectangles"""
+
+    def assertCovers(self, rects, polygon):
+        """Check that the rectangles hold the outline's area and that each lies inside it"""
+        min_x = min(x for x, _ in polygon)
+        min_y = min(y for _, y in polygon)
+        self.assertAlmostEqual(sum(w * h for _, _, w, h in rects), abs(partSnapshot.polygon_area(polygon)))
+        for x, y, w, h in rects:
+            self.assertTrue(partSnapshot.point_in_polygon(min_x + x + w / 2, min_y + y + h / 2, polygon))
+
+    def test_decompose(self):
+        """Test that L and T shapes give two rectangles and a U three"""
+        self.assertEqual(rectangleDecomposition.decompose(L_SHAPE), [(0, 0, 4, 10), (4, 0, 6, 4)])
+        for polygon, count in ((L_SHAPE, 2), (T_SHAPE, 2), (U_SHAPE, 3)):
+            rects = rectangleDecomposition.decompose(polygon)
+            self.assertEqual(len(rects), count)
+            self.assertCovers(rects, polygon)
+
+        # Clockwise outlines, repeated points and points along an edge make no difference
+        outline = list(reversed(L_SHAPE)) + [(0, 10)]
+        outline.insert(2, (4, 7))
+        self.assertEqual(rectangleDecomposition.decompose(outline), [(0, 0, 4, 10), (4, 0, 6, 4)])
+        self.assertEqual(rectangleDecomposition.decompose([(0, 0), (5, 1e-9), (5, 5), (0, 5)]), [(0, 0, 5, 5)])
+
+    def test_not_rectilinear(self):
+        """Test that outlines with sloped edges are rejected"""
+        self.assertIsNone(rectangleDecomposition.decompose([(0, 0), (8, 0), (0, 6)]))
+        self.assertIsNone(rectangleDecomposition.decompose([(0, 0), (10, 0), (10, 4), (4, 10), (0, 10)]))
+        self.assertIsNone(rectangleDecomposition.decompose([]))
+
+    def test_rotate_rectangles(self):
+        """Test that turned rectangles cover the turned outline"""
+        rects = rectangleDecomposition.decompose(T_SHAPE)
+        for angle, turned in ((90, [(-y, x) for x, y in T_SHAPE]),
+                              (180, [(-x, -y) for x, y in T_SHAPE]),
+                              (270, [(y, -x) for x, y in T_SHAPE])):
+            self.assertCovers(rectangleDecomposition.rotate_rectangles(rects, 16, 10, angle), turned)
+        self.assertEqual(rectangleDecomposition.rotate_rectangles(rects, 16, 10, 0), rects)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+import math
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the modules to test
+from lib import nestingPlanner, partSnapshot, transformKernel
+from AdvancedNesting.lib import nestingConfig
+
+class TestTransformKernel(unittest.TestCase):
+    """Tests for the batched placement transform kernel"""
+
+    def setUp(self):
+        self.snapshot = partSnapshot.PartSnapshot()
+        self.snapshot.add_line(0, 0, 4, 0)
+        self.snapshot.add_line(4, 0, 4, 2)
+        self.snapshot.add_circle(1, 1, 0.5)
+        self.snapshot.add_arc(3, 1, 3.5, 1, math.pi)
+        self.snapshot.add_spline([(0, 2), (2, 2.5), (4, 2)])
+        self.bbox = (0, 4, 0, 2.5)
+
+        # Every rotation angle offered by the Maximum level
+        angles = nestingConfig.OPTIMIZATION_LEVELS['Maximum']['max_rotation_angles']
+        self.placements = [(10 + i, 20 + 2 * i, angle) for i, angle in enumerate(angles)]
+
+    def test_matches_planner_transform(self):
+        """Test that the kernel agrees with the planner's per-placement transform"""
+        points = transformKernel.snapshot_control_points(self.snapshot)
+        result = transformKernel.transform_points(points, self.bbox, self.placements)
+
+        for i, (x, y, angle) in enumerate(self.placements):
+            cos_a, sin_a, tx, ty = nestingPlanner.placement_transform(
+                self.bbox, nestingPlanner.Placement(x, y, angle))
+            for j, (px, py) in enumerate(points):
+                self.assertAlmostEqual(result[i][j][0], cos_a * px - sin_a * py + tx)
+                self.assertAlmostEqual(result[i][j][1], sin_a * px + cos_a * py + ty)
+
+    def test_python_fallback_matches(self):
+        """Test that the pure-Python path gives the same coordinates"""
+        points = transformKernel.snapshot_control_points(self.snapshot)
+        fallback = transformKernel._transform_points_python(points, self.bbox, self.placements)
+        result = transformKernel.transform_points(points, self.bbox, self.placements)
+
+        for i in range(len(self.placements)):
+            for j in range(len(points)):
+                self.assertAlmostEqual(result[i][j][0], fallback[i][j][0])
+                self.assertAlmostEqual(result[i][j][1], fallback[i][j][1])
+
+    def test_transform_snapshot(self):
+        """Test the per-curve layout of the transformed snapshot"""
+        placed = transformKernel.transform_snapshot(self.snapshot, self.bbox, [(10, 20, 0), (0, 0, 90)])
+
+        self.assertEqual(len(placed.lines), 2)
+        self.assertEqual(placed.lines[0][0], [10, 20, 14, 20])
+        self.assertEqual(placed.circles[0][0], [11, 21, 0.5])
+        self.assertEqual(placed.arcs[0][0], [13, 21, 13.5, 21, math.pi])
+        self.assertEqual(placed.splines[0][0], [10, 22, 12, 22.5, 14, 22])
+
+        # A quarter turn keeps sizes and swings the bottom edge to the right side
+        x1, y1, x2, y2 = placed.lines[1][0]
+        self.assertAlmostEqual(math.hypot(x2 - x1, y2 - y1), 4)
+        self.assertAlmostEqual(placed.circles[1][0][2], 0.5)
+        self.assertAlmostEqual(x1, 2.5)
+        self.assertAlmostEqual(x2, 2.5)
+
+    def test_transform_snapshot_without_numpy(self):
+        """Test that both kernel paths produce the same placed geometry"""
+        placed = transformKernel.transform_snapshot(self.snapshot, self.bbox, self.placements)
+        has_numpy = transformKernel.HAS_NUMPY
+        transformKernel.HAS_NUMPY = False
+        try:
+            fallback = transformKernel.transform_snapshot(self.snapshot, self.bbox, self.placements)
+        finally:
+            transformKernel.HAS_NUMPY = has_numpy
+
+        for field in placed._fields:
+            for rows, fallback_rows in zip(getattr(placed, field), getattr(fallback, field)):
+                self.assertEqual(len(rows), len(fallback_rows))
+                for row, fallback_row in zip(rows, fallback_rows):
+                    for value, fallback_value in zip(row, fallback_row):
+                        self.assertAlmostEqual(value, fallback_value)
+
+    def test_empty_inputs(self):
+        """Test that empty snapshots and plans are handled"""
+        placed = transformKernel.transform_snapshot(partSnapshot.PartSnapshot(), self.bbox, [(0, 0, 0)])
+        self.assertEqual(placed.lines, [[]])
+
+        placed = transformKernel.transform_snapshot(self.snapshot, self.bbox, [])
+        self.assertEqual(placed.lines, [])
+
+
+if __name__ == '__main__':
+    unittest.main()